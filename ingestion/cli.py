@@ -1,23 +1,37 @@
 import argparse
 import glob
 import hashlib
-import json
 import os
 from pathlib import Path
-from typing import Iterable, List, Tuple, Dict
+from collections import Counter
+from typing import Iterable, Iterator, List, NamedTuple, Tuple, Dict
 
 from dotenv import load_dotenv
-from langchain_community.document_loaders import TextLoader, PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
 
-# Prefer modern OpenAI embeddings import, fallback to community if missing
-try:
-    from langchain_openai import OpenAIEmbeddings
-except Exception:  # pragma: no cover
-    from langchain_community.embeddings import OpenAIEmbeddings  # type: ignore
+from ingestion.embeddings.executor import EmbeddingExecutor
+from ingestion.embeddings.store import default_embedding_store, embed_with_cache
+from ingestion.loaders.cache import default_extraction_cache
+from ingestion.loaders.extract import DEFAULT_PAGES_PER_TASK, iter_extracted
+from ingestion.pipelines.manifest import write_manifest
+from ingestion.pipelines.state import FileRecord, IngestState, file_sha256
+from ingestion.pipelines.stream import ordered_map, prefetch
+from ingestion.splitters.recursive import RecursiveSplitter, default_splitter
+from ingestion.vectorstore.upsert import ParallelUpserter
 
-from langchain_pinecone import PineconeVectorStore
+
+def _openai_embeddings_class() -> type:
+    """``OpenAIEmbeddings``, imported on first use.
+
+    langchain_openai pulls in the whole openai SDK (about two seconds), which
+    ``--help`` and argument errors should not pay for.
+    """
+    # Prefer modern OpenAI embeddings import, fallback to community if missing
+    try:
+        from langchain_openai import OpenAIEmbeddings
+    except Exception:  # pragma: no cover
+        from langchain_community.embeddings import OpenAIEmbeddings  # type: ignore
+    return OpenAIEmbeddings
 
 
 def _fail(msg: str) -> None:
@@ -45,19 +59,6 @@ def _iter_source_files(patterns: List[str]) -> List[Path]:
     return files
 
 
-def _load_file(path: Path) -> List[Document]:
-    suffix = path.suffix.lower()
-    if suffix == ".pdf":
-        return PyPDFLoader(str(path)).load()
-    elif suffix in {".txt", ".md"}:
-        try:
-            return TextLoader(str(path), encoding="utf-8").load()
-        except UnicodeDecodeError:
-            return TextLoader(str(path), encoding="latin1").load()
-    else:
-        return []
-
-
 def _normalize_text(t: str) -> str:
     return "\n".join(line.strip() for line in (t or "").splitlines()).strip()
 
@@ -72,13 +73,15 @@ def _hash_chunk(source_rel: str, page: int | None, text: str) -> str:
     return h.hexdigest()
 
 
-def _split_documents(docs: List[Document]) -> List[Document]:
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=150,
-        separators=["\n\n", "\n", " ", ""],
-    )
-    return splitter.split_documents(docs)
+def _source_rel(src: str, repo_root: Path) -> str:
+    try:
+        return str(Path(src).resolve().relative_to(repo_root))
+    except Exception:
+        return src
+
+
+def _split_documents(docs: List[Document], splitter: RecursiveSplitter | None = None) -> List[Document]:
+    return (splitter or RecursiveSplitter()).split_documents(docs)
 
 
 def _sanitize_metadata(meta: dict) -> dict:
@@ -95,14 +98,69 @@ def _sanitize_metadata(meta: dict) -> dict:
     return clean
 
 
+class FileResult(NamedTuple):
+    """What one run did with a file: "ingested", "unchanged", "empty" or "removed"."""
+
+    status: str
+    chunks: int = 0
+    upserted: int = 0
+
+
 def ingest(
     patterns: List[str] | None = None,
     index_env: str = "INDEX_NAME2",
     pinecone_key_env: str = "PINECONE_API_KEY2",
     model: str = "text-embedding-3-large",
     namespace: str | None = None,
+    backend: str = "pinecone",
+    dimensions: int | None = None,
+    keyword_index: bool = True,
+    workers: int | None = None,
+    pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+    extract_cache: bool = True,
+    batch_size: int | None = None,
+    incremental: bool = True,
+    embedding_cache: bool = True,
+    file_results: Dict[str, FileResult] | None = None,
 ) -> Tuple[int, int]:
-    """Ingest documents matched by patterns into Pinecone.
+    """Ingest documents matched by patterns into Pinecone or the local vector store.
+
+    ``backend="local"`` embeds chunks directly and writes them to the
+    memory-mapped store under LOCAL_VECTOR_DIR; no Pinecone keys are needed.
+    ``dimensions`` requests a Matryoshka-truncated embedding size (e.g. 256 or
+    1024); the Pinecone index and query side (EMBED_DIMENSIONS) must match.
+    ``keyword_index`` also updates the namespace's BM25 index (KEYWORD_INDEX_DIR)
+    with the same chunk IDs, for hybrid retrieval.
+    ``workers`` sizes the extraction process pool (default: env INGEST_WORKERS
+    or the CPU count; 1 loads files sequentially in-process) and PDFs longer
+    than ``pages_per_task`` pages are split across workers by page range.
+    ``extract_cache`` reuses page text extracted from identical file content
+    on earlier runs (EXTRACT_CACHE_DIR); EXTRACT_CACHE=0 also disables it.
+
+    Files stream through load -> split -> dedupe -> embed -> upsert. Chunks
+    are packed into embedding requests of at most ``batch_size`` chunks
+    (default: env EMBED_BATCH_INPUTS or 256) and EMBED_BATCH_TOKENS tokens,
+    EMBED_CONCURRENCY (default 4) requests run at once under the
+    EMBED_RPM / EMBED_TPM budget, and at most INGEST_QUEUE (default 4)
+    batches are buffered between stages, so memory stays flat and the
+    first vectors land after the first batch. Splitting uses
+    :func:`ingestion.splitters.recursive.default_splitter` (CHUNK_SIZE,
+    CHUNK_OVERLAP, CHUNK_UNIT=chars|tokens, CHUNK_ACROSS_PAGES); changing
+    those re-splits every file on the next run.
+
+    With ``incremental`` (default), a per-namespace state database
+    (INGEST_STATE_DIR) skips files whose size/mtime or content hash are
+    unchanged, upserts only chunk IDs not written before and deletes IDs a
+    file no longer produces, or all of a file's IDs once it is gone (even
+    when ``patterns`` match nothing any more).
+    ``incremental=False`` re-processes every matched file but still removes
+    stale IDs.
+    ``embedding_cache`` reuses vectors stored under EMBED_CACHE_DIR for chunk
+    sha1s embedded before with the same model and dimensions, so rebuilding
+    a wiped namespace needs no embedding calls; EMBED_CACHE=0 disables it.
+
+    ``file_results``, if given, is filled with a :class:`FileResult` per
+    matched (or removed) file, keyed by its repo-relative path.
 
     Returns: (chunks_created, chunks_upserted)
     """
@@ -119,119 +177,301 @@ def ingest(
         ]
 
     files = _iter_source_files(patterns)
-    if not files:
-        _fail("No source files found. Add files under data/documents or place InsuranceAct.pdf in the repo root.")
 
-    all_docs: List[Document] = []
+    use_local = (backend or "pinecone").strip().lower() == "local"
+    index_name = "" if use_local else _get_env(index_env)
+    repo_root = Path(__file__).resolve().parents[1]
+
+    # Work out what changed since the last run of this namespace.
+    state = IngestState(namespace)
+    settings = {
+        "backend": "local" if use_local else f"pinecone:{index_name}",
+        "model": model,
+        "dimensions": str(dimensions or ""),
+    }
+    if not state.matches(settings):
+        if state.paths():
+            print("[state] backend or embedding settings changed; re-ingesting every file")
+        state.reset(settings)
+    # Different chunking means different chunk IDs: re-split every file, but
+    # keep the recorded IDs so the ones no longer produced are deleted.
+    # State written before this setting existed used the default splitter.
+    splitter = default_splitter(model)
+    chunking = splitter.signature()
+    rechunk = bool(state.paths()) and (state.setting("chunking") or RecursiveSplitter().signature()) != chunking
+    if rechunk:
+        print("[state] chunking settings changed; re-splitting every file")
+    skip_unchanged = incremental and not rechunk
+    results: Dict[str, FileResult] = {} if file_results is None else file_results
+    changed: List[Path] = []
+    records: Dict[str, FileRecord] = {}
+    present: set[str] = set()
     for f in files:
-        loaded = _load_file(f)
-        if not loaded:
+        rel = _source_rel(str(f), repo_root)
+        present.add(rel)
+        st = f.stat()
+        prev = state.file(rel)
+        if skip_unchanged and prev and prev.size == st.st_size and prev.mtime == st.st_mtime:
+            results[rel] = FileResult("unchanged")
             continue
-        # Normalize metadata: include relative source for traceability
-        for d in loaded:
-            md = dict(d.metadata or {})
-            md["source_path"] = str(f)
-            md.setdefault("file_name", f.name)
-            d.metadata = md
-        all_docs.extend(loaded)
-
-    if not all_docs:
-        _fail("No documents loaded from the selected files.")
-
-    chunks = _split_documents(all_docs)
+        sha = file_sha256(f)
+        if skip_unchanged and prev and prev.sha256 == sha:
+            state.touch(rel, st.st_size, st.st_mtime)
+            results[rel] = FileResult("unchanged")
+            continue
+        changed.append(f)
+        records[rel] = FileRecord(st.st_size, st.st_mtime, sha)
+    removed = [p for p in state.paths() if p not in present and not (repo_root / p).exists()]
+    if not files and not removed:
+        state.close()
+        _fail("No source files found. Add files under data/documents or place InsuranceAct.pdf in the repo root.")
+    if not changed and not removed:
+        print(f"No changes in {len(files)} file(s) since the last ingest (namespace='{namespace}').")
+        state.close()
+        return (0, 0)
+    print(f"[state] {len(changed)} new/changed, {len(files) - len(changed)} unchanged, {len(removed)} removed file(s)")
+    old_ids: Dict[str, set[str]] = {rel: state.chunk_ids(rel) for rel in records}
+    # Chunks an interrupted earlier run already upserted for these files.
+    resumed: Dict[str, set[str]] = {rel: state.checkpointed(rel) for rel in records}
+    n_resumed = sum(len(ids) for ids in resumed.values())
+    if n_resumed:
+        print(f"[state] resuming: {n_resumed} chunk(s) already upserted by an interrupted run")
 
     # Build embeddings
     openai_key = _get_env("OPENAI_API_KEY")
-    embeddings = OpenAIEmbeddings(openai_api_key=openai_key, model=model)
+    # Retries and request sizing are handled by the executor below.
+    embeddings = _openai_embeddings_class()(
+        openai_api_key=openai_key, model=model, dimensions=dimensions, max_retries=0, chunk_size=2048
+    )
+    executor = EmbeddingExecutor(embeddings, model, max_inputs=batch_size)
+    emb_store = default_embedding_store(model, dimensions) if embedding_cache else None
 
     # Pinecone settings and dimension check
-    index_name = _get_env(index_env)
-    pinecone_api_key = _get_env(pinecone_key_env)
+    if not use_local:
+        pinecone_api_key = _get_env(pinecone_key_env)
+
+        try:
+            from pinecone import Pinecone as _PineClient  # type: ignore
+
+            pc = _PineClient(api_key=pinecone_api_key)
+            described = pc.describe_index(index_name)
+            index_dimension = described.dimension
+            # A warm embedding cache already knows the model's output size.
+            embed_dimension = (emb_store.dim if emb_store else 0) or len(embeddings.embed_query("dimension probe"))
+            if embed_dimension != index_dimension:
+                _fail(
+                    f"Pinecone index '{index_name}' dimension {index_dimension} does not match embeddings {embed_dimension}."
+                )
+        except Exception as e:  # pragma: no cover
+            _fail(f"Unable to verify Pinecone index '{index_name}': {e}")
 
     try:
-        from pinecone import Pinecone as _PineClient  # type: ignore
-
-        pc = _PineClient(api_key=pinecone_api_key)
-        described = pc.describe_index(index_name)
-        index_dimension = described.dimension
-        test_vec = embeddings.embed_query("dimension probe")
-        if len(test_vec) != index_dimension:
-            _fail(
-                f"Pinecone index '{index_name}' dimension {index_dimension} does not match embeddings {len(test_vec)}."
-            )
+        from ingestion.vectorstore.backend import open_backend
+
+        target = open_backend("local") if use_local else open_backend("pinecone", index=pc.Index(index_name))
     except Exception as e:  # pragma: no cover
-        _fail(f"Unable to verify Pinecone index '{index_name}': {e}")
+        _fail(f"Unable to open vector backend: {e}")
 
-    # Deduplicate and produce deterministic IDs
-    seen_hashes: set[str] = set()
-    unique_chunks: List[Document] = []
-    ids: List[str] = []
+    kw = None
+    if keyword_index:
+        try:
+            from ingestion.vectorstore.keyword import KeywordIndexStore
+
+            kw = KeywordIndexStore().get(namespace or "")
+        except Exception as e:  # pragma: no cover
+            print(f"[warn] unable to open keyword index: {e}")
+
+    queue_size = int(os.getenv("INGEST_QUEUE") or 4)
+    cache = default_extraction_cache() if extract_cache else None
+    loaded_pages = 0
+    created = 0
+    # Every chunk ID each processed file produced, whether or not it was upserted now.
+    produced: Dict[str, set[str]] = {}
+
+    def chunk_stream() -> Iterator[Tuple[str, Document]]:
+        """load -> normalize -> split -> hash/dedupe, one file at a time."""
+        nonlocal loaded_pages, created
+        seen_hashes: set[str] = set()
+        for f, loaded in iter_extracted(changed, workers=workers, pages_per_task=pages_per_task, cache=cache):
+            # A changed file that now extracts to nothing still counts as
+            # processed: its old chunks go stale and its new hash is recorded.
+            file_ids = produced.setdefault(_source_rel(str(f), repo_root), set())
+            if not loaded:
+                continue
+            # Normalize metadata: include relative source for traceability
+            for d in loaded:
+                md = dict(d.metadata or {})
+                md["source_path"] = str(f)
+                md.setdefault("file_name", f.name)
+                d.metadata = md
+            loaded_pages += len(loaded)
+            chunks = _split_documents(loaded, splitter)
+            created += len(chunks)
+            # Deduplicate and produce deterministic IDs
+            for ch in chunks:
+                text = _normalize_text(ch.page_content)
+                if not text:
+                    continue
+                src = ch.metadata.get("source_path") or ch.metadata.get("source") or "unknown"
+                source_rel = _source_rel(src, repo_root)
+                page = ch.metadata.get("page")
+                digest = _hash_chunk(source_rel, page, text)
+                if digest in seen_hashes:
+                    continue
+                seen_hashes.add(digest)
+                vid = digest[:32]  # deterministic, Pinecone-safe length
+                file_ids.add(vid)
+                if incremental and vid in old_ids.get(source_rel, ()):
+                    continue  # already in the index from an earlier run
+                if vid in resumed.get(source_rel, ()):
+                    continue  # committed before the last run was interrupted
+
+                # enrich metadata for traceability
+                meta = dict(ch.metadata or {})
+                meta.update({
+                    "source": source_rel,
+                    "sha1": digest,
+                })
+                # Only include page if it is an int
+                if isinstance(page, int):
+                    meta["page"] = page
+                ch.metadata = _sanitize_metadata(meta)
+                yield vid, ch
+
+    def embed(
+        packed: Tuple[List[Tuple[str, Document]], List[int]]
+    ) -> Tuple[List[Tuple[str, Document]], List[List[float]]]:
+        # Token counts come from packing, so chunks are tokenized only once.
+        batch, tokens = packed
+        sha1s = [ch.metadata["sha1"] for _, ch in batch]
+        texts = [ch.page_content for _, ch in batch]
+        return batch, embed_with_cache(emb_store, executor.embed, sha1s, texts, tokens)
+
+    # Each stage runs in its own thread behind a bounded queue, so at most
+    # a few batches are held in memory and upserts start with the first batch.
+    batches = prefetch(
+        executor.pack(chunk_stream(), lambda item: item[1].page_content), maxsize=queue_size, name="split"
+    )
+    embedded = prefetch(
+        ordered_map(embed, batches, concurrency=int(os.getenv("EMBED_CONCURRENCY") or 4), name="embed"),
+        maxsize=queue_size,
+        name="embed-out",
+    )
+    upserted = 0
+    upserted_by: Counter[str] = Counter()
+    # The local store rewrites its namespace files on every upsert, so group
+    # its writes and keep them serial; Pinecone gets UPSERT_BATCH-sized
+    # requests from UPSERT_WORKERS threads.
+    flush_at = int(os.getenv("LOCAL_UPSERT_BATCH") or 2048) if use_local else 1
+    upserter = ParallelUpserter(
+        target, namespace or "", batch_size=flush_at if use_local else None, workers=1 if use_local else None
+    )
+    pending: List[Tuple[List[Tuple[str, Document]], List[List[float]]]] = []
+
+    def flush() -> None:
+        if not pending:
+            return
+        items = [item for batch, _ in pending for item in batch]
+        vectors = [v for _, vecs in pending for v in vecs]
+        pending.clear()
+        # Same metadata layout PineconeVectorStore writes: chunk text under "text".
+        metas = [{**ch.metadata, "text": ch.page_content} for _, ch in items]
+        upserter.submit([vid for vid, _ in items], vectors, metas)
+
+    def commit() -> None:
+        """Checkpoint batches the index acknowledged, so a rerun can skip them."""
+        nonlocal upserted
+        done = upserter.committed()
+        if not done:
+            return
+        state.checkpoint((m["source"], vid) for ids, metas in done for vid, m in zip(ids, metas))
+        upserted_by.update(m["source"] for _, metas in done for m in metas)
+        for ids, metas in done:
+            if kw is not None:
+                kw.upsert(ids, [m["text"] for m in metas], metas)
+            upserted += len(ids)
+        print(f"[upsert] {upserted} chunks to {'local store' if use_local else 'Pinecone'}")
 
-    repo_root = Path(__file__).resolve().parents[1]
-    for i, ch in enumerate(chunks):
-        text = _normalize_text(ch.page_content)
-        if not text:
-            continue
-        src = ch.metadata.get("source_path") or ch.metadata.get("source") or "unknown"
+    try:
+        buffered = 0
+        for batch, vectors in embedded:
+            pending.append((batch, vectors))
+            buffered += len(batch)
+            if buffered >= flush_at:
+                flush()
+                buffered = 0
+            commit()
+        flush()
+        upserter.wait()
+        commit()
+        upserter.check()
+    except (Exception, KeyboardInterrupt) as e:
+        # Keep what did land: checkpoint it and persist its keyword entries.
+        upserter.wait()
+        commit()
+        if kw is not None:
+            kw.save()
+        if isinstance(e, KeyboardInterrupt):
+            raise
+        _fail(f"Ingestion stopped after {upserted} upserted chunks (rerun to resume): {e}")
+
+    # Chunks an edited file no longer produces, and everything from deleted files.
+    stale: List[str] = []
+    for rel, ids in produced.items():
+        stale.extend((old_ids.get(rel, set()) | resumed.get(rel, set())) - ids)
+    for rel in removed:
+        gone = state.chunk_ids(rel)
+        stale.extend(gone)
+        results[rel] = FileResult("removed", len(gone))
+    if stale:
         try:
-            source_rel = str(Path(src).resolve().relative_to(repo_root))
-        except Exception:
-            source_rel = src
-        page = ch.metadata.get("page")
-        digest = _hash_chunk(source_rel, page, text)
-        if digest in seen_hashes:
-            continue
-        seen_hashes.add(digest)
-
-        # enrich metadata for traceability
-        meta = dict(ch.metadata or {})
-        meta.update({
-            "source": source_rel,
-            "sha1": digest,
-        })
-        # Only include page if it is an int
-        if isinstance(page, int):
-            meta["page"] = page
-        ch.metadata = _sanitize_metadata(meta)
-
-        unique_chunks.append(ch)
-        ids.append(digest[:32])  # deterministic, Pinecone-safe length
-
-    if not unique_chunks:
+            target.delete(stale, namespace or "")
+            if kw is not None:
+                kw.delete(stale)
+            print(f"[state] deleted {len(stale)} stale chunk(s)")
+        except Exception as e:  # pragma: no cover
+            _fail(f"Error deleting stale chunks: {e}")
+    # Record state only after the index holds the new chunks, so an
+    # interrupted run is simply redone next time.
+    for rel, ids in produced.items():
+        state.record(rel, records[rel], ids)
+    for rel in records:
+        ids = produced.get(rel)
+        results[rel] = FileResult("ingested", len(ids), upserted_by[rel]) if ids else FileResult("empty")
+    for rel in removed:
+        state.forget(rel)
+    if state.setting("chunking") != chunking and set(state.paths()) <= set(records):
+        state.set_setting("chunking", chunking)
+    ids_by_source = state.ids_by_path()
+    state.close()
+    # A file edited down to nothing still needs its old chunks deleted and
+    # its state recorded above; only a run that changed nothing at all fails.
+    if changed and not stale and not loaded_pages:
+        _fail("No documents loaded from the selected files.")
+    if changed and not stale and not any(produced.values()):
         _fail("All chunks were empty or duplicates; nothing to upsert.")
 
-    # Upsert using LangChain PineconeVectorStore
-    try:
-        store = PineconeVectorStore(index_name=index_name, embedding=embeddings, namespace=namespace)
-        store.add_documents(unique_chunks, ids=ids)
-    except Exception as e:  # pragma: no cover
-        _fail(f"Error upserting to Pinecone: {e}")
-
-    # Build a manifest (per source file counts)
-    counts: Dict[str, int] = {}
-    for ch in unique_chunks:
-        fn = ch.metadata.get("file_name") or ch.metadata.get("source_path") or "unknown"
-        counts[fn] = counts.get(fn, 0) + 1
-
-    manifest = {
-        "namespace": namespace,
-        "generated_at": __import__("datetime").datetime.utcnow().isoformat() + "Z",
-        "total_unique_chunks": len(unique_chunks),
-        "files": [
-            {"file_name": fn, "chunks": n} for fn, n in sorted(counts.items())
-        ],
-    }
+    if emb_store is not None and (emb_store.hits or emb_store.misses):
+        print(f"[embed] cache: {emb_store.hits} hit(s), {emb_store.misses} embedded")
+    if executor.requests:
+        print(f"[embed] {executor.summary()}")
+    if upserter.batches:
+        print(f"[upsert] {upserter.summary()}")
+
+    if kw is not None:
+        try:
+            kw.save()
+        except Exception as e:  # pragma: no cover
+            print(f"[warn] unable to update keyword index: {e}")
+
+    # Manifest: per-file chunk counts plus every chunk ID per source file.
     try:
-        manifests_dir = Path("data/_manifests")
-        manifests_dir.mkdir(parents=True, exist_ok=True)
-        out_path = manifests_dir / f"{namespace or 'default'}.json"
-        with out_path.open("w", encoding="utf-8") as f:
-            json.dump(manifest, f, indent=2)
+        out_path = write_manifest(namespace, ids_by_source)
         print(f"Wrote manifest to {out_path}")
     except Exception as e:  # pragma: no cover
         print(f"[warn] unable to write manifest: {e}")
 
-    return (len(chunks), len(unique_chunks))
+    return (created, upserted)
 
 
 def main() -> None:
@@ -246,11 +486,75 @@ def main() -> None:
         default=os.getenv("INDEX_NAMESPACE", "insurance-act"),
         help="Pinecone namespace to use for upserts (default: env INDEX_NAMESPACE or 'insurance-act').",
     )
+    parser.add_argument(
+        "--backend",
+        choices=["pinecone", "local"],
+        default=os.getenv("VECTOR_BACKEND", "pinecone"),
+        help="Vector backend to write to (default: env VECTOR_BACKEND or 'pinecone'). "
+        "'local' writes memory-mapped NumPy files under LOCAL_VECTOR_DIR.",
+    )
+    parser.add_argument(
+        "--dimensions",
+        type=int,
+        default=int(os.getenv("EMBED_DIMENSIONS") or 0) or None,
+        help="Truncated embedding size, e.g. 256 or 1024 (default: env EMBED_DIMENSIONS or full size).",
+    )
+    parser.add_argument(
+        "--no-keyword-index",
+        action="store_true",
+        help="Skip updating the BM25 keyword index used by hybrid retrieval.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Extraction worker processes (default: env INGEST_WORKERS or CPU count; 1 disables the pool).",
+    )
+    parser.add_argument(
+        "--pages-per-task",
+        type=int,
+        default=DEFAULT_PAGES_PER_TASK,
+        help=f"Split PDFs longer than this into page ranges across workers (default: {DEFAULT_PAGES_PER_TASK}).",
+    )
+    parser.add_argument(
+        "--no-extract-cache",
+        action="store_true",
+        help="Re-parse every file instead of reusing cached extractions from EXTRACT_CACHE_DIR.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Max chunks per embedding request (default: env EMBED_BATCH_INPUTS or 256).",
+    )
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Re-process every matched file instead of skipping files unchanged since the last run.",
+    )
+    parser.add_argument(
+        "--no-embedding-cache",
+        action="store_true",
+        help="Call the embeddings API for every chunk instead of reusing vectors from EMBED_CACHE_DIR.",
+    )
     args = parser.parse_args()
 
     patterns = args.pattern if args.pattern else None
-    created, upserted = ingest(patterns=patterns, namespace=args.namespace)
-    print(f"Created {created} chunks; upserted {upserted} unique chunks to Pinecone (namespace='{args.namespace}').")
+    created, upserted = ingest(
+        patterns=patterns,
+        namespace=args.namespace,
+        backend=args.backend,
+        dimensions=args.dimensions,
+        keyword_index=not args.no_keyword_index,
+        workers=args.workers,
+        pages_per_task=args.pages_per_task,
+        extract_cache=not args.no_extract_cache,
+        batch_size=args.batch_size,
+        incremental=not args.full,
+        embedding_cache=not args.no_embedding_cache,
+    )
+    target = "local store" if args.backend == "local" else "Pinecone"
+    print(f"Created {created} chunks; upserted {upserted} unique chunks to {target} (namespace='{args.namespace}').")
 
 
 if __name__ == "__main__":
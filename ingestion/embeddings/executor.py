@@ -0,0 +1,224 @@
+"""Rate-limit-aware, concurrent embedding calls for ingestion.
+
+:class:`EmbeddingExecutor` wraps a LangChain embeddings object and
+
+- packs chunks into requests by token count (``max_tokens``) and input
+  count (``max_inputs``) with :meth:`EmbeddingExecutor.pack`, which also
+  returns each chunk's token count so a packed batch is never tokenized
+  again;
+- throttles every request through a token bucket per minute budget
+  (``rpm`` requests, ``tpm`` tokens), so several requests can be in flight
+  without tripping the provider's limits;
+- retries rate-limit, timeout and 5xx errors with jittered exponential
+  backoff, honouring ``Retry-After`` when the error carries one;
+- counts chunks, tokens, requests and retries for a throughput summary.
+
+Concurrency comes from the caller running :meth:`embed` on several threads
+(see ``ordered_map`` in :mod:`ingestion.pipelines.stream`).
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Iterable, Iterator, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+_RETRY_NAMES = {"RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError", "Timeout"}
+
+
+def _env_num(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+class RateLimiter:
+    """Two token buckets (requests and tokens per minute); a limit of 0 disables that bucket."""
+
+    def __init__(self, rpm: float = 0, tpm: float = 0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self._req = rpm
+        self._tok = tpm
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last
+        self._last = now
+        if self.rpm:
+            self._req = min(self.rpm, self._req + elapsed * self.rpm / 60.0)
+        if self.tpm:
+            self._tok = min(self.tpm, self._tok + elapsed * self.tpm / 60.0)
+
+    def acquire(self, tokens: int) -> float:
+        """Block until one request of ``tokens`` fits both budgets; returns seconds waited."""
+        waited = 0.0
+        # A single request larger than the whole budget waits for a full bucket.
+        tokens = min(tokens, self.tpm) if self.tpm else tokens
+        while True:
+            with self._lock:
+                self._refill(time.monotonic())
+                need_req = 1 - self._req if self.rpm else 0.0
+                need_tok = tokens - self._tok if self.tpm else 0.0
+                if need_req <= 0 and need_tok <= 0:
+                    if self.rpm:
+                        self._req -= 1
+                    if self.tpm:
+                        self._tok -= tokens
+                    return waited
+                delay = max(
+                    need_req * 60.0 / self.rpm if self.rpm else 0.0,
+                    need_tok * 60.0 / self.tpm if self.tpm else 0.0,
+                )
+            time.sleep(delay)
+            waited += delay
+
+
+def token_counter(model: str) -> Callable[[str], int]:
+    """Token count for ``model`` via tiktoken, or a chars/4 estimate without it."""
+    try:
+        import tiktoken
+
+        try:
+            enc = tiktoken.encoding_for_model(model)
+        except KeyError:
+            enc = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(enc.encode_ordinary(text))
+    except Exception:  # pragma: no cover - tiktoken missing or offline
+        return lambda text: max(1, len(text) // 4)
+
+
+def _retryable(exc: BaseException) -> bool:
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    if status in _RETRY_STATUS:
+        return True
+    return any(cls.__name__ in _RETRY_NAMES for cls in type(exc).__mro__)
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class EmbeddingExecutor:
+    """Token-packed, throttled and retried ``embed_documents`` calls."""
+
+    def __init__(
+        self,
+        embeddings: Any,
+        model: str,
+        rpm: float | None = None,
+        tpm: float | None = None,
+        max_tokens: int | None = None,
+        max_inputs: int | None = None,
+        max_retries: int | None = None,
+    ):
+        self.embeddings = embeddings
+        self.limiter = RateLimiter(
+            rpm if rpm is not None else _env_num("EMBED_RPM", 3000),
+            tpm if tpm is not None else _env_num("EMBED_TPM", 1_000_000),
+        )
+        # OpenAI caps a request at 2048 inputs and 300k tokens.
+        self.max_tokens = int(max_tokens or _env_num("EMBED_BATCH_TOKENS", 100_000))
+        self.max_inputs = int(max_inputs or _env_num("EMBED_BATCH_INPUTS", 256))
+        self.max_retries = int(max_retries if max_retries is not None else _env_num("EMBED_MAX_RETRIES", 6))
+        self.count_tokens = token_counter(model)
+        self._lock = threading.Lock()
+        self.chunks = 0
+        self.tokens = 0
+        self.requests = 0
+        self.retries = 0
+        self.throttled_s = 0.0
+        self._started: float | None = None
+        self._finished: float | None = None
+
+    def pack(self, items: Iterable[T], text: Callable[[T], str]) -> Iterator[Tuple[List[T], List[int]]]:
+        """Group ``items`` into request-sized batches by token and input count, preserving order.
+
+        Yields ``(batch, token_counts)``; pass the counts to :meth:`embed`.
+        """
+        batch: List[T] = []
+        counts: List[int] = []
+        used = 0
+        for item in items:
+            n = self.count_tokens(text(item))
+            if batch and (used + n > self.max_tokens or len(batch) >= self.max_inputs):
+                yield batch, counts
+                batch, counts, used = [], [], 0
+            batch.append(item)
+            counts.append(n)
+            used += n
+        if batch:
+            yield batch, counts
+
+    def embed(self, texts: Sequence[str], tokens: Sequence[int] | None = None) -> List[List[float]]:
+        """Embed ``texts`` in throttled requests, retrying transient errors.
+
+        With ``tokens`` (per-text counts from :meth:`pack`) the texts are
+        one packed batch, or a subset of one, and go out as a single
+        request. Without it they are packed here first.
+        """
+        if tokens is not None:
+            return self._request(list(texts), sum(tokens))
+        out: List[List[float]] = []
+        for group, counts in self.pack(list(texts), lambda t: t):
+            out.extend(self._request(group, sum(counts)))
+        return out
+
+    def _request(self, texts: List[str], tokens: int) -> List[List[float]]:
+        with self._lock:
+            if self._started is None:
+                self._started = time.monotonic()
+        attempt = 0
+        while True:
+            waited = self.limiter.acquire(tokens)
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+                break
+            except Exception as e:
+                if attempt >= self.max_retries or not _retryable(e):
+                    raise
+                delay = _retry_after(e) or min(60.0, 2.0 ** attempt) * random.uniform(0.5, 1.5)
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                print(f"[embed] {type(e).__name__}; retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+            finally:
+                with self._lock:
+                    self.throttled_s += waited
+        with self._lock:
+            self.requests += 1
+            self.chunks += len(texts)
+            self.tokens += tokens
+            self._finished = time.monotonic()
+        return vectors
+
+    def stats(self) -> Tuple[int, int, float, float]:
+        """(chunks, tokens, chunks/s, tokens/s) over the span of embedding calls."""
+        with self._lock:
+            span = (self._finished or 0.0) - (self._started or 0.0)
+            if span <= 0:
+                return self.chunks, self.tokens, 0.0, 0.0
+            return self.chunks, self.tokens, self.chunks / span, self.tokens / span
+
+    def summary(self) -> str:
+        chunks, tokens, cps, tps = self.stats()
+        return (
+            f"embedded {chunks} chunks ({tokens} tokens) in {self.requests} request(s): "
+            f"{cps:.1f} chunks/s, {tps:.0f} tokens/s, {self.retries} retr{'y' if self.retries == 1 else 'ies'}, "
+            f"{self.throttled_s:.1f}s throttled"
+        )
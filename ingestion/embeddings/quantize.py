@@ -0,0 +1,232 @@
+"""Reduced-dimension and quantized embedding representations.
+
+``text-embedding-3-*`` models are Matryoshka-trained: a prefix of the vector,
+renormalised, is itself a usable embedding. On top of a (possibly truncated)
+prefix this module builds compact codes for a first-pass scan:
+
+- ``int8``: symmetric per-row scale, 4x smaller than float32.
+- ``binary``: sign bits packed 8 per byte, 32x smaller, scored by Hamming
+  distance.
+
+The shortlist from the codes is then rescored with full-precision vectors.
+Running the module prints recall@k and latency of every combination against
+exact full-size search on a local namespace::
+
+    python -m ingestion.embeddings.quantize --namespace ifrs-17 --dims 256 1024
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+MODES = ("none", "int8", "binary")
+SCORE_CHUNK = 65536
+
+if hasattr(np, "bitwise_count"):
+    _popcount = np.bitwise_count
+else:  # pragma: no cover - numpy < 2.0
+    _POP_LUT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def _popcount(x: np.ndarray) -> np.ndarray:
+        return _POP_LUT[x]
+
+
+def truncate(vectors: np.ndarray, dim: int | None) -> np.ndarray:
+    """Matryoshka prefix of ``dim`` components, renormalised to unit length."""
+    mat = np.asarray(vectors, dtype=np.float32)
+    if mat.ndim == 1:
+        mat = mat[None, :]
+    if dim:
+        mat = mat[:, :dim]
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+class QuantizedCodes:
+    """Compact codes over the first ``dim`` components of unit vectors."""
+
+    def __init__(self, mode: str, dim: int, codes: np.ndarray, scale: np.ndarray | None = None):
+        if mode not in ("int8", "binary"):
+            raise ValueError(f"Unknown quantization mode '{mode}' (expected 'int8' or 'binary')")
+        self.mode = mode
+        self.dim = dim
+        self.codes = codes
+        self.scale = scale
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, mode: str, dim: int | None = None) -> "QuantizedCodes":
+        dim = int(dim or np.asarray(vectors).shape[1])
+        parts: List[np.ndarray] = []
+        scales: List[np.ndarray] = []
+        for start in range(0, vectors.shape[0], SCORE_CHUNK):
+            block = truncate(vectors[start:start + SCORE_CHUNK], dim)
+            if mode == "binary":
+                parts.append(np.packbits(block > 0, axis=1))
+            else:
+                s = np.abs(block).max(axis=1)
+                s[s == 0] = 1.0
+                parts.append(np.round(block * (127.0 / s[:, None])).astype(np.int8))
+                scales.append((s / 127.0).astype(np.float32))
+        width = (dim + 7) // 8 if mode == "binary" else dim
+        dtype = np.uint8 if mode == "binary" else np.int8
+        codes = np.concatenate(parts) if parts else np.zeros((0, width), dtype=dtype)
+        scale = (np.concatenate(scales) if scales else np.zeros(0, np.float32)) if mode == "int8" else None
+        return cls(mode, dim, codes, scale)
+
+    @property
+    def nbytes_per_vector(self) -> int:
+        return int(self.codes.shape[1]) + (4 if self.scale is not None else 0)
+
+    def score(self, q: np.ndarray) -> np.ndarray:
+        """Approximate similarity of every row to unit query ``q`` (higher is closer)."""
+        qt = truncate(q, self.dim)[0]
+        out = np.empty(self.codes.shape[0], dtype=np.float32)
+        if self.mode == "binary":
+            qbits = np.packbits(qt > 0)
+            for start in range(0, self.codes.shape[0], SCORE_CHUNK):
+                block = self.codes[start:start + SCORE_CHUNK]
+                dist = _popcount(np.bitwise_xor(block, qbits)).sum(axis=1, dtype=np.int32)
+                out[start:start + block.shape[0]] = -dist
+            return out
+        assert self.scale is not None
+        for start in range(0, self.codes.shape[0], SCORE_CHUNK):
+            block = self.codes[start:start + SCORE_CHUNK].astype(np.float32)
+            out[start:start + block.shape[0]] = (block @ qt) * self.scale[start:start + block.shape[0]]
+        return out
+
+    def splice(self, rows: np.ndarray, vectors: np.ndarray, size: int) -> "QuantizedCodes":
+        """Codes grown to ``size`` rows with ``rows`` (re)encoded from ``vectors``.
+
+        ``vectors[i]`` is the new content of row ``rows[i]``; rows past the
+        current codes are appended. Only these rows are quantized.
+        """
+        fresh = QuantizedCodes.build(np.asarray(vectors, dtype=np.float32), self.mode, self.dim)
+        codes = np.empty((size, self.codes.shape[1]), dtype=self.codes.dtype)
+        codes[: self.codes.shape[0]] = self.codes[:size]
+        codes[rows] = fresh.codes
+        scale = None
+        if self.scale is not None:
+            assert fresh.scale is not None
+            scale = np.empty(size, dtype=np.float32)
+            scale[: self.scale.shape[0]] = self.scale[:size]
+            scale[rows] = fresh.scale
+        return QuantizedCodes(self.mode, self.dim, codes, scale)
+
+    def take(self, rows: np.ndarray) -> "QuantizedCodes":
+        scale = self.scale[rows] if self.scale is not None else None
+        return QuantizedCodes(self.mode, self.dim, self.codes[rows], scale)
+
+    def save(self, path: Path) -> None:
+        tmp = path.with_name(path.name + ".tmp")
+        arrays = {"mode": np.array(self.mode), "dim": np.array(self.dim), "codes": self.codes}
+        if self.scale is not None:
+            arrays["scale"] = self.scale
+        with tmp.open("wb") as f:
+            np.savez(f, **arrays)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "QuantizedCodes":
+        with np.load(path) as data:
+            scale = data["scale"] if "scale" in data.files else None
+            return cls(str(data["mode"]), int(data["dim"]), data["codes"], scale)
+
+
+def rescore_search(
+    vectors: np.ndarray, codes: QuantizedCodes, q: np.ndarray, k: int, rescore: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Shortlist ``k * rescore`` rows by code score, then rank them with ``vectors``."""
+    from ingestion.vectorstore.local import top_k
+
+    approx = codes.score(q)
+    shortlist = np.sort(top_k(approx, max(k, k * rescore)))
+    exact = np.asarray(vectors[shortlist], dtype=np.float32) @ q
+    best = top_k(exact, k)
+    return shortlist[best], exact[best]
+
+
+def compare(
+    vectors: np.ndarray, queries: np.ndarray, dims: List[int | None], modes: List[str], k: int, rescore: int
+) -> List[Dict[str, float | str | int]]:
+    """recall@k / latency of (dim, mode) configurations against full-size exact search."""
+    from ingestion.vectorstore.local import top_k
+
+    full = np.asarray(vectors, dtype=np.float32)
+    truth = [set(top_k(full @ q, k).tolist()) for q in queries]
+    rows: List[Dict[str, float | str | int]] = []
+    for dim in dims:
+        reduced = truncate(full, dim)
+        d = reduced.shape[1]
+        for mode in modes:
+            if mode == "none":
+                hits = 0
+                t0 = time.perf_counter()
+                for q, gt in zip(queries, truth):
+                    hits += len(gt & set(top_k(reduced @ truncate(q, d)[0], k).tolist()))
+                elapsed = time.perf_counter() - t0
+                nbytes = 4 * d
+            else:
+                codes = QuantizedCodes.build(full, mode, d)
+                hits = 0
+                t0 = time.perf_counter()
+                for q, gt in zip(queries, truth):
+                    idx, _ = rescore_search(full, codes, q, k, rescore)
+                    hits += len(gt & set(idx.tolist()))
+                elapsed = time.perf_counter() - t0
+                nbytes = codes.nbytes_per_vector
+            rows.append({
+                "dim": d,
+                "mode": mode,
+                "bytes": nbytes,
+                "recall": hits / (len(queries) * k),
+                "ms": 1000 * elapsed / len(queries),
+            })
+    return rows
+
+
+def main() -> None:
+    from ingestion.vectorstore.backend import local_dir
+    from ingestion.vectorstore.local import LocalVectorStore
+
+    parser = argparse.ArgumentParser(description="Compare reduced/quantized embeddings against full-size search.")
+    parser.add_argument("--namespace", required=True)
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 1024], help="Matryoshka prefix sizes")
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, default=4, help="Shortlist size as a multiple of k")
+    parser.add_argument("--queries", type=int, default=200, help="Stored vectors sampled as queries")
+    parser.add_argument(
+        "--apply",
+        choices=MODES,
+        default=None,
+        help="Persist codes of this mode for the namespace after the report ('none' removes them)",
+    )
+    parser.add_argument("--apply-dim", type=int, default=None, help="Prefix size for --apply (default: full)")
+    args = parser.parse_args()
+
+    store = LocalVectorStore(local_dir())
+    vectors = store._ns(args.namespace).state.vectors
+    if vectors.shape[0] == 0:
+        raise SystemExit(f"ERROR: local namespace '{args.namespace}' is empty.")
+    rng = np.random.default_rng(1)
+    sample = np.sort(rng.choice(vectors.shape[0], size=min(args.queries, vectors.shape[0]), replace=False))
+    queries = np.asarray(vectors[sample], dtype=np.float32)
+    dims: List[int | None] = [None] + [d for d in args.dims if d < vectors.shape[1]]
+
+    print(f"namespace={args.namespace} vectors={vectors.shape[0]} full_dim={vectors.shape[1]} k={args.k} rescore={args.rescore}x")
+    print(f"{'dim':>6} {'mode':>7} {'bytes/vec':>10} {'recall@k':>9} {'ms/query':>9}")
+    for r in compare(vectors, queries, dims, args.modes, args.k, args.rescore):
+        print(f"{r['dim']:>6} {r['mode']:>7} {r['bytes']:>10} {r['recall']:>9.4f} {r['ms']:>9.3f}")
+
+    if args.apply:
+        store.build_quantized(args.namespace, args.apply, args.apply_dim)
+        print(f"Applied quantization mode='{args.apply}' dim={args.apply_dim or vectors.shape[1]} to '{args.namespace}'.")
+
+
+if __name__ == "__main__":
+    main()
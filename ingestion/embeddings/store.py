@@ -0,0 +1,158 @@
+"""Persistent cache of chunk embeddings keyed by (chunk sha1, model, dimensions).
+
+Ingestion already derives a deterministic ``sha1`` per chunk; this store
+keeps the vector computed for it so re-ingesting after a namespace wipe or
+an index migration costs no embedding calls. Layout, one directory per
+model and requested dimension::
+
+    <root>/<model>@<dims|full>/meta.json     {"dim": d}
+    <root>/<model>@<dims|full>/keys.bin      20-byte sha1 digests, append-only
+    <root>/<model>@<dims|full>/vectors.f32   float32 rows of ``dim``, append-only
+
+Row ``i`` of ``vectors.f32`` belongs to key ``i``. Vectors are written
+before keys, so a crash mid-append leaves at most unreferenced rows, which
+are trimmed on the next open. Reads go through ``np.memmap``.
+"""
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+DEFAULT_EMBED_CACHE_DIR = "data/_cache/embeddings"
+_KEY_BYTES = 20
+
+
+def embed_cache_dir() -> Path:
+    return Path(os.getenv("EMBED_CACHE_DIR") or DEFAULT_EMBED_CACHE_DIR)
+
+
+class EmbeddingStore:
+    """Append-only float32 vectors for one (model, dimensions) pair."""
+
+    def __init__(self, model: str, dimensions: int | None = None, root: str | Path | None = None):
+        name = re.sub(r"[^A-Za-z0-9._-]+", "_", model) + f"@{dimensions or 'full'}"
+        self.path = (Path(root) if root else embed_cache_dir()) / name
+        self._lock = threading.Lock()
+        self.dim = 0
+        self._rows: Dict[bytes, int] = {}
+        self._mmap: np.memmap | None = None
+        self.hits = 0
+        self.misses = 0
+        self._open()
+
+    @property
+    def keys_path(self) -> Path:
+        return self.path / "keys.bin"
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.path / "vectors.f32"
+
+    def _open(self) -> None:
+        meta = self.path / "meta.json"
+        if not meta.is_file():
+            return
+        self.dim = int(json.loads(meta.read_text(encoding="utf-8"))["dim"])
+        raw = self.keys_path.read_bytes() if self.keys_path.is_file() else b""
+        n_vec = self.vectors_path.stat().st_size // (4 * self.dim) if self.vectors_path.is_file() else 0
+        n = min(len(raw) // _KEY_BYTES, n_vec)
+        # Trim a torn append so new rows line up with their keys again.
+        if len(raw) != n * _KEY_BYTES:
+            with self.keys_path.open("r+b") as f:
+                f.truncate(n * _KEY_BYTES)
+        if n_vec != n:
+            with self.vectors_path.open("r+b") as f:
+                f.truncate(n * 4 * self.dim)
+        self._rows = {raw[i * _KEY_BYTES:(i + 1) * _KEY_BYTES]: i for i in range(n)}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _vectors(self) -> np.memmap | None:
+        if self._mmap is None and self._rows:
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(len(self._rows), self.dim))
+        return self._mmap
+
+    def get_many(self, sha1s: Sequence[str]) -> List[List[float] | None]:
+        """Cached vectors for ``sha1s`` (hex digests), None where missing."""
+        with self._lock:
+            out: List[List[float] | None] = []
+            mat = self._vectors()
+            for s in sha1s:
+                row = self._rows.get(bytes.fromhex(s))
+                out.append(None if row is None or mat is None else mat[row].tolist())
+            hit = sum(v is not None for v in out)
+            self.hits += hit
+            self.misses += len(out) - hit
+            return out
+
+    def put_many(self, sha1s: Sequence[str], vectors: Sequence[Sequence[float]]) -> None:
+        with self._lock:
+            fresh: Dict[bytes, Sequence[float]] = {}
+            for s, v in zip(sha1s, vectors):
+                key = bytes.fromhex(s)
+                if key not in self._rows:
+                    fresh.setdefault(key, v)
+            if not fresh:
+                return
+            mat = np.asarray(list(fresh.values()), dtype=np.float32)
+            if not self.dim:
+                self.path.mkdir(parents=True, exist_ok=True)
+                self.dim = int(mat.shape[1])
+                (self.path / "meta.json").write_text(json.dumps({"dim": self.dim}), encoding="utf-8")
+            elif mat.shape[1] != self.dim:
+                raise ValueError(f"embedding dimension {mat.shape[1]} does not match cache dimension {self.dim}")
+            start = len(self._rows)
+            try:
+                with self.vectors_path.open("ab") as f:
+                    f.write(mat.tobytes())
+                with self.keys_path.open("ab") as f:
+                    f.write(b"".join(fresh))
+            except OSError:
+                # Roll both files back so later appends stay aligned.
+                for path, size in ((self.vectors_path, start * 4 * self.dim), (self.keys_path, start * _KEY_BYTES)):
+                    if path.exists():
+                        with path.open("r+b") as f:
+                            f.truncate(size)
+                raise
+            for i, key in enumerate(fresh):
+                self._rows[key] = start + i
+            self._mmap = None
+
+
+def embed_with_cache(
+    store: EmbeddingStore | None,
+    embed: Any,
+    sha1s: Sequence[str],
+    texts: Sequence[str],
+    tokens: Sequence[int] | None = None,
+) -> List[List[float]]:
+    """Vectors for ``texts``, calling ``embed(texts)`` only for sha1s the store lacks.
+
+    ``tokens`` holds per-text token counts; when given, the counts of the
+    texts sent are passed on as ``embed(texts, tokens)``.
+    """
+    if store is None:
+        return embed(list(texts)) if tokens is None else embed(list(texts), list(tokens))
+    vectors = store.get_many(sha1s)
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        sub = [texts[i] for i in missing]
+        fresh = embed(sub) if tokens is None else embed(sub, [tokens[i] for i in missing])
+        store.put_many([sha1s[i] for i in missing], fresh)
+        for i, v in zip(missing, fresh):
+            vectors[i] = list(v)
+    return vectors  # type: ignore[return-value]
+
+
+def default_embedding_store(model: str, dimensions: int | None) -> EmbeddingStore | None:
+    """The shared on-disk store, or None when EMBED_CACHE is 0/false/off."""
+    if os.getenv("EMBED_CACHE", "1").strip().lower() in {"0", "false", "no", "off"}:
+        return None
+    return EmbeddingStore(model, dimensions)
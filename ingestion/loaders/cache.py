@@ -0,0 +1,98 @@
+"""Content-addressed cache of extracted page text and metadata.
+
+Entries are keyed by a SHA-256 over the loader version tag and the file
+bytes, so renaming or touching a file still hits, while editing it or
+upgrading ``pypdf`` / ``langchain-community`` misses. Each entry is one
+gzip-compressed JSON file::
+
+    <root>/<key[:2]>/<key>.json.gz   {"pages": [{"text": ..., "metadata": {...}}, ...]}
+
+The ``source`` metadata value is rewritten to the path being loaded on a
+hit, since the same content may live under several paths.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import os
+from importlib import metadata as _pkg_metadata
+from pathlib import Path
+from typing import List
+
+from langchain_core.documents import Document
+
+DEFAULT_EXTRACT_CACHE_DIR = "data/_cache/extract"
+# Bump when extraction output changes for the same loader packages.
+EXTRACT_VERSION = 1
+_HASH_BLOCK = 1 << 20
+
+
+def _loader_tag() -> str:
+    parts = [f"extract={EXTRACT_VERSION}"]
+    for pkg in ("pypdf", "langchain-community"):
+        try:
+            parts.append(f"{pkg}={_pkg_metadata.version(pkg)}")
+        except _pkg_metadata.PackageNotFoundError:
+            parts.append(f"{pkg}=none")
+    return ";".join(parts)
+
+
+def extract_cache_dir() -> Path:
+    return Path(os.getenv("EXTRACT_CACHE_DIR") or DEFAULT_EXTRACT_CACHE_DIR)
+
+
+class ExtractionCache:
+    """Extracted documents per (file content, loader version)."""
+
+    def __init__(self, root: str | Path | None = None):
+        self.root = Path(root) if root else extract_cache_dir()
+        self.tag = _loader_tag()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, path: Path) -> str:
+        h = hashlib.sha256(self.tag.encode())
+        h.update(b"\0")
+        with path.open("rb") as f:
+            for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json.gz"
+
+    def has(self, key: str) -> bool:
+        return self._path(key).is_file()
+
+    def get(self, key: str, path: Path) -> List[Document] | None:
+        try:
+            with gzip.open(self._path(key), "rt", encoding="utf-8") as f:
+                pages = json.load(f)["pages"]
+        except (OSError, ValueError, KeyError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        docs: List[Document] = []
+        for p in pages:
+            meta = p.get("metadata") or {}
+            if "source" in meta:
+                meta["source"] = str(path)
+            docs.append(Document(page_content=p.get("text") or "", metadata=meta))
+        return docs
+
+    def put(self, key: str, docs: List[Document]) -> None:
+        target = self._path(key)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + f".{os.getpid()}.tmp")
+        payload = {"pages": [{"text": d.page_content, "metadata": d.metadata} for d in docs]}
+        with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+            json.dump(payload, f, separators=(",", ":"), default=str)
+        os.replace(tmp, target)
+
+
+def default_extraction_cache() -> ExtractionCache | None:
+    """The shared on-disk cache, or None when EXTRACT_CACHE is 0/false/off."""
+    if os.getenv("EXTRACT_CACHE", "1").strip().lower() in {"0", "false", "no", "off"}:
+        return None
+    return ExtractionCache()
@@ -0,0 +1,273 @@
+"""Parallel text extraction for ingestion.
+
+PDF parsing is CPU-bound and single-threaded inside ``pypdf``, so a corpus
+of large PDFs leaves most cores idle when files are loaded one by one.
+:func:`iter_extracted` fans the work out over a process pool: every file is
+one task, and PDFs longer than ``pages_per_task`` pages are split into page
+ranges that run on different workers. Files are yielded in input order
+(pages ascending) as soon as each one is complete, and every page carries
+the same ``page`` and document metadata ``PyPDFLoader`` would produce, so
+chunk hashes and IDs do not change with the worker count.
+
+With an :class:`~ingestion.loaders.cache.ExtractionCache`, files whose
+content was extracted before are served from the cache after a hash pass
+and never reach the pool.
+"""
+from __future__ import annotations
+
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Deque, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+from ingestion.loaders.cache import ExtractionCache
+
+DEFAULT_PAGES_PER_TASK = 32
+
+# (file position, path, first page, end page); pages are None for whole-file tasks.
+_Task = Tuple[int, str, Optional[int], Optional[int]]
+
+
+def default_workers() -> int:
+    raw = os.getenv("INGEST_WORKERS")
+    if raw:
+        try:
+            return max(1, int(raw))
+        except ValueError:
+            pass
+    return os.cpu_count() or 1
+
+
+def load_file(path: Path, cache: ExtractionCache | None = None) -> List[Document]:
+    key = None
+    if cache is not None:
+        key = cache.key(path)
+        cached = cache.get(key, path)
+        if cached is not None:
+            return cached
+    docs = _parse_file(path)
+    if key is not None and docs:
+        try:
+            cache.put(key, docs)
+        except OSError as e:  # pragma: no cover
+            print(f"[warn] unable to cache extraction of {path}: {e}")
+    return docs
+
+
+def _parse_file(path: Path) -> List[Document]:
+    # langchain_community takes about a second to import; only pay for it
+    # when a file actually has to be parsed (not for cache hits or --help).
+    from langchain_community.document_loaders import PyPDFLoader, TextLoader
+
+    suffix = path.suffix.lower()
+    if suffix == ".pdf":
+        return PyPDFLoader(str(path)).load()
+    elif suffix in {".txt", ".md"}:
+        try:
+            return TextLoader(str(path), encoding="utf-8").load()
+        except UnicodeDecodeError:
+            return TextLoader(str(path), encoding="latin1").load()
+    else:
+        return []
+
+
+def pdf_page_count(path: Path) -> int:
+    import pypdf
+
+    return len(pypdf.PdfReader(str(path)).pages)
+
+
+def load_pdf_pages(path: Path, start: int, stop: int) -> List[Document]:
+    """Pages ``[start, stop)`` of a PDF, as ``PyPDFLoader(path).load()[start:stop]`` would return them."""
+    import pypdf
+
+    try:
+        from langchain_community.document_loaders.parsers.pdf import (
+            PyPDFParser,
+            _merge_text_and_extras,
+            _purge_metadata,
+            _validate_metadata,
+        )
+    except ImportError:  # pragma: no cover - loader internals moved; parse the whole file
+        from langchain_community.document_loaders import PyPDFLoader
+
+        return PyPDFLoader(str(path)).load()[start:stop]
+
+    parser = PyPDFParser()  # PyPDFLoader's defaults
+    reader = pypdf.PdfReader(str(path))
+    doc_metadata = _purge_metadata(
+        {"producer": "PyPDF", "creator": "PyPDF", "creationdate": ""}
+        | dict(reader.metadata or {})
+        | {"source": str(path), "total_pages": len(reader.pages)}
+    )
+    docs: List[Document] = []
+    for page_number in range(start, min(stop, len(reader.pages))):
+        page = reader.pages[page_number]
+        if pypdf.__version__.startswith("3"):
+            text = page.extract_text()
+        else:
+            text = page.extract_text(extraction_mode=parser.extraction_mode, **parser.extraction_kwargs)
+        text = _merge_text_and_extras([parser.extract_images_from_page(page)], text).strip()
+        docs.append(Document(
+            page_content=text,
+            metadata=_validate_metadata(
+                doc_metadata | {"page": page_number, "page_label": reader.page_labels[page_number]}
+            ),
+        ))
+    return docs
+
+
+def _run(task: _Task) -> Tuple[_Task, List[Document]]:
+    _, path, start, stop = task
+    if start is None or stop is None:
+        return task, _parse_file(Path(path))
+    return task, load_pdf_pages(Path(path), start, stop)
+
+
+def _plan_file(i: int, f: Path, pages_per_task: int) -> List[_Task]:
+    pages = 0
+    if f.suffix.lower() == ".pdf":
+        try:
+            pages = pdf_page_count(f)
+        except Exception:
+            pages = 0  # let the worker surface the parse error via the normal loader
+    if pages > pages_per_task:
+        return [(i, str(f), start, min(start + pages_per_task, pages)) for start in range(0, pages, pages_per_task)]
+    return [(i, str(f), None, None)]
+
+
+def _cache_key(cache: ExtractionCache | None, f: Path) -> Tuple[str | None, bool]:
+    """``(key, cached)`` for ``f``; the cached pages themselves are not read."""
+    if cache is None:
+        return None, False
+    try:
+        key = cache.key(f)
+    except OSError as e:  # pragma: no cover
+        print(f"[warn] failed to hash {f}: {e}")
+        return None, False
+    return key, cache.has(key)
+
+
+def _cache_store(cache: ExtractionCache | None, key: str | None, f: Path, docs: List[Document]) -> None:
+    if cache is None or key is None or not docs:
+        return
+    try:
+        cache.put(key, docs)
+    except OSError as e:  # pragma: no cover
+        print(f"[warn] unable to cache extraction of {f}: {e}")
+
+
+def iter_extracted(
+    files: Sequence[Path],
+    workers: int | None = None,
+    pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+    progress: bool = True,
+    cache: ExtractionCache | None = None,
+) -> Iterator[Tuple[Path, List[Document]]]:
+    """Yield ``(path, documents)`` for every file, in input order, as extraction completes.
+
+    At most ``2 * workers`` tasks are in flight, so memory stays bounded by
+    the look-ahead rather than the corpus. ``workers=1`` loads everything in
+    this process, one file after another. A file that fails to load yields
+    an empty list and a warning.
+    """
+    workers = workers or default_workers()
+    t0 = time.perf_counter()
+
+    def report(n: int, f: Path, docs: List[Document], note: str = "") -> None:
+        if progress:
+            print(
+                f"[extract] {n}/{len(files)} {f.name}: {len(docs)} page(s){note} "
+                f"({time.perf_counter() - t0:.1f}s)"
+            )
+
+    if workers <= 1:
+        for n, f in enumerate(files, 1):
+            try:
+                docs = load_file(f, cache)
+            except Exception as e:  # pragma: no cover
+                print(f"[warn] failed to load {f}: {e}")
+                docs = []
+            report(n, f, docs)
+            yield f, docs
+        _report_cache(cache, progress)
+        return
+
+    window = 2 * workers
+    pages_per_task = max(1, pages_per_task)
+    # Files in input order: (path, cache key, served from cache, futures of its page ranges).
+    # A cached file takes one slot of the window until it is yielded and its
+    # pages are only read from the cache then, so a warm cache keeps the
+    # same bounded look-ahead as extraction.
+    pending: Deque[Tuple[Path, str | None, bool, List[Future]]] = deque()
+    in_flight = 0
+    upcoming = iter(enumerate(files))
+    done = 0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            # Keep the pool busy up to the look-ahead window.
+            while in_flight < window:
+                nxt = next(upcoming, None)
+                if nxt is None:
+                    break
+                i, f = nxt
+                key, cached = _cache_key(cache, f)
+                if cached:
+                    in_flight += 1
+                    pending.append((f, key, True, []))
+                    continue
+                futures = [pool.submit(_run, t) for t in _plan_file(i, f, pages_per_task)]
+                in_flight += len(futures)
+                pending.append((f, key, False, futures))
+            if not pending:
+                break
+            f, key, cached, futures = pending.popleft()
+            done += 1
+            if cached:
+                in_flight -= 1
+                assert cache is not None and key is not None
+                docs = cache.get(key, f)
+                if docs is not None:
+                    report(done, f, docs, " from cache")
+                    yield f, docs
+                    continue
+                # The entry vanished or is unreadable: extract the file after all.
+                futures = [pool.submit(_run, (done - 1, str(f), None, None))]
+                in_flight += 1
+            docs = []
+            try:
+                # Page ranges were planned in ascending order, so concatenating
+                # them restores the sequential result exactly.
+                for fut in futures:
+                    docs.extend(fut.result()[1])
+            except Exception as e:  # pragma: no cover
+                print(f"[warn] failed to load {f}: {e}")
+                docs = []
+                for fut in futures:
+                    fut.cancel()
+            else:
+                _cache_store(cache, key, f, docs)
+            in_flight -= len(futures)
+            report(done, f, docs)
+            yield f, docs
+    _report_cache(cache, progress)
+
+
+def extract_files(
+    files: Sequence[Path],
+    workers: int | None = None,
+    pages_per_task: int = DEFAULT_PAGES_PER_TASK,
+    progress: bool = True,
+    cache: ExtractionCache | None = None,
+) -> List[List[Document]]:
+    """Load ``files`` in parallel; returns one document list per file, in input order."""
+    return [docs for _, docs in iter_extracted(files, workers, pages_per_task, progress, cache)]
+
+
+def _report_cache(cache: ExtractionCache | None, progress: bool) -> None:
+    if cache is not None and progress and (cache.hits or cache.misses):
+        print(f"[extract] cache: {cache.hits} hit(s), {cache.misses} miss(es)")
@@ -0,0 +1,128 @@
+"""Per-namespace ingest manifests (``data/_manifests/<namespace>.json``).
+
+Besides per-file chunk counts and a ``generated_at`` stamp, a manifest
+lists every chunk ID under its source path (``chunk_ids``). Scripts use it
+to delete a file's vectors by ID (batched, no metadata filters) and to
+audit a namespace by comparing ID sets with what the index holds.
+
+Manifests written before ``chunk_ids`` existed only have counts;
+:func:`file_chunk_ids` returns None for them so callers can say so.
+"""
+from __future__ import annotations
+
+import datetime
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+MANIFEST_DIR = "data/_manifests"
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def manifest_dir() -> Path:
+    """Where manifests live: MANIFEST_DIR, default ``data/_manifests``.
+
+    Ingestion writes here and the API reads ``generated_at`` from here, so
+    both must resolve it the same way.
+    """
+    return Path(os.getenv("MANIFEST_DIR") or MANIFEST_DIR)
+
+
+def manifest_path(namespace: str | None, root: str | Path | None = None) -> Path:
+    return Path(root or manifest_dir()) / f"{namespace or 'default'}.json"
+
+
+def build_manifest(namespace: str | None, ids_by_source: Dict[str, Iterable[str]]) -> dict:
+    counts: Dict[str, int] = {}
+    chunk_ids: Dict[str, List[str]] = {}
+    for src, ids in sorted(ids_by_source.items()):
+        chunk_ids[src] = sorted(ids)
+        fn = Path(src).name
+        counts[fn] = counts.get(fn, 0) + len(chunk_ids[src])
+    return {
+        "namespace": namespace,
+        "generated_at": datetime.datetime.utcnow().isoformat() + "Z",
+        "total_unique_chunks": sum(counts.values()),
+        "files": [{"file_name": fn, "chunks": n} for fn, n in sorted(counts.items())],
+        "chunk_ids": chunk_ids,
+    }
+
+
+def write_manifest(
+    namespace: str | None, ids_by_source: Dict[str, Iterable[str]], root: str | Path | None = None
+) -> Path:
+    path = manifest_path(namespace, root)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(build_manifest(namespace, ids_by_source), f, indent=2)
+    tmp.replace(path)
+    return path
+
+
+def load_manifest(namespace: str | None, root: str | Path | None = None) -> dict | None:
+    path = manifest_path(namespace, root)
+    if not path.is_file():
+        return None
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+
+def chunk_ids(manifest: dict | None) -> Dict[str, Set[str]] | None:
+    """``{source: ids}`` from a manifest, or None if it predates chunk IDs."""
+    if not manifest or not isinstance(manifest.get("chunk_ids"), dict):
+        return None
+    return {src: set(ids) for src, ids in manifest["chunk_ids"].items()}
+
+
+def _same_file(source: str, path: str, repo_root: Path) -> bool:
+    if source == path:
+        return True
+    try:
+        return (repo_root / source).resolve() == (repo_root / path).resolve()
+    except OSError:
+        return False
+
+
+def file_chunk_ids(
+    manifest: dict | None, path: str, repo_root: Path = REPO_ROOT
+) -> Tuple[str, Set[str]] | None:
+    """``(source, ids)`` recorded for ``path`` (relative to the repo or absolute).
+
+    None when the manifest has no chunk IDs at all; an empty set when it
+    has them but not for this file.
+    """
+    by_source = chunk_ids(manifest)
+    if by_source is None:
+        return None
+    for src, ids in by_source.items():
+        if _same_file(src, path, repo_root):
+            return src, ids
+    return path, set()
+
+
+def forget_sources(namespace: str | None, sources: Iterable[str], root: str | Path | None = None) -> None:
+    """Drop ``sources`` from the manifest, the ingest state and the keyword index.
+
+    Call after deleting their vectors outside ingestion, so retrieval stops
+    matching them by keyword and the next ingest re-adds the files instead
+    of skipping them as unchanged.
+    """
+    from ingestion.pipelines.state import IngestState, state_dir
+    from ingestion.vectorstore.keyword import KeywordIndexStore
+
+    sources = set(sources)
+    by_source = chunk_ids(load_manifest(namespace, root))
+    if by_source is not None:
+        gone = [vid for s in sources for vid in by_source.get(s, ())]
+        kw = KeywordIndexStore().get(namespace or "")
+        if gone and kw.path.is_file() and kw.delete(gone):
+            kw.save()
+        write_manifest(namespace, {s: ids for s, ids in by_source.items() if s not in sources}, root)
+    if (state_dir() / f"{namespace or 'default'}.sqlite").is_file():
+        with IngestState(namespace) as state:
+            for src in sources:
+                state.forget(src)
@@ -0,0 +1,158 @@
+"""Per-namespace ingestion state for incremental re-ingests.
+
+One SQLite database per namespace (``<root>/<namespace>.sqlite``) records,
+for every ingested file, its size, mtime and content hash, plus the chunk
+IDs it produced. :func:`ingestion.cli.ingest` uses it to skip unchanged
+files, upsert only chunk IDs it has not written before and delete the IDs
+a file no longer produces (or all of them, when the file is gone).
+
+The ``checkpoint`` table holds chunk IDs a run has already upserted but
+not yet recorded for their file; an interrupted run resumes from it and
+skips those chunks.
+
+A ``meta`` table remembers the backend and embedding settings; if they
+change, the recorded state no longer describes the index and the next run
+re-ingests everything. It also records the chunking settings, whose change
+re-splits every file while keeping the old chunk IDs for cleanup.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Set
+
+DEFAULT_STATE_DIR = "data/_state"
+_HASH_BLOCK = 1 << 20
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    path TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (path, id)
+);
+CREATE INDEX IF NOT EXISTS chunks_id ON chunks (id);
+CREATE TABLE IF NOT EXISTS checkpoint (
+    path TEXT NOT NULL,
+    id TEXT NOT NULL,
+    PRIMARY KEY (path, id)
+);
+"""
+
+
+class FileRecord(NamedTuple):
+    size: int
+    mtime: float
+    sha256: str
+
+
+def state_dir() -> Path:
+    return Path(os.getenv("INGEST_STATE_DIR") or DEFAULT_STATE_DIR)
+
+
+def file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class IngestState:
+    """File and chunk-ID bookkeeping for one namespace; use from a single thread."""
+
+    def __init__(self, namespace: str | None, root: str | Path | None = None):
+        root = Path(root) if root else state_dir()
+        root.mkdir(parents=True, exist_ok=True)
+        self.path = root / f"{namespace or 'default'}.sqlite"
+        self.conn = sqlite3.connect(str(self.path))
+        self.conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self) -> "IngestState":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def settings(self) -> Dict[str, str]:
+        return dict(self.conn.execute("SELECT key, value FROM meta"))
+
+    def matches(self, settings: Dict[str, str]) -> bool:
+        """True if the recorded state was produced with the same ``settings``."""
+        recorded = self.settings()
+        return all(recorded.get(k) == v for k, v in settings.items())
+
+    def setting(self, key: str) -> str | None:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_setting(self, key: str, value: str) -> None:
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def reset(self, settings: Dict[str, str]) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM meta")
+            self.conn.execute("DELETE FROM files")
+            self.conn.execute("DELETE FROM chunks")
+            self.conn.execute("DELETE FROM checkpoint")
+            self.conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", settings.items())
+
+    def file(self, path: str) -> FileRecord | None:
+        row = self.conn.execute("SELECT size, mtime, sha256 FROM files WHERE path = ?", (path,)).fetchone()
+        return FileRecord(*row) if row else None
+
+    def paths(self) -> List[str]:
+        return [r[0] for r in self.conn.execute("SELECT path FROM files")]
+
+    def chunk_ids(self, path: str) -> Set[str]:
+        return {r[0] for r in self.conn.execute("SELECT id FROM chunks WHERE path = ?", (path,))}
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.conn.execute("SELECT path, COUNT(*) FROM chunks GROUP BY path"))
+
+    def ids_by_path(self) -> Dict[str, Set[str]]:
+        out: Dict[str, Set[str]] = {}
+        for path, vid in self.conn.execute("SELECT path, id FROM chunks"):
+            out.setdefault(path, set()).add(vid)
+        return out
+
+    def touch(self, path: str, size: int, mtime: float) -> None:
+        """Content unchanged but stat changed (e.g. copied back): refresh size/mtime only."""
+        with self.conn:
+            self.conn.execute("UPDATE files SET size = ?, mtime = ? WHERE path = ?", (size, mtime, path))
+
+    def record(self, path: str, rec: FileRecord, ids: Iterable[str]) -> None:
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (path, size, mtime, sha256) VALUES (?, ?, ?, ?)",
+                (path, rec.size, rec.mtime, rec.sha256),
+            )
+            self.conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+            self.conn.executemany("INSERT OR IGNORE INTO chunks (path, id) VALUES (?, ?)", ((path, i) for i in ids))
+            self.conn.execute("DELETE FROM checkpoint WHERE path = ?", (path,))
+
+    def forget(self, path: str) -> None:
+        with self.conn:
+            self.conn.execute("DELETE FROM files WHERE path = ?", (path,))
+            self.conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+            self.conn.execute("DELETE FROM checkpoint WHERE path = ?", (path,))
+
+    def checkpointed(self, path: str) -> Set[str]:
+        return {r[0] for r in self.conn.execute("SELECT id FROM checkpoint WHERE path = ?", (path,))}
+
+    def checkpoint(self, pairs: Iterable[tuple[str, str]]) -> None:
+        """Mark ``(path, chunk id)`` pairs as committed to the index."""
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO checkpoint (path, id) VALUES (?, ?)", pairs)
@@ -0,0 +1,105 @@
+"""Bounded, threaded generator stages for streaming ingestion.
+
+Each stage runs its producer in a background thread and hands items to
+the consumer through a ``queue.Queue(maxsize)``. A full queue blocks the
+producer, so a slow downstream stage (embedding, upserts) throttles the
+upstream ones instead of letting work pile up in memory. Exceptions raised
+by a producer are re-raised in the consumer, and closing the consumer
+stops the producer. :func:`ordered_map` runs one stage on several threads
+while still emitting results in input order.
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def prefetch(items: Iterable[T], maxsize: int = 4, name: str = "stage") -> Iterator[T]:
+    """Iterate ``items`` in a background thread, buffering at most ``maxsize`` of them."""
+    buf: "queue.Queue[object]" = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(obj: object) -> bool:
+        while not stop.is_set():
+            try:
+                buf.put(obj, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for item in items:
+                if not put(item):
+                    return
+        except BaseException as e:  # noqa: BLE001 - handed to the consumer
+            put(_Failure(e))
+            return
+        put(_DONE)
+
+    worker = threading.Thread(target=produce, name=f"ingest-{name}", daemon=True)
+    worker.start()
+    try:
+        while True:
+            obj = buf.get()
+            if obj is _DONE:
+                return
+            if isinstance(obj, _Failure):
+                raise obj.exc
+            yield obj  # type: ignore[misc]
+    finally:
+        stop.set()
+
+
+def bounded_map(fn: Callable[[T], R], items: Iterable[T], maxsize: int = 4, name: str = "map") -> Iterator[R]:
+    """``map(fn, items)`` computed one step ahead of the consumer in a background thread."""
+    return prefetch((fn(x) for x in items), maxsize=maxsize, name=name)
+
+
+def ordered_map(
+    fn: Callable[[T], R], items: Iterable[T], concurrency: int = 4, name: str = "map"
+) -> Iterator[R]:
+    """``map(fn, items)`` with up to ``concurrency`` calls in flight, results in input order.
+
+    Items are pulled only as results are consumed, so at most ``concurrency``
+    inputs and outputs are held at once.
+    """
+    concurrency = max(1, concurrency)
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"ingest-{name}")
+    window: Deque[Future] = deque()
+    try:
+        for item in items:
+            window.append(pool.submit(fn, item))
+            if len(window) >= concurrency:
+                yield window.popleft().result()
+        while window:
+            yield window.popleft().result()
+    finally:
+        for fut in window:
+            fut.cancel()
+        pool.shutdown(wait=False)
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    batch: List[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
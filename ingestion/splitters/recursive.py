@@ -0,0 +1,229 @@
+"""Offset-tracking recursive text splitter.
+
+:class:`RecursiveSplitter` applies the same hierarchical strategy as
+LangChain's ``RecursiveCharacterTextSplitter`` (default arguments, i.e.
+separators kept at the start of each piece and chunks whitespace-stripped):
+split on the first separator present, merge pieces up to ``chunk_size``
+with ``chunk_overlap`` carried over, and recurse with the next separator
+into pieces that are still too long. With character lengths it returns
+the same chunks.
+
+It works on ``(start, end)`` offsets into the original text instead of
+re-splitting and re-joining substrings: each separator level scans its span
+once with ``str.find``, merged chunks are contiguous slices, and the overlap
+window is a deque. Cost is linear in the text length times the number of
+separators, and every chunk carries its character offsets (and page span,
+see :meth:`RecursiveSplitter.split_documents`).
+"""
+from __future__ import annotations
+
+import bisect
+import json
+import os
+from collections import deque
+from typing import Callable, Deque, List, NamedTuple, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+DEFAULT_SEPARATORS = ("\n\n", "\n", " ", "")
+DEFAULT_CHUNK_SIZE = 1000
+DEFAULT_CHUNK_OVERLAP = 150
+# Placed between pages when ``join_pages`` splits a file as one text.
+PAGE_JOINER = "\n\n"
+
+
+class Chunk(NamedTuple):
+    text: str
+    start: int
+    end: int
+
+
+class RecursiveSplitter:
+    """Hierarchical separator splitting with character offsets.
+
+    ``length_function`` measures pieces (default: characters); pass a token
+    counter, or use :func:`token_splitter`, to size chunks in tokens.
+    ``unit`` only names the measure in :meth:`signature`.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+        separators: Sequence[str] = DEFAULT_SEPARATORS,
+        length_function: Callable[[str], int] | None = None,
+        unit: str = "chars",
+        join_pages: bool = False,
+    ):
+        if chunk_overlap > chunk_size:
+            raise ValueError(f"chunk_overlap ({chunk_overlap}) is larger than chunk_size ({chunk_size})")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.separators = tuple(separators) or DEFAULT_SEPARATORS
+        self.length_function = length_function
+        self.unit = unit
+        self.join_pages = join_pages
+
+    def signature(self) -> str:
+        """Settings that determine chunk boundaries (and so chunk IDs)."""
+        return json.dumps({
+            "size": self.chunk_size,
+            "overlap": self.chunk_overlap,
+            "separators": list(self.separators),
+            "unit": self.unit,
+            "join_pages": self.join_pages,
+        }, sort_keys=True, separators=(",", ":"))
+
+    def _measure(self, text: str, start: int, end: int) -> int:
+        if self.length_function is None:
+            return end - start
+        return self.length_function(text[start:end])
+
+    def _pieces(self, text: str, start: int, end: int, sep: str) -> List[Tuple[int, int]]:
+        if not sep:
+            return [(i, i + 1) for i in range(start, end)]
+        cuts = [start]
+        pos = text.find(sep, start, end)
+        while pos != -1:
+            cuts.append(pos)
+            pos = text.find(sep, pos + len(sep), end)
+        cuts.append(end)
+        return [(a, b) for a, b in zip(cuts, cuts[1:]) if a < b]
+
+    def _emit(self, text: str, start: int, end: int, out: List[Tuple[int, int]]) -> None:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            out.append((start, end))
+
+    def _merge(self, text: str, pieces: List[Tuple[int, int, int]], out: List[Tuple[int, int]]) -> None:
+        # Pieces keep their separator, so they are joined with "" -- which a
+        # custom length function may still count, as LangChain does.
+        sep = self.length_function("") if self.length_function is not None else 0
+        window: Deque[Tuple[int, int, int]] = deque()
+        total = 0
+        for a, b, n in pieces:
+            if window and total + n + sep > self.chunk_size:
+                self._emit(text, window[0][0], window[-1][1], out)
+                while total > self.chunk_overlap or (total + n + (sep if window else 0) > self.chunk_size and total > 0):
+                    total -= window.popleft()[2] + (sep if len(window) > 0 else 0)
+            window.append((a, b, n))
+            total += n + (sep if len(window) > 1 else 0)
+        if window:
+            self._emit(text, window[0][0], window[-1][1], out)
+
+    def _split(self, text: str, start: int, end: int, level: int, out: List[Tuple[int, int]]) -> None:
+        sep = self.separators[-1]
+        deeper = len(self.separators)
+        for i in range(level, len(self.separators)):
+            s = self.separators[i]
+            if not s:
+                sep = s
+                break
+            if text.find(s, start, end) != -1:
+                sep = s
+                deeper = i + 1
+                break
+        good: List[Tuple[int, int, int]] = []
+        for a, b in self._pieces(text, start, end, sep):
+            n = self._measure(text, a, b)
+            if n < self.chunk_size:
+                good.append((a, b, n))
+                continue
+            if good:
+                self._merge(text, good, out)
+                good = []
+            if deeper >= len(self.separators):
+                out.append((a, b))  # cannot split further; kept as is
+            else:
+                self._split(text, a, b, deeper, out)
+        if good:
+            self._merge(text, good, out)
+
+    def spans(self, text: str) -> List[Tuple[int, int]]:
+        """``(start, end)`` offsets of each chunk in ``text``."""
+        out: List[Tuple[int, int]] = []
+        if text:
+            self._split(text, 0, len(text), 0, out)
+        return out
+
+    def chunks(self, text: str) -> List[Chunk]:
+        return [Chunk(text[a:b], a, b) for a, b in self.spans(text)]
+
+    def split_text(self, text: str) -> List[str]:
+        return [text[a:b] for a, b in self.spans(text)]
+
+    def split_documents(self, docs: Sequence[Document]) -> List[Document]:
+        """Split page documents, adding ``start_index``/``end_index`` and ``page_end``.
+
+        By default each document is split on its own and offsets are into
+        its ``page_content``. With ``join_pages``, consecutive documents of
+        the same ``source`` are joined (``PAGE_JOINER``) and split as one
+        text so chunks can cross page breaks; offsets are then into the
+        joined text, ``page`` is the page a chunk starts on and
+        ``page_end`` the page it ends on.
+        """
+        if not self.join_pages:
+            out: List[Document] = []
+            for doc in docs:
+                meta = doc.metadata or {}
+                for a, b in self.spans(doc.page_content):
+                    md = {**meta, "start_index": a, "end_index": b}
+                    if isinstance(meta.get("page"), int):
+                        md["page_end"] = meta["page"]
+                    out.append(Document(page_content=doc.page_content[a:b], metadata=md))
+            return out
+        out = []
+        group: List[Document] = []
+        for doc in docs:
+            if group and (doc.metadata or {}).get("source") != (group[0].metadata or {}).get("source"):
+                out.extend(self._split_joined(group))
+                group = []
+            group.append(doc)
+        if group:
+            out.extend(self._split_joined(group))
+        return out
+
+    def _split_joined(self, pages: List[Document]) -> List[Document]:
+        starts: List[int] = []
+        pos = 0
+        for p in pages:
+            starts.append(pos)
+            pos += len(p.page_content) + len(PAGE_JOINER)
+        text = PAGE_JOINER.join(p.page_content for p in pages)
+        out: List[Document] = []
+        for a, b in self.spans(text):
+            first = pages[bisect.bisect_right(starts, a) - 1].metadata or {}
+            last = pages[bisect.bisect_right(starts, b - 1) - 1].metadata or {}
+            md = {**first, "start_index": a, "end_index": b}
+            if isinstance(last.get("page"), int):
+                md["page_end"] = last["page"]
+            out.append(Document(page_content=text[a:b], metadata=md))
+        return out
+
+
+def token_splitter(
+    model: str, chunk_size: int, chunk_overlap: int, join_pages: bool = False
+) -> RecursiveSplitter:
+    """A splitter measuring pieces in ``model`` tokens."""
+    from ingestion.embeddings.executor import token_counter
+
+    return RecursiveSplitter(
+        chunk_size, chunk_overlap, length_function=token_counter(model), unit=f"tokens:{model}", join_pages=join_pages
+    )
+
+
+def default_splitter(model: str) -> RecursiveSplitter:
+    """Splitter configured from CHUNK_SIZE, CHUNK_OVERLAP, CHUNK_UNIT and CHUNK_ACROSS_PAGES.
+
+    CHUNK_UNIT=tokens sizes chunks in ``model`` tokens; the default sizes
+    them in characters (1000 with 150 overlap, as ingestion always has).
+    """
+    size = int(os.getenv("CHUNK_SIZE") or DEFAULT_CHUNK_SIZE)
+    overlap = int(os.getenv("CHUNK_OVERLAP") or DEFAULT_CHUNK_OVERLAP)
+    join_pages = os.getenv("CHUNK_ACROSS_PAGES", "0").strip().lower() in {"1", "true", "yes", "on"}
+    if (os.getenv("CHUNK_UNIT") or "chars").strip().lower() == "tokens":
+        return token_splitter(model, size, overlap, join_pages=join_pages)
+    return RecursiveSplitter(size, overlap, join_pages=join_pages)
@@ -0,0 +1,114 @@
+"""Pluggable vector backends shared by ingestion and retrieval.
+
+A backend stores (id, vector, metadata) triples per namespace and answers
+top-k similarity queries. Query results use Pinecone's response shape
+(``{"matches": [{"id", "score", "metadata"}]}``, plus ``"values"`` when
+requested) so callers do not care which backend served them.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Protocol, Sequence
+
+DEFAULT_LOCAL_DIR = "data/_vectors"
+UPSERT_BATCH = 100
+
+
+class VectorBackend(Protocol):
+    def upsert(
+        self,
+        ids: Sequence[str],
+        vectors: Sequence[Sequence[float]],
+        metadatas: Sequence[Dict[str, Any]],
+        namespace: str,
+    ) -> int: ...
+
+    def query(
+        self, vector: Sequence[float], top_k: int, namespace: str, include_values: bool = False
+    ) -> Dict[str, Any]: ...
+
+    def fetch(self, ids: Sequence[str], namespace: str) -> Dict[str, List[float]]: ...
+
+    def delete(self, ids: Sequence[str], namespace: str) -> int: ...
+
+    def count(self, namespace: str) -> int: ...
+
+
+class PineconeBackend:
+    """Adapter over a Pinecone ``Index`` handle."""
+
+    def __init__(self, index: Any):
+        self.index = index
+
+    def upsert(self, ids, vectors, metadatas, namespace: str) -> int:
+        total = 0
+        for start in range(0, len(ids), UPSERT_BATCH):
+            batch = [
+                (ids[i], list(vectors[i]), metadatas[i])
+                for i in range(start, min(start + UPSERT_BATCH, len(ids)))
+            ]
+            self.index.upsert(vectors=batch, namespace=namespace)
+            total += len(batch)
+        return total
+
+    def query(self, vector, top_k: int, namespace: str, include_values: bool = False) -> Dict[str, Any]:
+        return self.index.query(
+            vector=list(vector),
+            top_k=top_k,
+            include_metadata=True,
+            include_values=include_values,
+            namespace=namespace,
+        )
+
+    def fetch(self, ids, namespace: str) -> Dict[str, List[float]]:
+        out: Dict[str, List[float]] = {}
+        ids = list(ids)
+        for start in range(0, len(ids), 100):
+            res = self.index.fetch(ids=ids[start:start + 100], namespace=namespace)
+            for vid, vec in (getattr(res, "vectors", None) or {}).items():
+                values = vec.get("values") if isinstance(vec, dict) else getattr(vec, "values", None)
+                if values:
+                    out[vid] = list(values)
+        return out
+
+    def delete(self, ids, namespace: str) -> int:
+        ids = list(ids)
+        for start in range(0, len(ids), 1000):
+            self.index.delete(ids=ids[start:start + 1000], namespace=namespace)
+        return len(ids)
+
+    def count(self, namespace: str) -> int:
+        stats = self.index.describe_index_stats()
+        namespaces = getattr(stats, "namespaces", None)
+        if namespaces is None and isinstance(stats, dict):
+            namespaces = stats.get("namespaces")
+        ns = (namespaces or {}).get(namespace)
+        if ns is None:
+            return 0
+        n = getattr(ns, "vector_count", None)
+        if n is None and isinstance(ns, dict):
+            n = ns.get("vector_count")
+        return int(n or 0)
+
+
+def local_dir() -> Path:
+    return Path(os.getenv("LOCAL_VECTOR_DIR") or DEFAULT_LOCAL_DIR)
+
+
+def open_backend(name: str, index: Any = None, root: str | Path | None = None) -> VectorBackend:
+    """Return a backend by name: ``"pinecone"`` (needs ``index``) or ``"local"``."""
+    name = (name or "pinecone").strip().lower()
+    if name == "local":
+        from ingestion.vectorstore.local import LocalVectorStore
+
+        return LocalVectorStore(
+            root or local_dir(),
+            nprobe=int(os.getenv("LOCAL_IVF_NPROBE") or 8),
+            rescore=int(os.getenv("LOCAL_RESCORE") or 4),
+        )
+    if name == "pinecone":
+        if index is None:
+            raise ValueError("Pinecone backend requires an Index handle")
+        return PineconeBackend(index)
+    raise ValueError(f"Unknown vector backend '{name}' (expected 'pinecone' or 'local')")
@@ -0,0 +1,188 @@
+"""Inverted-file (IVF) approximate nearest-neighbour index for local namespaces.
+
+A spherical k-means coarse quantizer splits a namespace's unit vectors into
+``nlist`` cells. A query scores the centroids, scans only the ``nprobe`` best
+cells and ranks those candidates exactly, so search cost drops roughly by
+``nlist / nprobe`` at a small loss of recall.
+
+The index is persisted next to the namespace files as ``ivf.npz``
+(centroids + one cell id per stored row) and kept in step with upserts and
+deletes by :mod:`ingestion.vectorstore.local`.
+
+Build an index and report recall@k against exact search::
+
+    python -m ingestion.vectorstore.ivf --namespace ifrs-17 --nlist 256 --nprobe 8
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+ASSIGN_CHUNK = 65536
+
+
+def default_nlist(n: int) -> int:
+    """Rule of thumb: about 4 * sqrt(N) cells, at least 1."""
+    return max(1, min(n, int(4 * np.sqrt(max(n, 1)))))
+
+
+def _nearest(x: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    out = np.empty(x.shape[0], dtype=np.int32)
+    for start in range(0, x.shape[0], ASSIGN_CHUNK):
+        block = np.asarray(x[start:start + ASSIGN_CHUNK], dtype=np.float32)
+        out[start:start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def _normalize(c: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(c, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (c / norms).astype(np.float32)
+
+
+def train_kmeans(
+    x: np.ndarray, nlist: int, iters: int = 20, max_train: int = 256, seed: int = 0
+) -> np.ndarray:
+    """Spherical k-means on unit rows; trains on at most ``max_train * nlist`` samples."""
+    rng = np.random.default_rng(seed)
+    n = x.shape[0]
+    nlist = max(1, min(nlist, n))
+    sample_n = min(n, max_train * nlist)
+    sample_idx = np.sort(rng.choice(n, size=sample_n, replace=False)) if sample_n < n else np.arange(n)
+    sample = np.asarray(x[sample_idx], dtype=np.float32)
+    centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = _nearest(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, sample)
+        counts = np.bincount(assign, minlength=nlist)
+        empty = np.flatnonzero(counts == 0)
+        if empty.size:
+            # Re-seed empty cells from random samples to keep all lists in use.
+            sums[empty] = sample[rng.choice(sample.shape[0], size=empty.size, replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+
+class IVFIndex:
+    """Coarse quantizer plus per-row cell assignment; immutable once built."""
+
+    def __init__(self, centroids: np.ndarray, assign: np.ndarray):
+        self.centroids = np.asarray(centroids, dtype=np.float32)
+        self.assign = np.asarray(assign, dtype=np.int32)
+        self.order = np.argsort(self.assign, kind="stable")
+        self.offsets = np.searchsorted(self.assign[self.order], np.arange(self.nlist + 1))
+
+    @property
+    def nlist(self) -> int:
+        return int(self.centroids.shape[0])
+
+    @property
+    def size(self) -> int:
+        return int(self.assign.shape[0])
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, nlist: int | None = None, iters: int = 20, seed: int = 0) -> "IVFIndex":
+        centroids = train_kmeans(vectors, nlist or default_nlist(vectors.shape[0]), iters=iters, seed=seed)
+        return cls(centroids, _nearest(vectors, centroids))
+
+    def assign_rows(self, rows: np.ndarray) -> np.ndarray:
+        return _nearest(rows, self.centroids)
+
+    def with_assign(self, assign: np.ndarray) -> "IVFIndex":
+        return IVFIndex(self.centroids, assign)
+
+    def search(self, vectors: np.ndarray, q: np.ndarray, k: int, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (row indices, scores) of the best ``k`` rows among ``nprobe`` cells."""
+        nprobe = max(1, min(nprobe, self.nlist))
+        cell_scores = self.centroids @ q
+        cells = np.argpartition(-cell_scores, nprobe - 1)[:nprobe]
+        cand = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in cells])
+        if cand.size == 0:
+            return cand, np.empty(0, dtype=np.float32)
+        cand.sort()  # sequential reads from the mmap
+        scores = np.asarray(vectors[cand]) @ q
+        k = min(k, cand.size)
+        top = np.argpartition(-scores, k - 1)[:k] if k < cand.size else np.arange(cand.size)
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return cand[top], scores[top]
+
+    def save(self, path: Path) -> None:
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as f:
+            np.savez(f, centroids=self.centroids, assign=self.assign)
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "IVFIndex":
+        with np.load(path) as data:
+            return cls(data["centroids"], data["assign"])
+
+
+def recall_at_k(
+    vectors: np.ndarray, index: IVFIndex, queries: np.ndarray, k: int, nprobe: int
+) -> Dict[str, float]:
+    """Mean recall@k of IVF search against exact search, with per-query latencies."""
+    from ingestion.vectorstore.local import top_k
+
+    hits = 0
+    exact_s = 0.0
+    ivf_s = 0.0
+    for q in queries:
+        t0 = time.perf_counter()
+        exact = set(top_k(np.asarray(vectors) @ q, k).tolist())
+        t1 = time.perf_counter()
+        approx, _ = index.search(vectors, q, k, nprobe)
+        t2 = time.perf_counter()
+        exact_s += t1 - t0
+        ivf_s += t2 - t1
+        hits += len(exact & set(approx.tolist()))
+    n = max(len(queries), 1)
+    return {
+        "recall": hits / (n * k),
+        "exact_ms": 1000 * exact_s / n,
+        "ivf_ms": 1000 * ivf_s / n,
+    }
+
+
+def main() -> None:
+    from ingestion.vectorstore.backend import local_dir
+    from ingestion.vectorstore.local import LocalVectorStore
+
+    parser = argparse.ArgumentParser(description="Build an IVF index for a local namespace and report recall@k.")
+    parser.add_argument("--namespace", required=True)
+    parser.add_argument("--nlist", type=int, default=None, help="Number of cells (default: 4*sqrt(N))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16], help="nprobe values to evaluate")
+    parser.add_argument("--iters", type=int, default=20, help="k-means iterations")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200, help="Stored vectors sampled as queries")
+    parser.add_argument("--no-build", action="store_true", help="Evaluate the existing index only")
+    args = parser.parse_args()
+
+    store = LocalVectorStore(local_dir())
+    if not args.no_build:
+        t0 = time.perf_counter()
+        index = store.build_ivf(args.namespace, nlist=args.nlist, iters=args.iters)
+        print(f"Built IVF nlist={index.nlist} over {index.size} vectors in {time.perf_counter() - t0:.2f}s")
+    state = store._ns(args.namespace).state
+    vectors, index = state.vectors, state.ivf
+    if index is None:
+        raise SystemExit(f"ERROR: namespace '{args.namespace}' has no IVF index.")
+
+    rng = np.random.default_rng(1)
+    sample = rng.choice(vectors.shape[0], size=min(args.queries, vectors.shape[0]), replace=False)
+    queries: List[np.ndarray] = [np.asarray(vectors[i], dtype=np.float32) for i in np.sort(sample)]
+    print(f"recall@{args.k} over {len(queries)} queries:")
+    for nprobe in args.nprobe:
+        r = recall_at_k(vectors, index, np.stack(queries), args.k, nprobe)
+        print(
+            f"  nprobe={nprobe:<4d} recall={r['recall']:.4f}  ivf={r['ivf_ms']:.3f}ms  exact={r['exact_ms']:.3f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""Per-namespace BM25 keyword index over ingested chunks.
+
+Dense search is weak on exact references such as "section 67C", "LRC" or
+"CSM". Ingestion therefore also writes a small inverted index for every
+namespace, keyed by the same chunk IDs it upserts, and retrieval can fuse
+keyword and vector rankings (see ``rag_core``).
+
+Layout: ``<root>/<namespace>.json`` holding, per chunk ID, its term
+frequencies, token count and metadata (including the chunk ``text``).
+Postings and document frequencies are rebuilt in memory on load.
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+DEFAULT_KEYWORD_DIR = "data/_keyword"
+
+# Keeps section numbers and suffixed references together: "67C" -> "67c",
+# "3.2.1" stays one token, "IFRS 17" -> "ifrs", "17".
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:\.[0-9]+)*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were what which with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+def keyword_dir() -> Path:
+    return Path(os.getenv("KEYWORD_INDEX_DIR") or DEFAULT_KEYWORD_DIR)
+
+
+class BM25Index:
+    """Okapi BM25 over one namespace; add/delete by chunk ID."""
+
+    def __init__(self, path: Path, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._docs: Dict[str, Dict[str, Any]] = {}
+        # (postings, docs, avgdl) built together; queries read only this.
+        self._snapshot: Tuple[Dict[str, List[Tuple[str, int]]], Dict[str, Dict[str, Any]], float] | None = None
+        self._mtime = 0.0
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            self._mtime = self.path.stat().st_mtime
+        except OSError:
+            return
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        self._docs = data.get("docs") or {}
+        self._snapshot = None
+
+    def refresh(self) -> None:
+        """Reload if another process (e.g. a re-ingest) rewrote the file."""
+        try:
+            mtime = self.path.stat().st_mtime
+        except OSError:
+            return
+        if mtime != self._mtime:
+            with self._lock:
+                self._load()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def ids(self) -> List[str]:
+        return list(self._docs)
+
+    def upsert(self, ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[Dict[str, Any]]) -> int:
+        with self._lock:
+            for vid, text, meta in zip(ids, texts, metadatas):
+                toks = tokenize(text)
+                self._docs[vid] = {"len": len(toks), "tf": dict(Counter(toks)), "meta": {**(meta or {}), "text": text}}
+            self._snapshot = None
+        return len(ids)
+
+    def delete(self, ids: Sequence[str]) -> int:
+        with self._lock:
+            n = sum(1 for vid in ids if self._docs.pop(vid, None) is not None)
+            if n:
+                self._snapshot = None
+        return n
+
+    def save(self) -> None:
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps({"docs": self._docs}), encoding="utf-8")
+            os.replace(tmp, self.path)
+            self._mtime = self.path.stat().st_mtime
+
+    def _index(self) -> Tuple[Dict[str, List[Tuple[str, int]]], Dict[str, Dict[str, Any]], float]:
+        """Postings plus the docs they were built from, consistent even if a reload swaps ``_docs``."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None:
+                docs = dict(self._docs)
+                built: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+                total = 0
+                for vid, doc in docs.items():
+                    total += doc["len"]
+                    for term, tf in doc["tf"].items():
+                        built[term].append((vid, tf))
+                self._snapshot = (dict(built), docs, total / len(docs) if docs else 0.0)
+            return self._snapshot
+
+    def query(self, text: str, top_k: int) -> Dict[str, Any]:
+        """Top-k chunks by BM25, in the same response shape as vector queries."""
+        postings, docs, avgdl = self._index()
+        n = len(docs)
+        if not n:
+            return {"matches": []}
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(text)):
+            plist = postings.get(term)
+            if not plist:
+                continue
+            idf = math.log(1 + (n - len(plist) + 0.5) / (len(plist) + 0.5))
+            for vid, tf in plist:
+                dl = docs[vid]["len"]
+                norm = self.k1 * (1 - self.b + self.b * dl / (avgdl or 1.0))
+                scores[vid] += idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+        return {
+            "matches": [
+                {"id": vid, "score": score, "metadata": docs[vid]["meta"]} for vid, score in best
+            ]
+        }
+
+
+class KeywordIndexStore:
+    """Lazily opened BM25 indexes, one per namespace, under ``root``."""
+
+    def __init__(self, root: str | Path | None = None):
+        self.root = Path(root) if root else keyword_dir()
+        self._lock = threading.Lock()
+        self._indexes: Dict[str, BM25Index] = {}
+
+    def get(self, namespace: str) -> BM25Index:
+        name = namespace or "default"
+        index = self._indexes.get(name)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(name)
+                if index is None:
+                    index = BM25Index(self.root / f"{name}.json")
+                    self._indexes[name] = index
+        return index
+
+    def query(self, text: str, top_k: int, namespace: str) -> Dict[str, Any]:
+        index = self.get(namespace)
+        index.refresh()
+        return index.query(text, top_k)
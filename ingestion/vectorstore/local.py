@@ -0,0 +1,399 @@
+"""Local NumPy vector store with memory-mapped namespaces.
+
+Layout under the store root, one directory per namespace::
+
+    <root>/<namespace>/vectors.f32   raw float32 rows (N x dim), L2-normalised
+    <root>/<namespace>/ids.jsonl     {"dim": dim}, then one [row, id, metadata] line per write
+
+    <root>/<namespace>/ivf.npz       optional IVF index (see ingestion.vectorstore.ivf)
+    <root>/<namespace>/quant.npz     optional int8/binary codes (see ingestion.embeddings.quantize)
+
+``vectors.f32`` is memory-mapped read-only, so startup costs a file open
+regardless of size; pages are faulted in by the first queries. Search is an
+exact cosine top-k: one matrix-vector product plus ``argpartition``, or an
+IVF probe of ``nprobe`` cells when the namespace has an index, or a scan of
+quantized codes whose shortlist is rescored in full precision. The IVF
+index takes precedence: quantized codes are ignored while one exists, and
+a warning says so. Quantized codes are kept next to the float32 rows, which
+the rescoring step needs, so they speed up the scan but add storage.
+
+Upserts cost O(batch), not O(namespace): new rows are appended to
+``vectors.f32``, rows of existing IDs are overwritten in place, and one
+line per written row is appended to ``ids.jsonl`` (a later line for a row
+replaces its metadata). Deletes compact both files, as does an upsert once
+the log holds twice as many lines as rows. An existing IVF index assigns
+new rows to their nearest cell and existing quantized codes get codes for
+just the written rows.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Sequence
+
+import numpy as np
+
+from ingestion.embeddings.quantize import QuantizedCodes, rescore_search
+from ingestion.vectorstore.ivf import IVFIndex
+
+
+def _unit_rows(vectors: Any) -> np.ndarray:
+    mat = np.asarray(vectors, dtype=np.float32)
+    if mat.ndim == 1:
+        mat = mat[None, :]
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the ``k`` highest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        idx = np.argpartition(-scores, k - 1)[:k]
+    else:
+        idx = np.arange(scores.shape[0])
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+class _State(NamedTuple):
+    vectors: np.ndarray
+    ids: List[str]
+    metadata: List[Dict[str, Any]]
+    pos: Dict[str, int]
+    ivf: IVFIndex | None = None
+    quant: QuantizedCodes | None = None
+
+
+class _Namespace:
+    def __init__(self, path: Path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.dim = 0
+        # Readers take one _State snapshot and only look at its first
+        # ``len(vectors)`` rows. Upserts grow ids/metadata/pos in place past
+        # that bound (and overwrite rows of existing IDs) before publishing a
+        # new snapshot; deletes build a fresh generation of everything.
+        self.state = _State(np.zeros((0, 0), dtype=np.float32), [], [], {})
+        self.log_lines = 0
+        self._load()
+
+    @property
+    def vectors_path(self) -> Path:
+        return self.path / "vectors.f32"
+
+    @property
+    def log_path(self) -> Path:
+        return self.path / "ids.jsonl"
+
+    @property
+    def ivf_path(self) -> Path:
+        return self.path / "ivf.npz"
+
+    @property
+    def quant_path(self) -> Path:
+        return self.path / "quant.npz"
+
+    @property
+    def size(self) -> int:
+        return int(self.state.vectors.shape[0])
+
+    @property
+    def ids(self) -> List[str]:
+        return self.state.ids[: self.size]
+
+    def _map(self, n: int) -> np.ndarray:
+        if n == 0:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+
+    def _load(self) -> None:
+        if not self.log_path.is_file() or not self.vectors_path.is_file():
+            return
+        raw = self.log_path.read_bytes()
+        if raw and not raw.endswith(b"\n"):
+            # A write was cut short; drop the partial line so appends stay parseable.
+            raw = raw[: raw.rfind(b"\n") + 1]
+            with self.log_path.open("r+b") as f:
+                f.truncate(len(raw))
+        lines = raw.splitlines()
+        if not lines:
+            return
+        self.dim = int(json.loads(lines[0])["dim"])
+        ids: List[str] = []
+        metadata: List[Dict[str, Any]] = []
+        for line in lines[1:]:
+            row, vid, meta = json.loads(line)
+            if row == len(ids):
+                ids.append(vid)
+                metadata.append(meta)
+            else:
+                metadata[row] = meta
+        # Rows appended to vectors.f32 by a write whose log lines never landed are ignored.
+        n = min(len(ids), os.path.getsize(self.vectors_path) // (4 * self.dim or 1))
+        del ids[n:], metadata[n:]
+        ivf: IVFIndex | None = None
+        if self.ivf_path.is_file():
+            ivf = IVFIndex.load(self.ivf_path)
+            if ivf.size != n:
+                print(f"[warn] ignoring stale IVF index at {self.ivf_path}; rebuild it")
+                ivf = None
+        quant: QuantizedCodes | None = None
+        if self.quant_path.is_file():
+            quant = QuantizedCodes.load(self.quant_path)
+            if quant.codes.shape[0] != n:
+                print(f"[warn] ignoring stale quantized codes at {self.quant_path}; rebuild them")
+                quant = None
+        self._warn_unused_quant(ivf, quant)
+        self.log_lines = len(lines) - 1
+        self.state = _State(self._map(n), ids, metadata, {vid: i for i, vid in enumerate(ids)}, ivf, quant)
+
+    def _write_log(self, ids: List[str], metadata: List[Dict[str, Any]]) -> None:
+        """Replace ``ids.jsonl`` with one line per row."""
+        tmp_log = self.path / "ids.jsonl.tmp"
+        with tmp_log.open("w", encoding="utf-8") as f:
+            f.write(json.dumps({"dim": self.dim}) + "\n")
+            for i, (vid, meta) in enumerate(zip(ids, metadata)):
+                f.write(json.dumps([i, vid, meta]) + "\n")
+        os.replace(tmp_log, self.log_path)
+        self.log_lines = len(ids)
+
+    def _rewrite(self, new: _State) -> None:
+        """Write ``new`` (rows in memory) as a compacted generation and publish it."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_vec = self.path / "vectors.f32.tmp"
+        with tmp_vec.open("wb") as f:
+            np.ascontiguousarray(new.vectors, dtype=np.float32).tofile(f)
+        # Serve the in-memory rows while the files are swapped; this also
+        # releases our mmap, which Windows requires before os.replace.
+        self.state = new._replace(pos={vid: i for i, vid in enumerate(new.ids)})
+        os.replace(tmp_vec, self.vectors_path)
+        self._write_log(new.ids, new.metadata)
+        self._save_indexes(new.ivf, new.quant)
+        self.state = self.state._replace(vectors=self._map(len(new.ids)))
+
+    def _save_indexes(self, ivf: IVFIndex | None, quant: QuantizedCodes | None) -> None:
+        for obj, path in ((ivf, self.ivf_path), (quant, self.quant_path)):
+            if obj is not None:
+                obj.save(path)
+            elif path.exists():
+                path.unlink()
+
+    def upsert(self, ids: Sequence[str], vectors: Any, metadatas: Sequence[Dict[str, Any]]) -> int:
+        rows = _unit_rows(vectors)
+        if rows.shape[0] != len(ids):
+            raise ValueError("ids and vectors must have the same length")
+        # Last write wins for IDs repeated within the batch, as in Pinecone.
+        last = {vid: i for i, vid in enumerate(ids)}
+        keep = sorted(last.values())
+        with self.lock:
+            cur = self.state
+            n = cur.vectors.shape[0]
+            if n and rows.shape[1] != self.dim:
+                raise ValueError(f"dimension {rows.shape[1]} does not match namespace dimension {self.dim}")
+            if not n:
+                self.dim = rows.shape[1]
+            if len(cur.ids) > n:
+                # Left over by an upsert that failed before publishing.
+                for vid in cur.ids[n:]:
+                    cur.pos.pop(vid, None)
+                del cur.ids[n:], cur.metadata[n:]
+            overwrite: List[tuple[int, int]] = []  # (row, batch index)
+            appended: List[int] = []
+            for i in keep:
+                j = cur.pos.get(ids[i])
+                if j is None:
+                    appended.append(i)
+                else:
+                    overwrite.append((j, i))
+            self.path.mkdir(parents=True, exist_ok=True)
+            if not self.log_path.is_file() or not n:
+                self.log_path.write_text(json.dumps({"dim": self.dim}) + "\n", encoding="utf-8")
+                self.log_lines = 0
+            row_bytes = 4 * self.dim
+            with self.vectors_path.open("r+b" if self.vectors_path.is_file() else "w+b") as f:
+                for j, i in sorted(overwrite):
+                    f.seek(j * row_bytes)
+                    f.write(rows[i].tobytes())
+                # Start at row n: bytes past it are leftovers of an interrupted write.
+                f.seek(n * row_bytes)
+                f.write(rows[appended].tobytes())
+                f.truncate((n + len(appended)) * row_bytes)
+            with self.log_path.open("a", encoding="utf-8") as f:
+                for j, i in overwrite:
+                    f.write(json.dumps([j, ids[i], dict(metadatas[i] or {})]) + "\n")
+                for k, i in enumerate(appended):
+                    f.write(json.dumps([n + k, ids[i], dict(metadatas[i] or {})]) + "\n")
+            self.log_lines += len(keep)
+            # Grow the shared lists past the published bound, then publish.
+            for j, i in overwrite:
+                cur.metadata[j] = dict(metadatas[i] or {})
+            for k, i in enumerate(appended):
+                cur.ids.append(ids[i])
+                cur.metadata.append(dict(metadatas[i] or {}))
+                cur.pos[ids[i]] = n + k
+            size = n + len(appended)
+            touched = np.array([j for j, _ in overwrite] + list(range(n, size)), dtype=np.int64)
+            batch = rows[[i for _, i in overwrite] + appended]
+            ivf = cur.ivf
+            if ivf is not None:
+                # Incremental add: (re)assign only the rows touched by this batch.
+                assign = np.concatenate([ivf.assign, np.zeros(len(appended), dtype=np.int32)])
+                assign[touched] = ivf.assign_rows(batch)
+                ivf = ivf.with_assign(assign)
+            quant = cur.quant
+            if quant is not None:
+                # Likewise only the touched rows are quantized and spliced in.
+                quant = quant.splice(touched, batch, size)
+            vectors = self._map(size)
+            self._save_indexes(ivf, quant)
+            self.state = _State(vectors, cur.ids, cur.metadata, cur.pos, ivf, quant)
+            if self.log_lines > 2 * max(size, 1):
+                # Mostly overwrites: fold the log back to one line per row.
+                self._write_log(cur.ids[:size], cur.metadata[:size])
+        return len(ids)
+
+    def delete(self, ids: Sequence[str]) -> int:
+        with self.lock:
+            cur = self.state
+            n = cur.vectors.shape[0]
+            drop = {cur.pos[vid] for vid in ids if vid in cur.pos}
+            if not drop:
+                return 0
+            keep = np.array([i for i in range(n) if i not in drop], dtype=np.int64)
+            if keep.size:
+                mat = np.asarray(cur.vectors)[keep]
+            else:
+                mat = np.zeros((0, self.dim), dtype=np.float32)
+            self._rewrite(_State(
+                mat,
+                [cur.ids[i] for i in keep],
+                [cur.metadata[i] for i in keep],
+                {},
+                cur.ivf.with_assign(cur.ivf.assign[keep]) if cur.ivf is not None else None,
+                cur.quant.take(keep) if cur.quant is not None else None,
+            ))
+        return len(drop)
+
+    def build_ivf(self, nlist: int | None, iters: int) -> IVFIndex:
+        with self.lock:
+            if not self.size:
+                raise ValueError(f"namespace at {self.path} is empty")
+            ivf = IVFIndex.train(self.state.vectors, nlist=nlist, iters=iters)
+            ivf.save(self.ivf_path)
+            self.state = self.state._replace(ivf=ivf)
+            self._warn_unused_quant(ivf, self.state.quant)
+        return ivf
+
+    def drop_ivf(self) -> None:
+        with self.lock:
+            if self.ivf_path.exists():
+                self.ivf_path.unlink()
+            self.state = self.state._replace(ivf=None)
+
+    def build_quantized(self, mode: str, dim: int | None) -> QuantizedCodes | None:
+        with self.lock:
+            if mode == "none":
+                if self.quant_path.exists():
+                    self.quant_path.unlink()
+                self.state = self.state._replace(quant=None)
+                return None
+            if not self.size:
+                raise ValueError(f"namespace at {self.path} is empty")
+            quant = QuantizedCodes.build(self.state.vectors, mode, dim)
+            quant.save(self.quant_path)
+            self.state = self.state._replace(quant=quant)
+            self._warn_unused_quant(self.state.ivf, quant)
+        return quant
+
+    def _warn_unused_quant(self, ivf: IVFIndex | None, quant: QuantizedCodes | None) -> None:
+        if ivf is not None and quant is not None:
+            print(f"[warn] {self.path.name}: queries use the IVF index; quantized codes are unused until it is dropped")
+
+    def fetch(self, ids: Sequence[str]) -> Dict[str, List[float]]:
+        vectors, _, _, pos, _, _ = self.state
+        n = vectors.shape[0]
+        out: Dict[str, List[float]] = {}
+        for vid in ids:
+            j = pos.get(vid)
+            if j is not None and j < n:
+                out[vid] = np.asarray(vectors[j]).tolist()
+        return out
+
+    def query(
+        self, vector: Sequence[float], k: int, nprobe: int, rescore: int, include_values: bool = False
+    ) -> Dict[str, Any]:
+        vectors, ids, metadata, _, ivf, quant = self.state
+        if not vectors.shape[0]:
+            return {"matches": []}
+        q = _unit_rows(vector)[0]
+        if q.shape[0] != vectors.shape[1]:
+            raise ValueError(f"query dimension {q.shape[0]} does not match namespace dimension {vectors.shape[1]}")
+        if ivf is not None:
+            idx, scores = ivf.search(vectors, q, k, nprobe)
+        elif quant is not None:
+            idx, scores = rescore_search(vectors, quant, q, k, rescore)
+        else:
+            all_scores = vectors @ q
+            idx = top_k(all_scores, k)
+            scores = all_scores[idx]
+        matches = [{"id": ids[i], "score": float(s), "metadata": metadata[i]} for i, s in zip(idx, scores)]
+        if include_values:
+            for m, i in zip(matches, idx):
+                m["values"] = np.asarray(vectors[i]).tolist()
+        return {"matches": matches}
+
+
+class LocalVectorStore:
+    """Implements :class:`ingestion.vectorstore.backend.VectorBackend` on local files."""
+
+    def __init__(self, root: str | Path, nprobe: int = 8, rescore: int = 4):
+        self.root = Path(root)
+        self.nprobe = nprobe
+        self.rescore = rescore
+        self._lock = threading.Lock()
+        self._spaces: Dict[str, _Namespace] = {}
+
+    def _ns(self, namespace: str) -> _Namespace:
+        name = namespace or "default"
+        space = self._spaces.get(name)
+        if space is None:
+            with self._lock:
+                space = self._spaces.get(name)
+                if space is None:
+                    space = _Namespace(self.root / name)
+                    self._spaces[name] = space
+        return space
+
+    def upsert(self, ids, vectors, metadatas, namespace: str) -> int:
+        return self._ns(namespace).upsert(list(ids), vectors, list(metadatas))
+
+    def query(self, vector, top_k: int, namespace: str, include_values: bool = False) -> Dict[str, Any]:
+        return self._ns(namespace).query(vector, top_k, self.nprobe, self.rescore, include_values)
+
+    def fetch(self, ids, namespace: str) -> Dict[str, List[float]]:
+        return self._ns(namespace).fetch(list(ids))
+
+    def delete(self, ids, namespace: str) -> int:
+        return self._ns(namespace).delete(list(ids))
+
+    def count(self, namespace: str) -> int:
+        return self._ns(namespace).size
+
+    def ids(self, namespace: str) -> List[str]:
+        return list(self._ns(namespace).ids)
+
+    def build_ivf(self, namespace: str, nlist: int | None = None, iters: int = 20) -> IVFIndex:
+        """Train (or retrain) the namespace's IVF index from its stored vectors."""
+        return self._ns(namespace).build_ivf(nlist, iters)
+
+    def drop_ivf(self, namespace: str) -> None:
+        self._ns(namespace).drop_ivf()
+
+    def build_quantized(self, namespace: str, mode: str, dim: int | None = None) -> QuantizedCodes | None:
+        """Store int8/binary codes (optionally over a ``dim`` prefix) for shortlist search; ``"none"`` drops them."""
+        return self._ns(namespace).build_quantized(mode, dim)
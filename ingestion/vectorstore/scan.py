@@ -0,0 +1,84 @@
+"""Stream every vector ID and its metadata out of a Pinecone namespace.
+
+:func:`iter_ids` walks all ``Index.list`` pages (the SDK follows the
+pagination token lazily) and :func:`scan_metadata` fetches metadata for
+those IDs in batches of ``batch_size`` from ``workers`` threads. At most
+``workers`` batches are in flight and results are yielded as they arrive
+(in list order), so memory stays bounded by the batch window no matter how
+many vectors the namespace holds.
+
+Listing needs a serverless index; pod-based indexes raise on ``list``.
+:func:`present_ids` checks given IDs with batched fetches instead.
+"""
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from ingestion.pipelines.stream import batched, ordered_map
+
+# Pinecone returns at most 100 IDs per list page.
+LIST_PAGE = 100
+
+
+def iter_ids(index: Any, namespace: str, prefix: str | None = None) -> Iterator[str]:
+    kwargs: Dict[str, Any] = {"namespace": namespace, "limit": LIST_PAGE}
+    if prefix:
+        kwargs["prefix"] = prefix
+    for page in index.list(**kwargs):
+        yield from page
+
+
+def _field(obj: Any, name: str) -> Any:
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def fetch_metadata(index: Any, ids: List[str], namespace: str) -> List[Tuple[str, Dict[str, Any]]]:
+    res = index.fetch(ids=ids, namespace=namespace)
+    vectors = _field(res, "vectors") or {}
+    return [(vid, dict(_field(vec, "metadata") or {})) for vid, vec in vectors.items()]
+
+
+def fetch_present(index: Any, ids: List[str], namespace: str) -> List[str]:
+    """Which of ``ids`` exist; the fetched values are dropped with the response."""
+    res = index.fetch(ids=ids, namespace=namespace)
+    return list((_field(res, "vectors") or {}).keys())
+
+
+def present_ids(
+    index: Any,
+    namespace: str,
+    ids: Iterable[str],
+    batch_size: int | None = None,
+    workers: int | None = None,
+) -> Iterator[str]:
+    """Yield the IDs among ``ids`` that exist in ``namespace``.
+
+    For indexes that cannot ``list``; batched and concurrent like
+    :func:`scan_metadata`.
+    """
+    batch_size = max(1, batch_size or int(os.getenv("SCAN_BATCH") or 100))
+    workers = max(1, workers or int(os.getenv("SCAN_WORKERS") or 4))
+    for found in ordered_map(
+        lambda batch: fetch_present(index, batch, namespace), batched(ids, batch_size), concurrency=workers, name="scan"
+    ):
+        yield from found
+
+
+def scan_metadata(
+    index: Any,
+    namespace: str,
+    batch_size: int | None = None,
+    workers: int | None = None,
+    prefix: str | None = None,
+) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Yield ``(id, metadata)`` for every vector in ``namespace``.
+
+    ``batch_size`` IDs per fetch (default: env SCAN_BATCH or 100) and
+    ``workers`` concurrent fetches (default: env SCAN_WORKERS or 4).
+    """
+    batch_size = max(1, batch_size or int(os.getenv("SCAN_BATCH") or 100))
+    workers = max(1, workers or int(os.getenv("SCAN_WORKERS") or 4))
+    batches = batched(iter_ids(index, namespace, prefix), batch_size)
+    for rows in ordered_map(lambda ids: fetch_metadata(index, ids, namespace), batches, concurrency=workers, name="scan"):
+        yield from rows
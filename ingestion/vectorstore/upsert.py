@@ -0,0 +1,139 @@
+"""Parallel, retried vector upserts for ingestion.
+
+:class:`ParallelUpserter` splits what it is given into ``batch_size``
+requests and sends them from a bounded thread pool. ``submit`` blocks once
+``2 * workers`` batches are in flight, so the upsert stage applies
+backpressure to embedding instead of queueing vectors without bound.
+Transient failures (rate limits, timeouts, connection errors, 5xx) are
+retried with jittered exponential backoff; anything else, such as a 4xx
+dimension or metadata rejection, fails the batch at once.
+
+Finished batches are handed back to the caller by :meth:`committed` (on
+the caller's thread), which is where ingestion checkpoints them; a batch
+that still fails after retries is raised by :meth:`check`. Drain
+``committed()`` before ``check()`` so work that did land is checkpointed
+even when the run stops.
+"""
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, List, Sequence, Tuple
+
+# (ids, metadatas) of a batch the backend has acknowledged.
+Committed = Tuple[List[str], List[Dict[str, Any]]]
+
+_RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+_RETRY_NAMES = {
+    "ServiceException", "ConnectionError", "TimeoutError", "Timeout",
+    "ProtocolError", "MaxRetryError", "NewConnectionError", "ReadTimeoutError",
+}
+
+
+def _retryable(exc: BaseException) -> bool:
+    status = (
+        getattr(exc, "status", None)
+        or getattr(exc, "status_code", None)
+        or getattr(getattr(exc, "response", None), "status_code", None)
+    )
+    if isinstance(status, int):
+        return status in _RETRY_STATUS
+    return any(cls.__name__ in _RETRY_NAMES for cls in type(exc).__mro__)
+
+
+class ParallelUpserter:
+    def __init__(
+        self,
+        backend: Any,
+        namespace: str,
+        batch_size: int | None = None,
+        workers: int | None = None,
+        max_retries: int | None = None,
+    ):
+        self.backend = backend
+        self.namespace = namespace
+        self.batch_size = max(1, batch_size or int(os.getenv("UPSERT_BATCH") or 100))
+        self.workers = max(1, workers or int(os.getenv("UPSERT_WORKERS") or 4))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("UPSERT_MAX_RETRIES") or 5)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ingest-upsert")
+        self._slots = threading.BoundedSemaphore(2 * self.workers)
+        self._lock = threading.Lock()
+        self._done: List[Committed] = []
+        self._futures: List[Future] = []
+        self._error: BaseException | None = None
+        self.vectors = 0
+        self.batches = 0
+        self.retries = 0
+        # Span from the first submit to the last acknowledged batch, so the
+        # rate excludes extraction and embedding before upserts begin.
+        self._started: float | None = None
+        self._finished: float | None = None
+
+    def submit(self, ids: Sequence[str], vectors: Sequence[Sequence[float]], metadatas: Sequence[Dict[str, Any]]) -> None:
+        if self._started is None and len(ids):
+            self._started = time.monotonic()
+        for start in range(0, len(ids), self.batch_size):
+            end = start + self.batch_size
+            self.check()
+            self._slots.acquire()
+            fut = self._pool.submit(
+                self._send, list(ids[start:end]), list(vectors[start:end]), list(metadatas[start:end])
+            )
+            fut.add_done_callback(lambda _f: self._slots.release())
+            self._futures.append(fut)
+        self._futures = [f for f in self._futures if not f.done()]
+
+    def _send(self, ids: List[str], vectors: List[Sequence[float]], metadatas: List[Dict[str, Any]]) -> None:
+        attempt = 0
+        while True:
+            try:
+                self.backend.upsert(ids, vectors, metadatas, self.namespace)
+                break
+            except Exception as e:
+                if attempt >= self.max_retries or not _retryable(e):
+                    with self._lock:
+                        self._error = self._error or e
+                    raise
+                delay = min(30.0, 2.0 ** attempt) * random.uniform(0.5, 1.5)
+                attempt += 1
+                with self._lock:
+                    self.retries += 1
+                print(f"[upsert] {type(e).__name__}: {e}; retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+        with self._lock:
+            self.vectors += len(ids)
+            self.batches += 1
+            self._done.append((ids, metadatas))
+            self._finished = time.monotonic()
+
+    def check(self) -> None:
+        """Raise the error of a batch that failed after all retries, if any."""
+        with self._lock:
+            if self._error is not None:
+                raise self._error
+
+    def committed(self) -> List[Committed]:
+        """Batches acknowledged since the last call."""
+        with self._lock:
+            done, self._done = self._done, []
+        return done
+
+    def wait(self) -> None:
+        """Block until every submitted batch has succeeded or failed."""
+        for fut in self._futures:
+            try:
+                fut.result()
+            except Exception:
+                pass  # recorded in self._error, raised by check()
+        self._futures = []
+        self._pool.shutdown(wait=True)
+
+    def summary(self) -> str:
+        elapsed = max((self._finished or 0.0) - (self._started or 0.0), 1e-9)
+        return (
+            f"upserted {self.vectors} vectors in {self.batches} batch(es) with {self.workers} worker(s): "
+            f"{self.vectors / elapsed:.1f} vectors/s, {self.retries} retr{'y' if self.retries == 1 else 'ies'}"
+        )
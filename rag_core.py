@@ -1,13 +1,24 @@
+import asyncio
+import hashlib
+import json
 import os
-from typing import Dict, List, AsyncGenerator
+import re
+import struct
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import aclosing
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, AsyncGenerator, NamedTuple
 
+import numpy as np
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_pinecone import PineconeVectorStore
 from langchain_core.documents import Document
-from pinecone import Pinecone
-from langchain_core.runnables import chain
-from langchain_core.output_parsers import StrOutputParser
+
+if TYPE_CHECKING:  # imported lazily at runtime; see get_chain() and get_pinecone_client()
+    from pinecone import Pinecone
 
 load_dotenv()
 
@@ -42,12 +53,19 @@ def _namespaces() -> List[str]:
     return parts or [_ns_value()]
 
 
+def _embed_dimensions() -> int | None:
+    """Matryoshka output size from EMBED_DIMENSIONS (unset = model default)."""
+    raw = (os.getenv("EMBED_DIMENSIONS") or "").strip()
+    return int(raw) if raw.isdigit() and int(raw) > 0 else None
+
+
 def build_chain():
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-    llm = ChatOpenAI(temperature=0, model="gpt-4o", streaming=True)
-    
     from langchain_core.prompts import ChatPromptTemplate
-    
+    from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+
+    embeddings = OpenAIEmbeddings(model="text-embedding-3-large", dimensions=_embed_dimensions())
+    llm = ChatOpenAI(temperature=0, model="gpt-4o", streaming=True)
+
     enhanced_prompt = ChatPromptTemplate.from_messages([
         ("system", """You are a helpful AI assistant specializing in Insurance Act and IFRS-17 regulatory guidance. 
 
@@ -71,18 +89,327 @@ Please provide a comprehensive, well-formatted answer based on the context above
     
     return {"embeddings": embeddings, "llm": llm, "prompt": enhanced_prompt}
 
-CHAIN = build_chain()
 
+# The chain is built on first use, not at import: langchain_openai and the
+# OpenAI clients take seconds to load and need OPENAI_API_KEY, which neither
+# importing this module (CLI scripts, test mode) nor a liveness probe should
+# require. ``rag_core.CHAIN`` still works and builds it on access.
+_CHAIN: Dict[str, Any] | None = None
+_CHAIN_LOCK = threading.Lock()
 
-def _retrieve_from_pinecone_single(query: str, namespace: str, k: int) -> List[Document]:
-    index_name = os.getenv("INDEX_NAME2")
-    if not index_name:
-        return []
-    pc_key = os.getenv("PINECONE_API_KEY") or os.getenv("PINECONE_API_KEY2") or ""
-    pc = Pinecone(api_key=pc_key)
-    index = pc.Index(index_name)
-    vec = CHAIN["embeddings"].embed_query(query)
-    res = index.query(vector=vec, top_k=k, include_metadata=True, namespace=namespace)
+
+def get_chain() -> Dict[str, Any]:
+    global _CHAIN
+    if _CHAIN is None:
+        with _CHAIN_LOCK:
+            if _CHAIN is None:
+                _CHAIN = build_chain()
+    return _CHAIN
+
+
+def __getattr__(name: str) -> Any:
+    if name == "CHAIN":
+        return get_chain()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _env_int(name: str, default: int, minimum: int = 1) -> int:
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        return max(minimum, int(raw))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    raw = os.getenv(name)
+    if not raw:
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        return default
+
+
+def _normalize_query(query: str) -> str:
+    return " ".join((query or "").lower().split())
+
+
+# Query-embedding cache.
+#
+# Repeat questions skip the embeddings API. Entries live in a bounded LRU with
+# a TTL; when QUERY_EMBED_CACHE_PATH is set they are also appended to a binary
+# log (20-byte sha1 key, float64 timestamp, uint32 dim, dim x float32) that is
+# replayed on startup and compacted once it holds twice the capacity. Disk
+# writes happen outside the entry lock (on a worker thread for async
+# callers), so lookups never wait on file I/O.
+# Tunables: QUERY_EMBED_CACHE_SIZE (0 disables), QUERY_EMBED_CACHE_TTL seconds.
+_QEC_HEADER = struct.Struct("<20sdI")
+
+
+class QueryEmbeddingCache:
+    def __init__(self, capacity: int = 1024, ttl: float = 86400.0, path: str | None = None):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.path = Path(path) if path else None
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, tuple[float, List[float]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes appends, compaction and clear on the log file.
+        self._io_lock = threading.Lock()
+        self._records_on_disk = 0
+        if self.path is not None and capacity > 0:
+            self._load()
+
+    @staticmethod
+    def key(query: str, model: str) -> bytes:
+        return hashlib.sha1(f"{model}\0{_normalize_query(query)}".encode("utf-8")).digest()
+
+    def get(self, query: str, model: str) -> List[float] | None:
+        if self.capacity <= 0:
+            return None
+        k = self.key(query, model)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(k)
+            if entry is not None and now - entry[0] <= self.ttl:
+                self._entries.move_to_end(k)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[k]
+            self.misses += 1
+            return None
+
+    def put(self, query: str, model: str, vec: List[float]) -> None:
+        record = self.remember(query, model, vec)
+        if record is not None:
+            self.persist(record)
+
+    def remember(self, query: str, model: str, vec: List[float]) -> "tuple[bytes, float, List[float]] | None":
+        """Insert into memory only; returns the record to :meth:`persist`, or None without a log file."""
+        if self.capacity <= 0:
+            return None
+        k = self.key(query, model)
+        ts = time.time()
+        vec = list(vec)
+        with self._lock:
+            self._insert(k, ts, vec)
+        return (k, ts, vec) if self.path is not None else None
+
+    def persist(self, record: "tuple[bytes, float, List[float]]") -> None:
+        """Append a :meth:`remember` record to the log file; blocking, best effort."""
+        try:
+            with self._io_lock:
+                self._append(*record)
+        except OSError as e:  # pragma: no cover - disk is best effort
+            print(f"[warn] query embedding cache write failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "size": len(self._entries),
+                "capacity": self.capacity,
+            }
+
+    def clear(self) -> None:
+        with self._io_lock:
+            with self._lock:
+                self._entries.clear()
+                self.hits = self.misses = 0
+            if self.path is not None and self.path.exists():
+                self.path.unlink()
+            self._records_on_disk = 0
+
+    def _insert(self, k: bytes, ts: float, vec: List[float]) -> None:
+        self._entries[k] = (ts, vec)
+        self._entries.move_to_end(k)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def _append(self, k: bytes, ts: float, vec: List[float]) -> None:
+        assert self.path is not None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab") as f:
+            f.write(_QEC_HEADER.pack(k, ts, len(vec)))
+            f.write(array("f", vec).tobytes())
+        self._records_on_disk += 1
+        if self._records_on_disk > 2 * self.capacity:
+            self._compact()
+
+    def _load(self) -> None:
+        assert self.path is not None
+        if not self.path.is_file():
+            return
+        now = time.time()
+        try:
+            data = self.path.read_bytes()
+        except OSError as e:  # pragma: no cover
+            print(f"[warn] query embedding cache read failed: {e}")
+            return
+        off = 0
+        records = 0
+        while off + _QEC_HEADER.size <= len(data):
+            k, ts, dim = _QEC_HEADER.unpack_from(data, off)
+            off += _QEC_HEADER.size
+            end = off + 4 * dim
+            if end > len(data):
+                break  # truncated tail from an interrupted write
+            records += 1
+            if now - ts <= self.ttl:
+                vec = array("f")
+                vec.frombytes(data[off:end])
+                self._insert(k, ts, vec.tolist())
+            off = end
+        self._records_on_disk = records
+        if records > len(self._entries):
+            self._compact()
+
+    def _compact(self) -> None:
+        assert self.path is not None
+        with self._lock:
+            entries = list(self._entries.items())
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        with tmp.open("wb") as f:
+            for k, (ts, vec) in entries:
+                f.write(_QEC_HEADER.pack(k, ts, len(vec)))
+                f.write(array("f", vec).tobytes())
+        os.replace(tmp, self.path)
+        self._records_on_disk = len(entries)
+
+
+QUERY_EMBED_CACHE = QueryEmbeddingCache(
+    capacity=_env_int("QUERY_EMBED_CACHE_SIZE", 1024, minimum=0),
+    ttl=_env_float("QUERY_EMBED_CACHE_TTL", 86400.0),
+    path=os.getenv("QUERY_EMBED_CACHE_PATH") or None,
+)
+
+
+def _embedding_model() -> str:
+    emb = get_chain()["embeddings"]
+    model = getattr(emb, "model", "") or ""
+    dims = getattr(emb, "dimensions", None)
+    return f"{model}@{dims}" if dims else model
+
+
+def embed_query_cached(query: str) -> List[float]:
+    model = _embedding_model()
+    vec = QUERY_EMBED_CACHE.get(query, model)
+    if vec is None:
+        vec = get_chain()["embeddings"].embed_query(query)
+        QUERY_EMBED_CACHE.put(query, model, vec)
+    return vec
+
+
+async def aembed_query_cached(query: str) -> List[float]:
+    model = _embedding_model()
+    vec = QUERY_EMBED_CACHE.get(query, model)
+    if vec is None:
+        vec = await get_chain()["embeddings"].aembed_query(query)
+        record = QUERY_EMBED_CACHE.remember(query, model, vec)
+        if record is not None:
+            await asyncio.to_thread(QUERY_EMBED_CACHE.persist, record)
+    return vec
+
+
+def _try_embed(query: str) -> List[float] | None:
+    try:
+        return embed_query_cached(query)
+    except Exception as e:  # pragma: no cover
+        print(f"[warn] query embedding failed: {e}")
+        return None
+
+
+async def _atry_embed(query: str) -> List[float] | None:
+    try:
+        return await aembed_query_cached(query)
+    except Exception as e:  # pragma: no cover
+        print(f"[warn] query embedding failed: {e}")
+        return None
+
+
+# Pinecone connection pool.
+#
+# One process-wide client and one Index handle per index name. The Index
+# handle owns a urllib3 pool with keep-alive connections, so reusing it avoids
+# the describe_index host lookup and TLS handshakes on every request. urllib3
+# pools are thread-safe; async callers reach them through worker threads.
+# Tunables: PINECONE_POOL_THREADS, PINECONE_POOL_MAXSIZE.
+_PC_LOCK = threading.Lock()
+_PC_CLIENT: "Pinecone | None" = None
+_PC_KEY: str | None = None
+_PC_INDEXES: Dict[str, Any] = {}
+
+
+def _pinecone_key() -> str:
+    return os.getenv("PINECONE_API_KEY") or os.getenv("PINECONE_API_KEY2") or ""
+
+
+def get_pinecone_client() -> "Pinecone":
+    """Return the shared Pinecone client, rebuilding it if the API key changed."""
+    global _PC_CLIENT, _PC_KEY
+    key = _pinecone_key()
+    client = _PC_CLIENT
+    if client is not None and _PC_KEY == key:
+        return client
+    with _PC_LOCK:
+        if _PC_CLIENT is None or _PC_KEY != key:
+            from pinecone import Pinecone
+
+            _close_indexes_locked()
+            _PC_CLIENT = Pinecone(api_key=key, pool_threads=_env_int("PINECONE_POOL_THREADS", 4))
+            _PC_KEY = key
+        return _PC_CLIENT
+
+
+def get_index(index_name: str) -> Any:
+    """Return a cached Index handle for ``index_name`` backed by the shared pool."""
+    client = get_pinecone_client()
+    index = _PC_INDEXES.get(index_name)
+    if index is not None:
+        return index
+    with _PC_LOCK:
+        index = _PC_INDEXES.get(index_name)
+        if index is None:
+            index = client.Index(
+                index_name,
+                pool_threads=_env_int("PINECONE_POOL_THREADS", 4),
+                connection_pool_maxsize=_env_int("PINECONE_POOL_MAXSIZE", 16),
+            )
+            _PC_INDEXES[index_name] = index
+        return index
+
+
+def _close_indexes_locked() -> None:
+    for index in _PC_INDEXES.values():
+        try:
+            index.close()
+        except Exception:  # pragma: no cover - best effort
+            pass
+    _PC_INDEXES.clear()
+
+
+def reset_pinecone() -> None:
+    """Drop the shared client and all cached Index handles.
+
+    Call after rotating credentials or pointing INDEX_NAME2 at a new index;
+    the next retrieval reconnects lazily.
+    """
+    global _PC_CLIENT, _PC_KEY
+    with _PC_LOCK:
+        _close_indexes_locked()
+        _PC_CLIENT = None
+        _PC_KEY = None
+
+
+def _to_documents(res: Any, namespace: str) -> List[Document]:
     docs: List[Document] = []
     for m in res.get("matches") or []:
         md = m.get("metadata") or {}
@@ -96,34 +423,165 @@ def _retrieve_from_pinecone_single(query: str, namespace: str, k: int) -> List[D
             else:
                 meta[k2] = str(v)
         meta.setdefault("namespace", namespace)
-        docs.append(Document(page_content=text, metadata=meta))
+        docs.append(Document(id=m.get("id"), page_content=text, metadata=meta))
     return docs
 
 
-def retrieve_multi(query: str, k_total: int = 6) -> List[Document]:
-    """Retrieve across all configured namespaces and merge results.
+# Vector backends.
+#
+# VECTOR_BACKEND picks "pinecone" (default) or "local" for every namespace;
+# LOCAL_NAMESPACES (comma separated) serves just those namespaces from the
+# local memory-mapped store under LOCAL_VECTOR_DIR (default data/_vectors).
+_LOCAL_STORE: Any = None
 
-    Strategy: allocate roughly even k across namespaces, at least 1 each.
-    """
-    nspaces = _namespaces()
-    if not nspaces:
+
+def _local_namespaces() -> set[str]:
+    raw = os.getenv("LOCAL_NAMESPACES") or ""
+    return {p.strip() for p in raw.split(",") if p.strip()}
+
+
+def _is_local(namespace: str) -> bool:
+    if (os.getenv("VECTOR_BACKEND") or "pinecone").strip().lower() == "local":
+        return True
+    return namespace in _local_namespaces()
+
+
+def _local_store() -> Any:
+    global _LOCAL_STORE
+    if _LOCAL_STORE is None:
+        with _PC_LOCK:
+            if _LOCAL_STORE is None:
+                from ingestion.vectorstore.backend import open_backend
+
+                _LOCAL_STORE = open_backend("local")
+    return _LOCAL_STORE
+
+
+def _backend_for(namespace: str) -> Any:
+    if _is_local(namespace):
+        return _local_store()
+    index_name = os.getenv("INDEX_NAME2")
+    if not index_name:
+        return None
+    from ingestion.vectorstore.backend import PineconeBackend
+
+    return PineconeBackend(get_index(index_name))
+
+
+def _retrieval_configured() -> bool:
+    return bool(os.getenv("INDEX_NAME2")) or any(_is_local(ns) for ns in _namespaces())
+
+
+class _Hit(NamedTuple):
+    doc: Document
+    score: float
+    values: List[float] | None = None
+
+
+def _to_hits(res: Any, namespace: str) -> List[_Hit]:
+    matches = res.get("matches") or []
+    docs = _to_documents(res, namespace)
+    return [
+        _Hit(d, float(m.get("score") or 0.0), m.get("values") or None) for d, m in zip(docs, matches)
+    ]
+
+
+def _query_hits(vec: List[float], namespace: str, k: int) -> List[_Hit]:
+    backend = _backend_for(namespace)
+    if backend is None:
         return []
-    per = max(1, k_total // len(nspaces))
-    remainder = max(0, k_total - per * len(nspaces))
-    all_docs: List[Document] = []
-    for i, ns in enumerate(nspaces):
-        k_ns = per + (1 if i < remainder else 0)
-        try:
-            docs = _retrieve_from_pinecone_single(query, ns, k_ns)
-            all_docs.extend(docs)
-        except Exception as e:  # pragma: no cover
-            print(f"[warn] retrieval failed for namespace '{ns}': {e}")
+    # Vectors are only needed (and only downloaded) for the MMR merge.
+    values = _merge_mode() == "mmr"
+    return _to_hits(backend.query(vec, k, namespace, include_values=values), namespace)
+
+
+def _query_namespace(vec: List[float], namespace: str, k: int) -> List[Document]:
+    backend = _backend_for(namespace)
+    if backend is None:
+        return []
+    res = backend.query(vec, k, namespace)
+    return _to_documents(res, namespace)
+
+
+def _retrieve_from_pinecone_single(query: str, namespace: str, k: int) -> List[Document]:
+    if _backend_for(namespace) is None:
+        return []
+    vec = embed_query_cached(query)
+    return _query_namespace(vec, namespace, k)
+
+
+# Hybrid retrieval.
+#
+# RETRIEVAL_MODE=hybrid runs a BM25 keyword search (index written by
+# ingestion under KEYWORD_INDEX_DIR) next to the vector search for every
+# namespace and fuses both rankings with reciprocal-rank fusion:
+# score = sum(1 / (RRF_K + rank)). Each side fetches HYBRID_DEPTH x k
+# candidates before fusion.
+_KEYWORD_STORE: Any = None
+
+
+def _hybrid_enabled() -> bool:
+    return (os.getenv("RETRIEVAL_MODE") or "dense").strip().lower() == "hybrid"
+
 
+def _keyword_store() -> Any:
+    global _KEYWORD_STORE
+    if _KEYWORD_STORE is None:
+        with _PC_LOCK:
+            if _KEYWORD_STORE is None:
+                from ingestion.vectorstore.keyword import KeywordIndexStore
+
+                _KEYWORD_STORE = KeywordIndexStore()
+    return _KEYWORD_STORE
+
+
+def _keyword_hits(query: str, namespace: str, k: int) -> List[_Hit]:
+    return _to_hits(_keyword_store().query(query, k, namespace), namespace)
+
+
+def _keyword_namespace(query: str, namespace: str, k: int) -> List[Document]:
+    return _to_documents(_keyword_store().query(query, k, namespace), namespace)
+
+
+def _fuse_hits(rankings: List[List[_Hit]]) -> List[_Hit]:
+    """Reciprocal-rank fusion keyed by chunk ID; the fused score replaces the raw ones."""
+    c = _env_int("RRF_K", 60)
+    scores: Dict[str, float] = {}
+    first: Dict[str, _Hit] = {}
+    for hits in rankings:
+        for rank, h in enumerate(hits):
+            key = h.doc.id or h.doc.page_content[:120]
+            scores[key] = scores.get(key, 0.0) + 1.0 / (c + rank + 1)
+            # Keep the vector from whichever list carried one (the dense side).
+            if key not in first or (first[key].values is None and h.values is not None):
+                first[key] = h
+    best = sorted(scores, key=lambda key: scores[key], reverse=True)
+    return [first[key]._replace(score=scores[key]) for key in best]
+
+
+def _rrf(rankings: List[List[Document]], k: int) -> List[Document]:
+    """Reciprocal-rank fusion of several ranked lists, keyed by chunk ID."""
+    fused = _fuse_hits([[_Hit(d, 0.0) for d in docs] for docs in rankings])
+    return [h.doc for h in fused[:k]]
+
+
+def _allocate_k(k_total: int, n: int) -> List[int]:
+    """Split ``k_total`` roughly evenly across ``n`` namespaces, at least 1 each."""
+    per = max(1, k_total // n)
+    remainder = max(0, k_total - per * n)
+    return [per + (1 if i < remainder else 0) for i in range(n)]
+
+
+def _dedupe_key(d: Document) -> tuple:
+    return (d.page_content[:120], d.metadata.get("source") or d.metadata.get("file_name"))
+
+
+def _dedupe(all_docs: List[Document]) -> List[Document]:
     # Simple de-dupe by snippet start + source_path if present
     seen: set[tuple] = set()
     uniq: List[Document] = []
     for d in all_docs:
-        key = (d.page_content[:120], d.metadata.get("source") or d.metadata.get("file_name"))
+        key = _dedupe_key(d)
         if key in seen:
             continue
         seen.add(key)
@@ -131,33 +589,481 @@ def retrieve_multi(query: str, k_total: int = 6) -> List[Document]:
     return uniq
 
 
-def ask(query: str) -> Dict:
-    """Run a query via multi-namespace Pinecone retrieval and LLM combine."""
-    docs = retrieve_multi(query, k_total=6)
-    
-    # Format context from documents
-    context = "\n\n".join([doc.page_content for doc in docs])
-    
-    # Invoke LLM with prompt
-    llm = CHAIN["llm"]
-    prompt = CHAIN["prompt"]
-    messages = prompt.format_messages(input=query, context=context)
-    response = llm.invoke(messages)
-    
-    answer = response.content if hasattr(response, 'content') else str(response)
-    
+# Cross-namespace merge.
+#
+# MERGE_MODE=even (default) splits k_total across namespaces with the fixed
+# per-namespace quota from _allocate_k and simple de-duplication.
+#
+# MERGE_MODE=mmr is opt-in because it costs more per request. It
+# over-fetches RETRIEVAL_OVERFETCH x k_total candidates per namespace
+# together with their full-size vectors and ranks all of them on one global
+# relevance score: the backend cosine, or the fused RRF score in hybrid
+# mode. The final k_total are picked by maximal marginal relevance
+# (MMR_LAMBDA weighs relevance against similarity to chunks already picked),
+# and candidates whose cosine to a picked chunk reaches DEDUP_THRESHOLD are
+# dropped as near-duplicates.
+def _merge_mode() -> str:
+    mode = (os.getenv("MERGE_MODE") or "even").strip().lower()
+    return mode if mode in {"mmr", "even"} else "even"
+
+
+def _fetch_k(k_total: int, k_ns: int, hybrid: bool) -> int:
+    if _merge_mode() == "mmr":
+        return max(k_total, 1) * _env_int("RETRIEVAL_OVERFETCH", 3)
+    return k_ns * (_env_int("HYBRID_DEPTH", 3) if hybrid else 1)
+
+
+def _fill_values(hits: List[_Hit], namespace: str) -> List[_Hit]:
+    """Fetch vectors for hits that came back without one (keyword-only matches)."""
+    missing = [h.doc.id for h in hits if h.values is None and h.doc.id]
+    if not missing:
+        return hits
+    try:
+        backend = _backend_for(namespace)
+        found = backend.fetch(missing, namespace) if backend is not None else {}
+    except Exception as e:  # pragma: no cover
+        print(f"[warn] vector fetch failed for namespace '{namespace}': {e}")
+        return hits
+    return [h._replace(values=found.get(h.doc.id)) if h.values is None else h for h in hits]
+
+
+def _mmr_select(rel: np.ndarray, mat: np.ndarray, k: int, lam: float, dup: float) -> List[int]:
+    """Greedy MMR over unit rows ``mat``; returns picked row indices in order.
+
+    Rows without a vector are all-zero, so they only compete on relevance.
+    """
+    sims = mat @ mat.T
+    n = rel.shape[0]
+    avail = np.ones(n, dtype=bool)
+    max_sim = np.zeros(n, dtype=np.float32)
+    picked: List[int] = []
+    while len(picked) < k and avail.any():
+        mmr = np.where(avail, lam * rel - (1.0 - lam) * max_sim, -np.inf)
+        i = int(np.argmax(mmr))
+        picked.append(i)
+        avail[i] = False
+        avail &= sims[i] < dup
+        np.maximum(max_sim, sims[i], out=max_sim)
+    return picked
+
+
+def _merge_hits(per_ns: List[List[_Hit]], nspaces: List[str], k_total: int, hybrid: bool) -> List[Document]:
+    if hybrid:
+        per_ns = [_fill_values(hits, ns) for hits, ns in zip(per_ns, nspaces)]
+    hits = sorted((h for hs in per_ns for h in hs), key=lambda h: h.score, reverse=True)
+    seen: set[tuple] = set()
+    uniq: List[_Hit] = []
+    for h in hits:
+        key = _dedupe_key(h.doc)
+        if key not in seen:
+            seen.add(key)
+            uniq.append(h)
+    if not uniq:
+        return []
+    dim = next((len(h.values) for h in uniq if h.values), 0)
+    if not dim:
+        return [h.doc for h in uniq[:k_total]]
+    mat = np.zeros((len(uniq), dim), dtype=np.float32)
+    for i, h in enumerate(uniq):
+        if h.values and len(h.values) == dim:
+            mat[i] = h.values
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    mat /= norms
+    rel = np.array([h.score for h in uniq], dtype=np.float32)
+    if hybrid:
+        # Fused RRF scores are tiny; scale them to [0, 1] to be comparable with cosine.
+        rel /= rel.max() or 1.0
+    picked = _mmr_select(
+        rel,
+        mat,
+        k_total,
+        lam=_env_float("MMR_LAMBDA", 0.7),
+        dup=_env_float("DEDUP_THRESHOLD", 0.95),
+    )
+    return [uniq[i].doc for i in picked]
+
+
+def _combine(
+    nspaces: List[str], ks: List[int], k_total: int, dense: List[Any], keyword: List[Any] | None
+) -> List[Document]:
+    """Merge per-namespace results (hit lists, or the exception a namespace raised)."""
+    mmr = _merge_mode() == "mmr"
+    per_ns: List[List[_Hit]] = []
+    for i, (ns, k_ns) in enumerate(zip(nspaces, ks)):
+        hits = dense[i]
+        if isinstance(hits, BaseException):
+            print(f"[warn] retrieval failed for namespace '{ns}': {hits}")
+            hits = []
+        if keyword is not None:
+            kw = keyword[i]
+            if isinstance(kw, BaseException):
+                print(f"[warn] keyword retrieval failed for namespace '{ns}': {kw}")
+                kw = []
+            hits = _fuse_hits([hits, kw])
+        per_ns.append(hits if mmr else hits[:k_ns])
+    if not mmr:
+        return _dedupe([h.doc for hits in per_ns for h in hits])
+    return _merge_hits(per_ns, nspaces, k_total, keyword is not None)
+
+
+def _fanout_enabled() -> bool:
+    return os.getenv("RETRIEVAL_FANOUT", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+# Shared pool for concurrent namespace queries; sized by RETRIEVAL_MAX_WORKERS.
+_RETRIEVAL_POOL: ThreadPoolExecutor | None = None
+_RETRIEVAL_POOL_LOCK = threading.Lock()
+
+
+def _retrieval_pool() -> ThreadPoolExecutor:
+    global _RETRIEVAL_POOL
+    if _RETRIEVAL_POOL is None:
+        with _RETRIEVAL_POOL_LOCK:
+            if _RETRIEVAL_POOL is None:
+                _RETRIEVAL_POOL = ThreadPoolExecutor(
+                    max_workers=_env_int("RETRIEVAL_MAX_WORKERS", 8),
+                    thread_name_prefix="retrieve",
+                )
+    return _RETRIEVAL_POOL
+
+
+def _settle(future: Any) -> Any:
+    try:
+        return future.result()
+    except Exception as e:  # pragma: no cover
+        return e
+
+
+def retrieve_multi(query: str, k_total: int = 6, vec: List[float] | None = None) -> List[Document]:
+    """Retrieve across all configured namespaces and merge results.
+
+    The query is embedded once (or ``vec`` is reused if given) and every
+    namespace is queried concurrently, so latency tracks the slowest
+    namespace. Results are merged per MERGE_MODE (see above): an even
+    per-namespace quota, or MMR over a global score. Set RETRIEVAL_FANOUT=0 to fall
+    back to one embedding + query per namespace, in order, with an even
+    per-namespace quota.
+    """
+    nspaces = _namespaces()
+    if not nspaces:
+        return []
+    ks = _allocate_k(k_total, len(nspaces))
+    all_docs: List[Document] = []
+
+    hybrid = _hybrid_enabled()
+    depth = _env_int("HYBRID_DEPTH", 3) if hybrid else 1
+
+    if not _fanout_enabled():
+        for ns, k_ns in zip(nspaces, ks):
+            try:
+                docs = _retrieve_from_pinecone_single(query, ns, k_ns * depth)
+            except Exception as e:  # pragma: no cover
+                print(f"[warn] retrieval failed for namespace '{ns}': {e}")
+                docs = []
+            if hybrid:
+                try:
+                    docs = _rrf([docs, _keyword_namespace(query, ns, k_ns * depth)], k_ns)
+                except Exception as e:  # pragma: no cover
+                    print(f"[warn] keyword retrieval failed for namespace '{ns}': {e}")
+                    docs = docs[:k_ns]
+            all_docs.extend(docs)
+        return _dedupe(all_docs)
+
+    if not _retrieval_configured():
+        return []
+    try:
+        if vec is None:
+            vec = embed_query_cached(query)
+    except Exception as e:  # pragma: no cover
+        print(f"[warn] query embedding failed: {e}")
+        return []
+    pool = _retrieval_pool()
+    fetch = [_fetch_k(k_total, k_ns, hybrid) for k_ns in ks]
+    futures = [pool.submit(_query_hits, vec, ns, n) for ns, n in zip(nspaces, fetch)]
+    kw_futures = [pool.submit(_keyword_hits, query, ns, n) for ns, n in zip(nspaces, fetch)] if hybrid else []
+    # Collect in namespace order so merging stays deterministic.
+    dense = [_settle(f) for f in futures]
+    keyword = [_settle(f) for f in kw_futures] if hybrid else None
+    return _combine(nspaces, ks, k_total, dense, keyword)
+
+
+async def _aquery_namespace(vec: List[float], namespace: str, k: int) -> List[_Hit]:
+    # The pooled Index handle is synchronous; run it on the retrieval pool so
+    # the event loop keeps serving other requests while Pinecone answers.
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_retrieval_pool(), _query_hits, vec, namespace, k)
+
+
+async def aretrieve_multi(query: str, k_total: int = 6, vec: List[float] | None = None) -> List[Document]:
+    """Async variant of :func:`retrieve_multi` that never blocks the event loop."""
+    nspaces = _namespaces()
+    if not nspaces or not _retrieval_configured():
+        return []
+    ks = _allocate_k(k_total, len(nspaces))
+    try:
+        if vec is None:
+            vec = await aembed_query_cached(query)
+    except Exception as e:  # pragma: no cover
+        print(f"[warn] query embedding failed: {e}")
+        return []
+    hybrid = _hybrid_enabled()
+    loop = asyncio.get_running_loop()
+    pool = _retrieval_pool()
+    fetch = [_fetch_k(k_total, k_ns, hybrid) for k_ns in ks]
+    dense_tasks = [_aquery_namespace(vec, ns, n) for ns, n in zip(nspaces, fetch)]
+    kw_tasks = [
+        loop.run_in_executor(pool, _keyword_hits, query, ns, n) for ns, n in zip(nspaces, fetch)
+    ] if hybrid else []
+    results = await asyncio.gather(*dense_tasks, *kw_tasks, return_exceptions=True)
+    dense = list(results[:len(nspaces)])
+    keyword = list(results[len(nspaces):]) if hybrid else None
+    # Merging may fetch vectors for keyword-only hits, so keep it off the loop too.
+    return await loop.run_in_executor(pool, _combine, nspaces, ks, k_total, dense, keyword)
+
+
+def _format_sources(docs: List[Document]) -> List[Dict]:
     sources: List[Dict] = []
     for doc in docs:
         snippet = (doc.page_content or "").strip().replace("\n", " ")
         if len(snippet) > 300:
             snippet = snippet[:297] + "..."
         sources.append({"snippet": snippet, "metadata": doc.metadata or {}})
+    return sources
+
+
+def _build_messages(query: str, docs: List[Document]) -> List[Any]:
+    context = "\n\n".join([doc.page_content for doc in docs])
+    return get_chain()["prompt"].format_messages(input=query, context=context)
+
+
+# Semantic answer cache.
+#
+# Off unless ANSWER_CACHE_SIZE is set. Answers are keyed on the normalized
+# query embedding; a new question whose cosine similarity to a cached one
+# reaches ANSWER_CACHE_THRESHOLD reuses the stored answer and sources, but
+# only if both questions cite the same references: "section 67C" and
+# "section 67D" embed almost identically yet must not share an answer. The
+# cache is tied to the generated_at stamp of every queried namespace
+# manifest (see ingestion.pipelines.manifest.manifest_path), so a re-ingest
+# empties it. Tunables: ANSWER_CACHE_SIZE (0 disables),
+# ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_TTL seconds.
+_MANIFEST_STAMPS: Dict[str, tuple[float, str]] = {}
+
+
+def _manifest_generated_at(namespace: str) -> str:
+    from ingestion.pipelines.manifest import manifest_path
+
+    path = manifest_path(namespace)
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return ""
+    cached = _MANIFEST_STAMPS.get(namespace)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    try:
+        stamp = str(json.loads(path.read_text(encoding="utf-8")).get("generated_at") or "")
+    except Exception:
+        stamp = ""
+    _MANIFEST_STAMPS[namespace] = (mtime, stamp)
+    return stamp
+
+
+# Tokens that pin a question to a specific provision: anything with a digit
+# ("67c", "17", "2(1)(b)") and parenthesised sub-paragraph labels ("(a)", "(iv)").
+_REFERENCE_RE = re.compile(r"[\w.()/-]*\d[\w.()/-]*|\(\s*[a-z]{1,4}\s*\)")
+
+
+def reference_tokens(query: str) -> frozenset:
+    return frozenset(t.replace(" ", "") for t in _REFERENCE_RE.findall(_normalize_query(query)))
+
+
+def ingestion_version(namespaces: List[str] | None = None) -> tuple:
+    nspaces = namespaces if namespaces is not None else _namespaces()
+    return tuple((ns, _manifest_generated_at(ns)) for ns in nspaces)
+
+
+class AnswerCache:
+    def __init__(self, capacity: int = 256, threshold: float = 0.97, ttl: float = 3600.0):
+        self.capacity = capacity
+        self.threshold = threshold
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._version: tuple = ()
+        self._reset()
+
+    def _reset(self) -> None:
+        # Ring buffer: row i of _vecs belongs to _payloads[i].
+        self._vecs: np.ndarray | None = None
+        self._payloads: List[Dict | None] = [None] * max(self.capacity, 0)
+        self._refs: List[frozenset | None] = [None] * max(self.capacity, 0)
+        self._stamps = np.zeros(max(self.capacity, 0), dtype=np.float64)
+        self._next = 0
+
+    def _sync_version(self, version: tuple) -> None:
+        if version != self._version:
+            self._reset()
+            self._version = version
+
+    @staticmethod
+    def _unit(vec: List[float]) -> np.ndarray:
+        v = np.asarray(vec, dtype=np.float32)
+        n = float(np.linalg.norm(v))
+        return v / n if n > 0 else v
+
+    def get(self, vec: List[float], version: tuple, query: str = "") -> Dict | None:
+        """Payload of the most similar live entry citing the same references as ``query``."""
+        if self.capacity <= 0:
+            return None
+        with self._lock:
+            self._sync_version(version)
+            if self._vecs is None:
+                self.misses += 1
+                return None
+            v = self._unit(vec)
+            if v.shape[0] != self._vecs.shape[1]:
+                self.misses += 1
+                return None
+            sims = self._vecs @ v
+            live = self._stamps > (time.time() - self.ttl)
+            sims[~live] = -1.0
+            refs = reference_tokens(query)
+            close = np.flatnonzero(sims >= self.threshold)
+            for i in close[np.argsort(-sims[close])]:
+                if self._payloads[i] is not None and self._refs[i] == refs:
+                    self.hits += 1
+                    return self._payloads[i]
+            self.misses += 1
+            return None
+
+    def put(self, vec: List[float], version: tuple, answer: str, sources: List[Dict], query: str = "") -> None:
+        if self.capacity <= 0 or not answer:
+            return
+        with self._lock:
+            self._sync_version(version)
+            v = self._unit(vec)
+            if self._vecs is None or self._vecs.shape[1] != v.shape[0]:
+                self._reset()
+                self._vecs = np.zeros((self.capacity, v.shape[0]), dtype=np.float32)
+            slot = self._next
+            self._vecs[slot] = v
+            self._payloads[slot] = {"answer": answer, "sources": sources}
+            self._refs[slot] = reference_tokens(query)
+            self._stamps[slot] = time.time()
+            self._next = (slot + 1) % self.capacity
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "size": sum(1 for p in self._payloads if p is not None),
+                "capacity": self.capacity,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+            self.hits = self.misses = 0
+
+
+ANSWER_CACHE = AnswerCache(
+    capacity=_env_int("ANSWER_CACHE_SIZE", 0, minimum=0),
+    threshold=_env_float("ANSWER_CACHE_THRESHOLD", 0.97),
+    ttl=_env_float("ANSWER_CACHE_TTL", 3600.0),
+)
+
+
+def _cache_version() -> tuple | None:
+    """Ingestion version for answer-cache lookups, or None when the cache is off.
+
+    Skipping the lookup keeps manifest reads off the request path by default.
+    """
+    if ANSWER_CACHE.capacity <= 0:
+        return None
+    return ingestion_version()
+
+
+def _replay_chunks(answer: str) -> List[str]:
+    """Split a cached answer into word-sized pieces for SSE token replay."""
+    return re.findall(r"\S+\s*|\s+", answer)
+
+
+def ask(query: str) -> Dict:
+    """Run a query via multi-namespace Pinecone retrieval and LLM combine."""
+    version = _cache_version()
+    vec = _try_embed(query)
+    if vec is not None and version is not None:
+        cached = ANSWER_CACHE.get(vec, version, query)
+        if cached is not None:
+            return {"answer": cached["answer"], "sources": cached["sources"]}
+    docs = retrieve_multi(query, k_total=6, vec=vec)
+    response = get_chain()["llm"].invoke(_build_messages(query, docs))
+    answer = response.content if hasattr(response, 'content') else str(response)
+    sources = _format_sources(docs)
+    if vec is not None and version is not None:
+        ANSWER_CACHE.put(vec, version, answer, sources, query)
+    return {"answer": answer, "sources": sources}
+
+
+async def aask(query: str) -> Dict:
+    """Async :func:`ask`: awaits embedding, vector queries and the LLM call.
+
+    With single-flight on, joins (or starts) the flight for ``query`` and
+    returns its sources and answer; see :func:`_join_flight`.
+    """
+    if not _single_flight_enabled():
+        return await _aask_direct(query)
+    sources: List[Dict] = []
+    answer: str | None = None
+    async with aclosing(_join_flight(query)) as events:
+        async for evt in events:
+            if evt["type"] == "meta":
+                sources = evt["sources"]
+            elif evt["type"] == "done":
+                answer = evt["answer"]
+            elif evt["type"] == "error":
+                raise RuntimeError(evt["message"])
+    if answer is None:
+        raise RuntimeError("answer stream ended without a result")
+    return {"answer": answer, "sources": sources}
+
+
+async def _aask_direct(query: str) -> Dict:
+    version = _cache_version()
+    vec = await _atry_embed(query)
+    if vec is not None and version is not None:
+        cached = ANSWER_CACHE.get(vec, version, query)
+        if cached is not None:
+            return {"answer": cached["answer"], "sources": cached["sources"]}
+    docs = await aretrieve_multi(query, k_total=6, vec=vec)
+    response = await get_chain()["llm"].ainvoke(_build_messages(query, docs))
+    answer = response.content if hasattr(response, 'content') else str(response)
+    sources = _format_sources(docs)
+    if vec is not None and version is not None:
+        ANSWER_CACHE.put(vec, version, answer, sources, query)
     return {"answer": answer, "sources": sources}
 
 
-async def ask_stream(query: str) -> AsyncGenerator[Dict, None]:
+def ask_stream(query: str) -> AsyncGenerator[Dict, None]:
     """Async generator that yields streaming tokens and meta similar to ask().
 
+    Concurrent identical questions share one run (see :func:`_join_flight`)
+    unless SINGLE_FLIGHT=0.
+    """
+    if not _single_flight_enabled():
+        return _ask_events(query)
+    return _join_flight(query)
+
+
+async def _ask_events(query: str) -> AsyncGenerator[Dict, None]:
+    """Events of one retrieval and generation for ``query``.
+
     Yields dict events of shape:
       {"type": "meta", "sources": [...]} (first)
       {"type": "token", "value": "..."} (multiple)
@@ -165,25 +1071,26 @@ async def ask_stream(query: str) -> AsyncGenerator[Dict, None]:
       {"type": "error", "message": str}
     """
     try:
-        docs = retrieve_multi(query, k_total=6)
-        sources: List[Dict] = []
-        for doc in docs:
-            snippet = (doc.page_content or "").strip().replace("\n", " ")
-            if len(snippet) > 300:
-                snippet = snippet[:297] + "..."
-            sources.append({"snippet": snippet, "metadata": doc.metadata or {}})
+        version = _cache_version()
+        vec = await _atry_embed(query)
+        cached = ANSWER_CACHE.get(vec, version, query) if vec is not None and version is not None else None
+        if cached is not None:
+            # Replay the stored answer with the same event shape as a live stream.
+            yield {"type": "meta", "sources": cached["sources"]}
+            for piece in _replay_chunks(cached["answer"]):
+                yield {"type": "token", "value": piece}
+            yield {"type": "done", "answer": cached["answer"], "cached": True}
+            return
+
+        docs = await aretrieve_multi(query, k_total=6, vec=vec)
+        sources = _format_sources(docs)
         # Emit meta first
         yield {"type": "meta", "sources": sources}
 
         # Build a one-off chain manually to access streaming tokens from underlying ChatOpenAI
-        llm: ChatOpenAI = CHAIN["llm"]  # type: ignore
-        prompt = CHAIN["prompt"]  # pulled earlier
-        # The retrieval-qa-chat prompt expects "input" + "context"
+        llm = get_chain()["llm"]
         # We'll manually format the prompt for streaming rather than using the combine_docs_chain which buffers.
-        from langchain_core.messages import HumanMessage
-        # Compose context block
-        context_block = "\n\n".join([d.page_content for d in docs])
-        formatted = prompt.format_messages(input=query, context=context_block)  # returns list[BaseMessage]
+        formatted = _build_messages(query, docs)  # returns list[BaseMessage]
 
         full_answer_parts: List[str] = []
         token_count = 0
@@ -202,6 +1109,111 @@ async def ask_stream(query: str) -> AsyncGenerator[Dict, None]:
                 # ✅ Yield immediately for each token
                 yield {"type": "token", "value": token_text}
         full_answer = "".join(full_answer_parts)
+        if vec is not None and version is not None:
+            ANSWER_CACHE.put(vec, version, full_answer, sources, query)
         yield {"type": "done", "answer": full_answer}
     except Exception as e:  # pragma: no cover - streaming error path
         yield {"type": "error", "message": str(e)}
+
+
+# Single-flight: concurrent requests for the same normalized question and
+# namespace set share one retrieval and one generation. The first caller
+# starts a flight whose task runs _ask_events and records every event;
+# each caller, late joiners included, replays the recorded events and then
+# follows the live tail. A flight is forgotten as soon as it ends (the
+# answer cache serves repeats from then on) and cancelled when its last
+# caller leaves. SINGLE_FLIGHT=0 disables it.
+class _Flight:
+    def __init__(self, key: tuple, query: str):
+        self.key = key
+        self.events: List[Dict] = []
+        self.done = False
+        self.followers = 0
+        self.changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._run(query))
+
+    async def _run(self, query: str) -> None:
+        try:
+            async for evt in _ask_events(query):
+                self.events.append(evt)
+                self._wake()
+        finally:
+            self.done = True
+            self._forget()
+            self._wake()
+
+    def _wake(self) -> None:
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+    def _forget(self) -> None:
+        if _FLIGHTS.get(self.key) is self:
+            del _FLIGHTS[self.key]
+
+
+_FLIGHTS: Dict[tuple, _Flight] = {}
+
+
+def _single_flight_enabled() -> bool:
+    return os.getenv("SINGLE_FLIGHT", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+async def _join_flight(query: str) -> AsyncGenerator[Dict, None]:
+    key = (id(asyncio.get_running_loop()), _normalize_query(query), tuple(_namespaces()))
+    flight = _FLIGHTS.get(key)
+    if flight is None:
+        flight = _FLIGHTS[key] = _Flight(key, query)
+    flight.followers += 1
+    try:
+        i = 0
+        while True:
+            while i < len(flight.events):
+                yield flight.events[i]
+                i += 1
+            if flight.done:
+                return
+            await flight.changed.wait()
+    finally:
+        flight.followers -= 1
+        if flight.followers == 0 and not flight.done:
+            # Nobody is listening any more; a new caller starts afresh.
+            flight._forget()
+            flight.task.cancel()
+
+
+def warmup() -> Dict[str, float]:
+    """Pay the cold-start costs before the first user request does.
+
+    Builds the chain (imports and OpenAI clients), opens the Pinecone index
+    handle and its pooled connection with a stats call, loads the local and
+    keyword indexes of the configured namespaces when they are in use, and
+    embeds a one-word query so the embeddings client has a warm connection.
+    The query bypasses the embedding cache, which would otherwise answer it
+    without a request. Returns the seconds each step took; raises if any
+    step fails.
+    """
+    timings: Dict[str, float] = {}
+    t0 = time.perf_counter()
+    embeddings = get_chain()["embeddings"]
+    timings["chain"] = time.perf_counter() - t0
+    nspaces = _namespaces()
+    index_name = os.getenv("INDEX_NAME2")
+    if index_name and not all(_is_local(ns) for ns in nspaces):
+        t0 = time.perf_counter()
+        get_index(index_name).describe_index_stats()
+        timings["pinecone"] = time.perf_counter() - t0
+    local = [ns for ns in nspaces if _is_local(ns)]
+    if local:
+        t0 = time.perf_counter()
+        for ns in local:
+            _local_store().count(ns)
+        timings["local"] = time.perf_counter() - t0
+    if _hybrid_enabled():
+        t0 = time.perf_counter()
+        for ns in nspaces:
+            _keyword_store().get(ns)
+        timings["keyword"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    embeddings.embed_query("warmup")
+    timings["embed"] = time.perf_counter() - t0
+    return timings
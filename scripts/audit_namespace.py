@@ -5,15 +5,19 @@ Usage:
 
 What it does:
   1. Loads .env for keys.
-  2. Attempts to load previously generated manifest (data/_manifests/<namespace>.json) if present.
-  3. Performs similarity sweeps using a set of probe queries to colleare we using fct unique (file_name, sha1) pairs.
-     NOTE: Free Pinecone plans may not expose direct index scans; this heuristic approach samples.
-  4. Builds a summary of observed files + counts vs manifest + filesystem expectation.
-  5. Exits with non-zero code if any expected file is completely missing (no observed chunks and not listed in manifest).
-
-Limitations:
-  - Without index listing API access, we approximate by multiple broad queries.
-  - For a definitive count you would need Pinecone's describe stats or a dedicated metadata filter scan.
+  2. Loads the manifest generated by ingestion (data/_manifests/<namespace>.json).
+  3. If the manifest records chunk IDs, audits exactly: fetches those IDs from the
+     index in batches and compares sets per source file, and compares the
+     namespace's vector count with the manifest to count vectors it does not know
+     (--scan lists the whole namespace to say which sources they belong to).
+  4. Otherwise (older manifest) falls back to similarity sweeps with a set of probe
+     queries to collect unique (file_name, sha1) pairs.
+  5. Checks the files matching --expect-pattern against the manifest / observations.
+  6. Exits with non-zero code if any recorded chunk is missing from the index or an
+     expected file is missing entirely.
+
+Limitations (sampling fallback only):
+  - Probe queries approximate the namespace contents; re-run ingestion to record chunk IDs.
 """
 from __future__ import annotations
 
@@ -29,6 +33,14 @@ from dotenv import load_dotenv
 from pinecone import Pinecone
 from langchain_openai import OpenAIEmbeddings
 
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from ingestion.pipelines.manifest import chunk_ids, load_manifest  # noqa: E402
+from ingestion.vectorstore.backend import PineconeBackend  # noqa: E402
+from ingestion.vectorstore.scan import iter_ids, present_ids, scan_metadata  # noqa: E402
+
 PROBE_QUERIES = [
     "IFRS 17 overview",
     "contract measurement approach",
@@ -39,17 +51,6 @@ PROBE_QUERIES = [
 ]
 
 
-def load_manifest(ns: str) -> dict | None:
-    path = Path("data/_manifests") / f"{ns}.json"
-    if path.is_file():
-        import json
-        try:
-            return json.loads(path.read_text(encoding="utf-8"))
-        except Exception:
-            return None
-    return None
-
-
 def expected_files_from_pattern(pattern: str | None) -> Set[str]:
     if not pattern:
         return set()
@@ -60,6 +61,77 @@ def expected_files_from_pattern(pattern: str | None) -> Set[str]:
     return out
 
 
+def _open_index():
+    api_key = os.getenv("PINECONE_API_KEY") or os.getenv("PINECONE_API_KEY2")
+    index_name = os.getenv("INDEX_NAME2")
+    if not api_key or not index_name:
+        return None
+    return Pinecone(api_key=api_key).Index(index_name)
+
+
+def exact_audit(ns: str, recorded: Dict[str, Set[str]], expected: Set[str], scan: bool = False) -> int:
+    """Compare the manifest's chunk IDs with the index; returns the exit code."""
+    index = _open_index()
+    if index is None:
+        print("Missing Pinecone env vars.")
+        return 1
+    wanted: Set[str] = set().union(*recorded.values()) if recorded else set()
+    # Presence only: list the namespace's IDs (no vector values are
+    # transferred) and count those the manifest does not know.
+    present: Set[str] = set()
+    unknown = 0
+    listed = True
+    try:
+        for vid in iter_ids(index, ns):
+            if vid in wanted:
+                present.add(vid)
+            else:
+                unknown += 1
+        total = len(present) + unknown
+    except Exception as e:
+        print(f"[warn] listing IDs failed ({e}); checking the manifest's IDs with batched fetches")
+        listed = False
+        present = set(present_ids(index, ns, sorted(wanted)))
+        total = PineconeBackend(index).count(ns)
+        unknown = total - len(present)
+
+    print(f"Namespace: {ns}")
+    print(f"Manifest chunk IDs: {len(wanted)}  present in index: {len(present)}  vectors in namespace: {total}")
+    incomplete = []
+    for src, ids in sorted(recorded.items()):
+        have = len(ids & present)
+        mark = "OK" if have == len(ids) else f"MISSING {len(ids) - have}"
+        print(f"  {src}: {have}/{len(ids)} {mark}")
+        if have < len(ids):
+            incomplete.append(src)
+    if unknown > 0:
+        print(f"Vectors not in the manifest: {unknown} (stale or from another ingest; see scripts/cleanup_duplicates.py)")
+        if scan and not listed:
+            print("  (--scan needs an index that supports listing IDs)")
+        elif scan:
+            by_source: Dict[str, int] = defaultdict(int)
+            for vid, md in scan_metadata(index, ns):
+                if vid not in wanted:
+                    by_source[md.get("source") or md.get("source_path") or "unknown"] += 1
+            for src, n in sorted(by_source.items()):
+                print(f"  not in manifest: {src}: {n}")
+
+    recorded_files = {Path(src).name for src in recorded}
+    absent = sorted(fn for fn in expected if fn not in recorded_files)
+    if expected:
+        print("Expected files from pattern:")
+        for fn in sorted(expected):
+            print(f"  {fn}: {'OK' if fn in recorded_files else 'MISSING'}")
+
+    if incomplete or absent:
+        print("\nERROR: index is missing recorded chunks or expected files:")
+        for f in incomplete + absent:
+            print("  -", f)
+        return 2
+    print("\nAudit complete: every recorded chunk is present (exact).")
+    return 0
+
+
 def embed(texts, embeddings):
     if isinstance(texts, str):
         texts = [texts]
@@ -67,13 +139,10 @@ def embed(texts, embeddings):
 
 
 def sample_namespace(ns: str, embeddings, top_k: int = 25):
-    api_key = os.getenv("PINECONE_API_KEY") or os.getenv("PINECONE_API_KEY2")
-    index_name = os.getenv("INDEX_NAME2")
-    if not api_key or not index_name:
+    index = _open_index()
+    if index is None:
         print("Missing Pinecone env vars.")
         return []
-    pc = Pinecone(api_key=api_key)
-    index = pc.Index(index_name)
     seen = {}
     for q in PROBE_QUERIES:
         vec = embeddings.embed_query(q)
@@ -96,14 +165,19 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--namespace", required=True)
     parser.add_argument("--expect-pattern", help="Glob of expected source PDFs (e.g. data/ifrs-17/*.pdf)")
-    parser.add_argument("--top-k", type=int, default=25, help="Top_k per probe query")
+    parser.add_argument("--top-k", type=int, default=25, help="Top_k per probe query (sampling fallback)")
+    parser.add_argument("--scan", action="store_true", help="List the whole namespace to name vectors missing from the manifest")
     args = parser.parse_args()
 
     load_dotenv()
 
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-
     manifest = load_manifest(args.namespace)
+    recorded = chunk_ids(manifest)
+    if recorded is not None:
+        sys.exit(exact_audit(args.namespace, recorded, expected_files_from_pattern(args.expect_pattern), scan=args.scan))
+    print("[info] manifest has no chunk IDs; sampling with probe queries instead (re-run ingestion for an exact audit)")
+
+    embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
     manifest_files = {f["file_name"] for f in (manifest.get("files") if manifest else [])}
 
     observed = sample_namespace(args.namespace, embeddings, top_k=args.top_k)
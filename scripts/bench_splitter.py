@@ -0,0 +1,111 @@
+"""Benchmark the native splitter against LangChain's RecursiveCharacterTextSplitter.
+
+Usage:
+  python scripts/bench_splitter.py [--pattern "data/**/*.pdf"] [--repeat 3] [--tokens]
+
+Pages are extracted once (through the extraction cache), then both splitters
+split the same documents with ingestion's settings (1000 characters, 150
+overlap). For each file it prints the best-of-``--repeat`` time of each
+splitter and whether they produced identical chunks. ``--tokens`` also
+compares token-sized splitting (CHUNK_SIZE/CHUNK_OVERLAP tokens, tiktoken
+length function on both sides).
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from langchain_core.documents import Document  # noqa: E402
+
+try:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+except Exception:  # pragma: no cover
+    from langchain.text_splitter import RecursiveCharacterTextSplitter  # type: ignore
+
+from ingestion.loaders.cache import default_extraction_cache  # noqa: E402
+from ingestion.loaders.extract import load_file  # noqa: E402
+from ingestion.splitters.recursive import RecursiveSplitter, token_splitter  # noqa: E402
+
+
+def _best(fn: Callable[[], List[Document]], repeat: int) -> tuple[float, List[Document]]:
+    best = float("inf")
+    out: List[Document] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def _compare(name: str, docs: List[Document], reference, native: RecursiveSplitter, repeat: int) -> tuple[float, float, bool]:
+    t_ref, ref = _best(lambda: reference.split_documents(docs), repeat)
+    t_nat, nat = _best(lambda: native.split_documents(docs), repeat)
+    same = [d.page_content for d in ref] == [d.page_content for d in nat]
+    chars = sum(len(d.page_content) for d in docs)
+    print(
+        f"{name[:48]:48} {len(docs):5d} pages {chars / 1e6:6.2f} MB {len(nat):6d} chunks  "
+        f"langchain {t_ref * 1000:8.1f} ms  native {t_nat * 1000:8.1f} ms  "
+        f"x{t_ref / max(t_nat, 1e-9):5.1f}  {'identical' if same else 'DIFFERENT'}"
+    )
+    return t_ref, t_nat, same
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Benchmark the native recursive splitter")
+    p.add_argument("--pattern", action="append", help="Glob(s) of files to split (default: the repo's PDFs)")
+    p.add_argument("--repeat", type=int, default=3, help="Runs per splitter; the best time is reported")
+    p.add_argument("--tokens", action="store_true", help="Also compare token-sized splitting")
+    p.add_argument("--chunk-tokens", type=int, default=256, help="Chunk size in tokens for --tokens")
+    p.add_argument("--overlap-tokens", type=int, default=32, help="Chunk overlap in tokens for --tokens")
+    p.add_argument("--model", default="text-embedding-3-large", help="Tokenizer model for --tokens")
+    args = p.parse_args()
+
+    patterns = args.pattern or [str(REPO_ROOT / "data" / "**" / "*.pdf")]
+    files = sorted({Path(f) for pat in patterns for f in glob.glob(pat, recursive=True) if Path(f).is_file()})
+    if not files:
+        raise SystemExit("No files matched.")
+
+    cache = default_extraction_cache()
+    runs = [(
+        "chars",
+        RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150, separators=["\n\n", "\n", " ", ""]),
+        RecursiveSplitter(1000, 150),
+    )]
+    if args.tokens:
+        native = token_splitter(args.model, args.chunk_tokens, args.overlap_tokens)
+        runs.append((
+            f"tokens ({args.chunk_tokens}/{args.overlap_tokens})",
+            RecursiveCharacterTextSplitter(
+                chunk_size=args.chunk_tokens,
+                chunk_overlap=args.overlap_tokens,
+                separators=["\n\n", "\n", " ", ""],
+                length_function=native.length_function,
+            ),
+            native,
+        ))
+
+    loaded = [(f, load_file(f, cache)) for f in files]
+    ok = True
+    for label, reference, native in runs:
+        print(f"== {label}")
+        total_ref = total_nat = 0.0
+        for f, docs in loaded:
+            t_ref, t_nat, same = _compare(f.name, docs, reference, native, args.repeat)
+            total_ref += t_ref
+            total_nat += t_nat
+            ok = ok and same
+        print(f"{'total':48} langchain {total_ref:.3f} s  native {total_nat:.3f} s  x{total_ref / max(total_nat, 1e-9):.1f}")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,112 +4,151 @@ This script identifies and removes duplicate vectors based on SHA1 hash in metad
 Since ingestion uses deterministic IDs based on content hash, true duplicates
 should be rare, but this handles edge cases from multiple ingestion runs.
 
+The namespace is scanned page by page (every list page, metadata fetched in
+parallel bounded batches) and streamed into the duplicate finder, so it
+works for namespaces of any size.
+
 Usage:
-    python scripts/cleanup_duplicates.py --namespace ifrs-17 [--dry-run]
+    python scripts/cleanup_duplicates.py --namespace ifrs-17 [--dry-run] [--batch-size 100] [--workers 4]
 """
 
 import argparse
 import os
-from collections import defaultdict
-from typing import Dict, List, Set
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List
 
 from dotenv import load_dotenv
 from pinecone import Pinecone
 
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from ingestion.vectorstore.backend import PineconeBackend  # noqa: E402
+from ingestion.vectorstore.scan import scan_metadata  # noqa: E402
+
+
+def _sample_metadata(index, namespace: str) -> Iterator[Dict]:
+    """Probe-query sampling for indexes that cannot list IDs (partial view)."""
+    from langchain_openai import OpenAIEmbeddings
+    embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
+
+    probe_queries = [
+        "IFRS 17 overview", "contract measurement", "CSM calculation",
+        "loss component", "digital training", "simplified approach"
+    ]
+
+    seen_ids = set()
+    for query in probe_queries:
+        vec = embeddings.embed_query(query)
+        try:
+            res = index.query(vector=vec, top_k=100, include_metadata=True, namespace=namespace)
+            for match in res.get('matches', []):
+                if match['id'] not in seen_ids:
+                    metadata = dict(match.get('metadata') or {})
+                    metadata['id'] = match['id']
+                    seen_ids.add(match['id'])
+                    yield metadata
+        except Exception as query_e:
+            print(f"Query failed: {query_e}")
+
 
-def get_all_vectors_metadata(namespace: str, api_key: str, index_name: str) -> List[Dict]:
-    """Fetch all vector metadata from a namespace using list_paginated."""
+def iter_vectors_metadata(namespace: str, api_key: str, index_name: str,
+                          batch_size: int | None = None, workers: int | None = None) -> Iterator[Dict]:
+    """Stream metadata (plus 'id') of every vector in a namespace.
+
+    Walks all list pages and fetches metadata in parallel bounded batches
+    (see ingestion/vectorstore/scan.py), so nothing is held per vector here.
+    """
     pc = Pinecone(api_key=api_key)
     index = pc.Index(index_name)
-    
-    all_vectors = []
+
+    scanned = 0
     try:
-        # Use list with pagination to get all vectors
-        results = index.list(namespace=namespace)
-        vector_ids = results.get('vectors', [])
-        
-        if vector_ids:
-            # Fetch metadata for all vectors
-            fetch_response = index.fetch(ids=vector_ids, namespace=namespace)
-            for vector_id, vector_data in fetch_response.get('vectors', {}).items():
-                metadata = vector_data.get('metadata', {})
-                metadata['id'] = vector_id
-                all_vectors.append(metadata)
-                
+        for vector_id, metadata in scan_metadata(index, namespace, batch_size=batch_size, workers=workers):
+            metadata['id'] = vector_id
+            scanned += 1
+            if scanned % 10000 == 0:
+                print(f"  scanned {scanned} vectors...")
+            yield metadata
     except Exception as e:
-        print(f"Error fetching vectors: {e}")
-        # Fallback: try query-based sampling
-        print("Falling back to query-based sampling...")
-        from langchain_openai import OpenAIEmbeddings
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-        
-        probe_queries = [
-            "IFRS 17 overview", "contract measurement", "CSM calculation", 
-            "loss component", "digital training", "simplified approach"
-        ]
-        
-        seen_ids = set()
-        for query in probe_queries:
-            vec = embeddings.embed_query(query)
-            try:
-                res = index.query(vector=vec, top_k=100, include_metadata=True, namespace=namespace)
-                for match in res.get('matches', []):
-                    if match['id'] not in seen_ids:
-                        metadata = match.get('metadata', {})
-                        metadata['id'] = match['id']
-                        all_vectors.append(metadata)
-                        seen_ids.add(match['id'])
-            except Exception as query_e:
-                print(f"Query failed: {query_e}")
-                
-    return all_vectors
-
-
-def find_duplicates(vectors_metadata: List[Dict]) -> Dict[str, List[str]]:
-    """Group vectors by SHA1 hash to find duplicates."""
-    hash_to_ids: Dict[str, List[str]] = defaultdict(list)
-    
+        if scanned:
+            raise
+        print(f"Error listing vectors: {e}")
+        print("Falling back to query-based sampling (partial view)...")
+        yield from _sample_metadata(index, namespace)
+
+
+def find_duplicates(vectors_metadata: Iterable[Dict]) -> Dict[str, List[str]]:
+    """Group vectors by SHA1 hash to find duplicates, streaming.
+
+    Only a 20-byte digest per distinct SHA1 is kept (plus the kept ID when
+    it is not the canonical ``sha1[:32]`` ingestion assigns); groups are
+    materialised for duplicates alone. The first ID in each returned group
+    is the one to keep, preferring the canonical ID.
+    """
+    keepers: Dict[bytes, str | None] = {}
+    duplicates: Dict[str, List[str]] = {}
+    total = 0
+
     for metadata in vectors_metadata:
+        total += 1
         sha1 = metadata.get('sha1')
         vector_id = metadata.get('id')
-        if sha1 and vector_id:
-            hash_to_ids[sha1].append(vector_id)
-    
-    # Return only groups with more than one vector (duplicates)
-    duplicates = {sha1: ids for sha1, ids in hash_to_ids.items() if len(ids) > 1}
+        if not sha1 or not vector_id:
+            continue
+        try:
+            digest = bytes.fromhex(sha1)
+        except ValueError:
+            digest = sha1.encode()
+        canonical = vector_id == sha1[:32]
+        if digest not in keepers:
+            keepers[digest] = None if canonical else vector_id
+            continue
+        group = duplicates.get(sha1)
+        if group is None:
+            kept = keepers[digest]
+            group = duplicates[sha1] = [kept if kept is not None else sha1[:32]]
+        if canonical and group[0] != vector_id:
+            group.append(group[0])
+            group[0] = vector_id
+            keepers[digest] = None
+        elif vector_id not in group:
+            group.append(vector_id)
+
+    print(f"Found {total} total vectors")
     return duplicates
 
 
-def cleanup_duplicates(namespace: str, duplicates: Dict[str, List[str]], 
+def cleanup_duplicates(namespace: str, duplicates: Dict[str, List[str]],
                       api_key: str, index_name: str, dry_run: bool = True):
     """Remove duplicate vectors, keeping only the first one in each group."""
     pc = Pinecone(api_key=api_key)
     index = pc.Index(index_name)
-    
-    total_to_delete = 0
+
+    to_delete: List[str] = []
     for sha1, ids in duplicates.items():
-        to_delete = ids[1:]  # Keep first, delete rest
-        total_to_delete += len(to_delete)
-        
-        print(f"SHA1 {sha1[:16]}...: keeping {ids[0]}, deleting {len(to_delete)} duplicates")
-        
-        if not dry_run:
-            try:
-                index.delete(ids=to_delete, namespace=namespace)
-                print(f"  ✓ Deleted {len(to_delete)} duplicate vectors")
-            except Exception as e:
-                print(f"  ✗ Error deleting duplicates: {e}")
-    
+        print(f"SHA1 {sha1[:16]}...: keeping {ids[0]}, deleting {len(ids) - 1} duplicates")
+        to_delete.extend(ids[1:])
+
     if dry_run:
-        print(f"\nDRY RUN: Would delete {total_to_delete} duplicate vectors")
-    else:
-        print(f"\nDeleted {total_to_delete} duplicate vectors")
+        print(f"\nDRY RUN: Would delete {len(to_delete)} duplicate vectors")
+        return
+    try:
+        # Batched ID deletes, 1000 per request.
+        PineconeBackend(index).delete(to_delete, namespace)
+        print(f"\nDeleted {len(to_delete)} duplicate vectors")
+    except Exception as e:
+        print(f"  ✗ Error deleting duplicates: {e}")
 
 
 def main():
     parser = argparse.ArgumentParser(description="Clean up duplicate vectors in Pinecone namespace")
     parser.add_argument("--namespace", required=True, help="Pinecone namespace to clean")
     parser.add_argument("--dry-run", action="store_true", help="Show what would be deleted without actually deleting")
+    parser.add_argument("--batch-size", type=int, default=None, help="IDs per metadata fetch (default: SCAN_BATCH or 100)")
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent fetches (default: SCAN_WORKERS or 4)")
     args = parser.parse_args()
     
     load_dotenv()
@@ -122,13 +161,7 @@ def main():
         return
     
     print(f"Analyzing namespace: {args.namespace}")
-    vectors_metadata = get_all_vectors_metadata(args.namespace, api_key, index_name)
-    print(f"Found {len(vectors_metadata)} total vectors")
-    
-    if not vectors_metadata:
-        print("No vectors found in namespace")
-        return
-    
+    vectors_metadata = iter_vectors_metadata(args.namespace, api_key, index_name, args.batch_size, args.workers)
     duplicates = find_duplicates(vectors_metadata)
     
     if not duplicates:
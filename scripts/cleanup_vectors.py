@@ -1,11 +1,19 @@
 import argparse
 import os
+import sys
 from pathlib import Path
 
 from dotenv import load_dotenv
 from langchain_openai import OpenAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
 
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from ingestion.pipelines.manifest import file_chunk_ids, forget_sources, load_manifest, manifest_path  # noqa: E402
+from ingestion.vectorstore.backend import PineconeBackend  # noqa: E402
+
 
 def delete_by_namespace(index_name: str, namespace: str) -> None:
     embeddings = OpenAIEmbeddings(model="text-embedding-3-large", openai_api_key=os.getenv("OPENAI_API_KEY"))
@@ -13,16 +21,16 @@ def delete_by_namespace(index_name: str, namespace: str) -> None:
     index = store._index  # type: ignore[attr-defined]
     index.delete(delete_all=True, namespace=namespace)
     print(f"Deleted all vectors in namespace='{namespace}'.")
+    # Everything it recorded is gone; the next ingest starts from scratch.
+    manifest = load_manifest(namespace)
+    if manifest and manifest.get("chunk_ids"):
+        forget_sources(namespace, list(manifest["chunk_ids"]))
+        print(f"Cleared chunk IDs in {manifest_path(namespace)} and the ingest state.")
 
 
-def delete_by_file(index_name: str, file_path: str, namespace: str | None = None) -> None:
-    embeddings = OpenAIEmbeddings(model="text-embedding-3-large", openai_api_key=os.getenv("OPENAI_API_KEY"))
-    store = PineconeVectorStore(index_name=index_name, embedding=embeddings, namespace=namespace)
-    index = store._index  # type: ignore[attr-defined]
-
-    repo_root = Path(__file__).resolve().parents[1]
-    abs_path = str((repo_root / file_path).resolve())
-
+def _delete_by_filters(index, file_path: str, namespace: str | None) -> None:
+    """Metadata-filter deletes for manifests written before chunk IDs were recorded."""
+    abs_path = str((REPO_ROOT / file_path).resolve())
     filters = [
         {"source": {"$eq": file_path}},
         {"source_path": {"$eq": file_path}},
@@ -34,6 +42,29 @@ def delete_by_file(index_name: str, file_path: str, namespace: str | None = None
     print(f"Requested deletion for file='{file_path}' in namespace='{namespace or ''}'.")
 
 
+def delete_by_file(index_name: str, file_path: str, namespace: str | None = None) -> None:
+    embeddings = OpenAIEmbeddings(model="text-embedding-3-large", openai_api_key=os.getenv("OPENAI_API_KEY"))
+    store = PineconeVectorStore(index_name=index_name, embedding=embeddings, namespace=namespace)
+    index = store._index  # type: ignore[attr-defined]
+
+    found = file_chunk_ids(load_manifest(namespace), file_path)
+    if found is None:
+        print(
+            f"[warn] {manifest_path(namespace)} has no chunk IDs (re-run ingestion to record them); "
+            "falling back to metadata filter deletes."
+        )
+        _delete_by_filters(index, file_path, namespace)
+        return
+    source, ids = found
+    if not ids:
+        print(f"No chunks recorded for '{file_path}' in namespace='{namespace or ''}'; nothing to delete.")
+        return
+    # Batched ID deletes (1000 per request); no filter scans.
+    n = PineconeBackend(index).delete(sorted(ids), namespace or "")
+    forget_sources(namespace, [source])
+    print(f"Deleted {n} chunk(s) of '{source}' from namespace='{namespace or ''}'.")
+
+
 def main() -> None:
     load_dotenv()
     index_name = os.getenv("INDEX_NAME2")
@@ -47,7 +78,7 @@ def main() -> None:
     ns = sub.add_parser("namespace", help="Delete all vectors in a namespace")
     ns.add_argument("name", help="Namespace to delete")
 
-    df = sub.add_parser("file", help="Delete vectors by file path metadata")
+    df = sub.add_parser("file", help="Delete a file's vectors by the chunk IDs in the namespace manifest")
     df.add_argument("path", help="Relative file path e.g. data/documents/YourDoc.pdf")
     df.add_argument("--namespace", default=None, help="Namespace to target (default: empty)")
 
@@ -0,0 +1,98 @@
+"""Report what importing the app and CLI modules costs.
+
+Usage:
+  python scripts/profile_imports.py [module ...] [--top 15] [--min-ms 5]
+
+Each module (default: rag_core, server.app.main, ingestion.cli) is imported
+in a fresh interpreter with ``python -X importtime``. The report gives the
+total import time and the slowest imports by cumulative time (an import and
+everything it pulled in), keeping only the outermost entry of each slow
+subtree so a heavy package is listed once rather than with its submodules.
+Run it before and after touching module-level imports to catch regressions
+in cold-start time.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+from typing import List, NamedTuple
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_MODULES = ["rag_core", "server.app.main", "ingestion.cli"]
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+class ImportTime(NamedTuple):
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def profile(module: str) -> List[ImportTime]:
+    """``-X importtime`` records for importing ``module``, in the order Python prints them."""
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [str(REPO_ROOT), os.getenv("PYTHONPATH")]))}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise RuntimeError(f"import {module} failed: {tail[0]}")
+    records: List[ImportTime] = []
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m:
+            records.append(ImportTime(m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return records
+
+
+def slowest(records: List[ImportTime], top: int, min_us: int) -> List[ImportTime]:
+    """Outermost imports costing at least ``min_us``, slowest first.
+
+    Python prints a child before its parent, so walking backwards visits
+    parents first; a record is skipped while inside an already listed one.
+    """
+    picked: List[ImportTime] = []
+    covered_depth = None
+    for rec in reversed(records):
+        if covered_depth is not None and rec.depth > covered_depth:
+            continue
+        covered_depth = None
+        # Level 0 is the profiled module itself; report what it pulls in.
+        if rec.depth > 0 and rec.cumulative_us >= min_us:
+            picked.append(rec)
+            covered_depth = rec.depth
+    return sorted(picked, key=lambda r: r.cumulative_us, reverse=True)[:top]
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description="Profile module import time")
+    p.add_argument("modules", nargs="*", help=f"Modules to import (default: {' '.join(DEFAULT_MODULES)})")
+    p.add_argument("--top", type=int, default=15, help="Slowest imports to list per module")
+    p.add_argument("--min-ms", type=float, default=5.0, help="Ignore imports cheaper than this")
+    args = p.parse_args()
+
+    failed = False
+    for module in args.modules or DEFAULT_MODULES:
+        try:
+            records = profile(module)
+        except RuntimeError as e:
+            print(f"== {module}: {e}")
+            failed = True
+            continue
+        root = next((r for r in reversed(records) if r.name == module), None)
+        total = root.cumulative_us if root else sum(r.self_us for r in records)
+        print(f"== {module}: {total / 1000:.0f} ms, {len(records)} modules")
+        for rec in slowest(records, args.top, int(args.min_ms * 1000)):
+            print(f"  {rec.cumulative_us / 1000:8.1f} ms  {rec.name}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
 import os
+import sys
 from pathlib import Path
 
 from dotenv import load_dotenv
 from langchain_openai import OpenAIEmbeddings
 from langchain_pinecone import PineconeVectorStore
 
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+OLD_SOURCES = ["InsuranceAct.pdf", "www/InsuranceAct.pdf"]
+
 
 def main() -> None:
     load_dotenv()
@@ -21,21 +28,35 @@ def main() -> None:
     store = PineconeVectorStore(index_name=index_name, embedding=embeddings)
 
     try:
-        # Use low-level client to delete by filter in default (empty) namespace
+        from ingestion.pipelines.manifest import file_chunk_ids, forget_sources, load_manifest
+        from ingestion.vectorstore.backend import PineconeBackend
+
+        # Use low-level client to delete in the default (empty) namespace
         index = store._index  # type: ignore[attr-defined]
-        repo_root = Path(__file__).resolve().parents[1]
-        absolute = str((repo_root / "InsuranceAct.pdf").resolve())
-        candidates = [
-            {"source": {"$eq": "InsuranceAct.pdf"}},
-            {"source": {"$eq": "www/InsuranceAct.pdf"}},
-            {"source_path": {"$eq": "InsuranceAct.pdf"}},
-            {"source_path": {"$eq": "www/InsuranceAct.pdf"}},
-            {"source": {"$eq": absolute}},
-            {"source_path": {"$eq": absolute}},
-        ]
-        for f in candidates:
-            index.delete(filter=f, namespace="", delete_all=False)
-        print("Requested deletion of old InsuranceAct.pdf vectors in default namespace (if any).")
+        manifest = load_manifest(None)
+        found = [f for f in (file_chunk_ids(manifest, src) for src in OLD_SOURCES) if f is not None]
+        if found:
+            # The default namespace's manifest records the old file's chunk IDs:
+            # delete exactly those, in batches.
+            ids = sorted({vid for _, file_ids in found for vid in file_ids})
+            if ids:
+                PineconeBackend(index).delete(ids, "")
+                forget_sources(None, [src for src, file_ids in found if file_ids])
+            print(f"Deleted {len(ids)} old InsuranceAct.pdf chunk(s) in default namespace.")
+        else:
+            # No chunk IDs recorded (older manifest): fall back to metadata filters.
+            absolute = str((REPO_ROOT / "InsuranceAct.pdf").resolve())
+            candidates = [
+                {"source": {"$eq": "InsuranceAct.pdf"}},
+                {"source": {"$eq": "www/InsuranceAct.pdf"}},
+                {"source_path": {"$eq": "InsuranceAct.pdf"}},
+                {"source_path": {"$eq": "www/InsuranceAct.pdf"}},
+                {"source": {"$eq": absolute}},
+                {"source_path": {"$eq": absolute}},
+            ]
+            for f in candidates:
+                index.delete(filter=f, namespace="", delete_all=False)
+            print("Requested deletion of old InsuranceAct.pdf vectors in default namespace (if any).")
     except Exception as e:
         raise SystemExit(f"ERROR deleting old vectors: {e}")
 
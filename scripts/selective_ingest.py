@@ -1,7 +1,11 @@
 """Selective PDF ingestion script.
 
-Ingests PDFs one by one, checking if they're already present and skipping if so.
-Creates or updates the manifest after each successful ingestion.
+Ingests one PDF or a directory of PDFs in a single in-process run: one
+embeddings client, one Pinecone connection and dimension check, and chunks
+from all files batched together into embedding and upsert requests.
+Files whose content hash matches the namespace's ingest state
+(data/_state/<namespace>.sqlite) are skipped exactly; --force re-processes
+them. Prints a per-file result and updates the manifest at the end.
 
 Usage:
     python scripts/selective_ingest.py --namespace ifrs-17 --file "data/ifrs-17/IFRS-17-a-simplified-approach.pdf"
@@ -9,103 +13,68 @@ Usage:
 """
 
 import argparse
+import glob
 import os
-import subprocess
 import sys
+import time
 from pathlib import Path
-from typing import List, Set
+from typing import Dict, List
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from scripts.audit_namespace import sample_namespace
-from langchain_openai import OpenAIEmbeddings
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
 
+from ingestion.cli import FileResult, ingest  # noqa: E402
 
-def get_existing_files_in_namespace(namespace: str) -> Set[str]:
-    """Get list of files already present in the namespace."""
-    try:
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-        observed = sample_namespace(namespace, embeddings, top_k=50)
-        existing_files = set()
-        for md in observed:
-            fn = md.get("file_name") or "unknown"
-            if fn != "unknown":
-                existing_files.add(fn)
-        return existing_files
-    except Exception as e:
-        print(f"Warning: Could not check existing files in namespace: {e}")
-        return set()
-
-
-def ingest_single_file(file_path: Path, namespace: str) -> bool:
-    """Ingest a single PDF file into the specified namespace."""
+
+def ingest_files(files: List[Path], namespace: str, force: bool = False) -> Dict[str, FileResult]:
+    """Ingest ``files`` in one session; returns a result per file (repo-relative path)."""
+    results: Dict[str, FileResult] = {}
+    t0 = time.perf_counter()
     try:
-        # Call ingestion CLI as subprocess
-        cmd = [
-            sys.executable, "-m", "ingestion.cli",
-            "--namespace", namespace,
-            "--pattern", str(file_path)
-        ]
-        
-        result = subprocess.run(cmd, capture_output=True, text=True, cwd=Path(__file__).parent.parent)
-        
-        if result.returncode == 0:
-            # Parse output to get chunk counts
-            output = result.stdout
-            if "upserted" in output and "chunks" in output:
-                print(f"✓ {file_path.name}: {output.strip().split('Created')[1] if 'Created' in output else 'Ingested successfully'}")
-            else:
-                print(f"✓ {file_path.name}: Ingested successfully")
-            return True
+        created, upserted = ingest(
+            patterns=[glob.escape(str(f)) for f in files],
+            namespace=namespace,
+            incremental=not force,
+            file_results=results,
+        )
+    except SystemExit as e:
+        print(f"✗ Ingestion failed: {e}")
+        return results
+    for rel, res in sorted(results.items()):
+        name = Path(rel).name
+        if res.status == "ingested":
+            print(f"✓ {name}: {res.chunks} chunks, {res.upserted} upserted")
+        elif res.status == "unchanged":
+            print(f"⏭️  {name}: Unchanged since last ingest, skipping")
+        elif res.status == "removed":
+            print(f"🗑️  {name}: Gone from disk, deleted {res.chunks} chunks")
         else:
-            print(f"✗ {file_path.name}: Failed to ingest")
-            if result.stderr:
-                print(f"    Error: {result.stderr.strip()}")
-            return False
-            
-    except Exception as e:
-        print(f"✗ {file_path.name}: Failed to ingest - {e}")
-        return False
+            print(f"✗ {name}: No text extracted")
+    print(f"Created {created} chunks; upserted {upserted} in {time.perf_counter() - t0:.1f}s")
+    return results
 
 
 def ingest_directory_selective(directory: Path, namespace: str, force: bool = False) -> None:
-    """Ingest all PDFs in directory, skipping those already present unless force=True."""
-    pdf_files = list(directory.glob("*.pdf"))
+    """Ingest all PDFs in directory, skipping unchanged ones unless force=True."""
+    pdf_files = sorted(directory.glob("*.pdf"))
     if not pdf_files:
         print(f"No PDF files found in {directory}")
         return
-    
+
     print(f"Found {len(pdf_files)} PDF files in {directory}")
-    
-    if not force:
-        existing_files = get_existing_files_in_namespace(namespace)
-        print(f"Found {len(existing_files)} files already in namespace: {namespace}")
-        
-        if existing_files:
-            print("Already present files:")
-            for fn in sorted(existing_files):
-                print(f"  - {fn}")
-    else:
-        existing_files = set()
-        print("Force mode: will attempt to ingest all files regardless of existing content")
-    
-    success_count = 0
-    skip_count = 0
-    
-    for pdf_file in sorted(pdf_files):
-        if not force and pdf_file.name in existing_files:
-            print(f"⏭️  {pdf_file.name}: Already present, skipping")
-            skip_count += 1
-            continue
-        
-        print(f"\n📄 Processing: {pdf_file.name}")
-        if ingest_single_file(pdf_file, namespace):
-            success_count += 1
-    
+    if force:
+        print("Force mode: will re-process all files regardless of recorded state")
+
+    results = ingest_files(pdf_files, namespace, force)
+    statuses = [r.status for r in results.values()]
+
     print(f"\n📊 Summary:")
-    print(f"  ✓ Successfully ingested: {success_count}")
-    print(f"  ⏭️  Skipped (already present): {skip_count}")
+    print(f"  ✓ Successfully ingested: {statuses.count('ingested')}")
+    print(f"  ⏭️  Skipped (unchanged): {statuses.count('unchanged')}")
     print(f"  📁 Total files: {len(pdf_files)}")
 
 
@@ -118,8 +87,8 @@ def main():
     group.add_argument("--file", help="Single PDF file to ingest")
     group.add_argument("--directory", help="Directory containing PDF files to ingest")
     
-    parser.add_argument("--force", action="store_true", 
-                       help="Force ingestion even if files appear to be already present")
+    parser.add_argument("--force", action="store_true",
+                       help="Re-process files even if their recorded content hash is unchanged")
     
     args = parser.parse_args()
     
@@ -138,16 +107,9 @@ def main():
             print(f"ERROR: File not found: {file_path}")
             sys.exit(1)
         
-        if not args.force:
-            existing_files = get_existing_files_in_namespace(args.namespace)
-            if file_path.name in existing_files:
-                print(f"File {file_path.name} already exists in namespace {args.namespace}")
-                print("Use --force to ingest anyway")
-                return
-        
         print(f"Ingesting single file: {file_path}")
-        success = ingest_single_file(file_path, args.namespace)
-        sys.exit(0 if success else 1)
+        results = ingest_files([file_path], args.namespace, args.force)
+        sys.exit(0 if any(r.status in {"ingested", "unchanged"} for r in results.values()) else 1)
     
     elif args.directory:
         dir_path = Path(args.directory)
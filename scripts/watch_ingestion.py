@@ -1,49 +1,116 @@
 # pyright: reportMissingTypeStubs=false, reportMissingImports=false
-from typing import Any
+"""Re-ingest documents under data/documents as they change.
+
+Events are coalesced per file: each change pushes that file's due time
+DEBOUNCE_SECONDS (env WATCH_DEBOUNCE) into the future, and once files are
+due they are re-ingested together in one incremental ``ingest()`` over just
+those paths. Modified files have their no-longer-produced chunks deleted;
+removed files (and the source side of a move) have all of theirs deleted.
+
+Runs for one namespace are serialized, since they share its state database,
+keyword index and manifest; the parallelism is inside ``ingest()`` (an
+extraction pool of WATCH_WORKERS processes and concurrent embedding calls).
+The dispatcher sleeps on a condition until the next file is due, so an idle
+watcher does no work at all.
+"""
+from typing import Any, Dict, List
+import glob
 import os
+import sys
 import time
 from pathlib import Path
-from threading import Event, Thread
+from threading import Condition, Thread
 
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
 
+REPO_ROOT = Path(__file__).resolve().parents[1]
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
 
-WATCH_DIR = Path(__file__).resolve().parents[1] / "data" / "documents"
-DEBOUNCE_SECONDS = 2.0
+WATCH_DIR = REPO_ROOT / "data" / "documents"
+DEBOUNCE_SECONDS = float(os.getenv("WATCH_DEBOUNCE") or 2.0)
+EXTENSIONS = {".pdf", ".txt", ".md"}
+
+
+class CoalescingQueue:
+    """Changed paths waiting to be re-ingested, at most one entry per file."""
+
+    def __init__(self, debounce: float = DEBOUNCE_SECONDS):
+        self.debounce = debounce
+        self._due: Dict[Path, float] = {}
+        self._cond = Condition()
+        self._closed = False
+
+    def put(self, path: Path) -> None:
+        with self._cond:
+            self._due[path] = time.monotonic() + self.debounce
+            self._cond.notify()
+
+    def take(self) -> List[Path]:
+        """Block until at least one path is due and return every due path ([] once closed)."""
+        with self._cond:
+            while not self._closed:
+                now = time.monotonic()
+                ready = [p for p, t in self._due.items() if t <= now]
+                if ready:
+                    for p in ready:
+                        del self._due[p]
+                    return ready
+                self._cond.wait(min(self._due.values()) - now if self._due else None)
+            return []
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
 
 
 class DebouncedIngestor:
-    def __init__(self, namespace: str | None = None):
+    def __init__(self, namespace: str | None = None, workers: int | None = None):
         self.namespace = namespace or os.getenv("INDEX_NAMESPACE", "insurance-act")
-        self._event = Event()
-        self._worker = Thread(target=self._run, daemon=True)
-        self._last_trigger = 0.0
+        self.workers = workers or int(os.getenv("WATCH_WORKERS") or 2)
+        self.queue = CoalescingQueue()
+        self._worker = Thread(target=self._run, name="watch-ingest", daemon=True)
         self._worker.start()
 
-    def trigger(self):
-        self._last_trigger = time.time()
-        self._event.set()
+    def trigger(self, path: Path) -> None:
+        self.queue.put(path)
 
-    def _run(self):
-        while True:
-            self._event.wait()
-            # debounce window
-            while time.time() - self._last_trigger < DEBOUNCE_SECONDS:
-                time.sleep(0.2)
-            self._event.clear()
-            try:
-                from ingestion.cli import ingest
+    def stop(self) -> None:
+        self.queue.close()
+        self._worker.join()
 
-                patterns = [
-                    str(WATCH_DIR / "**" / "*.pdf"),
-                    str(WATCH_DIR / "**" / "*.txt"),
-                    str(WATCH_DIR / "**" / "*.md"),
-                ]
-                created, upserted = ingest(patterns=patterns, namespace=self.namespace)
-                print(f"[watch] Ingestion complete: created={created} upserted={upserted} namespace='{self.namespace}'")
-            except Exception as e:
-                print(f"[watch] Ingestion failed: {e}")
+    def _run(self) -> None:
+        while True:
+            paths = self.queue.take()
+            if not paths:
+                return
+            self._ingest(paths)
+
+    def _ingest(self, paths: List[Path]) -> None:
+        present = sorted(p for p in paths if p.is_file())
+        print(
+            f"[watch] Re-ingesting {len(present)} changed file(s), "
+            f"{len(paths) - len(present)} removed (namespace='{self.namespace}')"
+        )
+        t0 = time.perf_counter()
+        try:
+            from ingestion.cli import ingest
+
+            # Only these files are loaded; chunks of files gone from disk are
+            # deleted by ingest() whatever the patterns.
+            created, upserted = ingest(
+                patterns=[glob.escape(str(p)) for p in present],
+                namespace=self.namespace,
+                workers=min(self.workers, max(1, len(present))),
+            )
+            print(
+                f"[watch] Ingestion complete in {time.perf_counter() - t0:.1f}s: "
+                f"created={created} upserted={upserted} namespace='{self.namespace}'"
+            )
+        except (Exception, SystemExit) as e:
+            print(f"[watch] Ingestion failed: {e}")
 
 
 class DocsEventHandler(FileSystemEventHandler):
@@ -54,16 +121,21 @@ class DocsEventHandler(FileSystemEventHandler):
     def on_any_event(self, event: Any) -> None:
         if getattr(event, "is_directory", False):
             return
-        # Only react to supported extensions
-        src = getattr(event, "src_path", "")
-        try:
-            p = Path(src)
-        except Exception:
+        ev_type = getattr(event, "event_type", "change")
+        if ev_type in {"opened", "closed_no_write"}:
             return
-        if p.suffix.lower() in {".pdf", ".txt", ".md"}:
-            ev_type = getattr(event, "event_type", "change")
-            print(f"[watch] Change detected: {ev_type} {p}")
-            self.ingestor.trigger()
+        # A move is a removal of its source and a change of its destination.
+        for src in (getattr(event, "src_path", ""), getattr(event, "dest_path", "")):
+            if not src:
+                continue
+            try:
+                p = Path(os.fsdecode(src)).resolve()
+            except Exception:
+                continue
+            # Only react to supported extensions
+            if p.suffix.lower() in EXTENSIONS:
+                print(f"[watch] Change detected: {ev_type} {p}")
+                self.ingestor.trigger(p)
 
 
 def main() -> None:
@@ -82,6 +154,7 @@ def main() -> None:
     except KeyboardInterrupt:
         observer.stop()
     observer.join()
+    ingestor.stop()
 
 
 if __name__ == "__main__":
@@ -1,11 +1,14 @@
+import asyncio
 import os
 import re
 import time
 import logging
+from contextlib import asynccontextmanager
 from typing import Any, Dict, AsyncGenerator
 
 from fastapi import FastAPI, Header, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
@@ -28,13 +31,21 @@ except Exception:  # pragma: no cover - optional dependency fallback
 TEST_MODE = os.getenv("TEST_MODE") in {"1", "true", "True", "yes", "on"}
 
 if TEST_MODE:
-    def ask(q: str) -> Dict[str, Any]:
+    async def aask(q: str) -> Dict[str, Any]:
         return {"answer": f"Echo: {q}", "sources": []}
 else:
-    from rag_core import ask, ask_stream  # type: ignore
+    from rag_core import aask, ask_stream, warmup  # type: ignore
 
 load_dotenv()
 
+# Liveness vs readiness: /healthz answers as soon as the process serves
+# requests. With WARMUP=1 the chain, index connections and embeddings client
+# are warmed in the background after startup, and /readyz returns 503 until
+# that has finished. A failed warmup still marks the app ready (requests then
+# initialize lazily, as they do without WARMUP) and reports the error.
+WARMUP = not TEST_MODE and os.getenv("WARMUP", "0").strip().lower() in {"1", "true", "yes", "on"}
+READINESS: Dict[str, Any] = {"ready": not WARMUP, "warmup": "pending" if WARMUP else "disabled"}
+
 _origins_raw = os.getenv("PUBLIC_CLIENT_ORIGIN", "*")
 ALLOWED_ORIGINS = [o.strip() for o in _origins_raw.split(",") if o.strip()]
 if ALLOWED_ORIGINS == ["*"]:
@@ -63,7 +74,30 @@ BACKEND_API_KEY = os.getenv("BACKEND_API_KEY")
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
 logger = logging.getLogger("app")
 
-app = FastAPI()
+
+async def _run_warmup() -> None:
+    READINESS["warmup"] = "running"
+    start = time.perf_counter()
+    try:
+        timings = await asyncio.to_thread(warmup)
+        READINESS.update(warmup="done", timings={k: round(v, 3) for k, v in timings.items()})
+        logger.info("warmup finished in %.2fs: %s", time.perf_counter() - start, READINESS["timings"])
+    except Exception as e:
+        READINESS.update(warmup="failed", error=str(e))
+        logger.exception("warmup failed")
+    finally:
+        READINESS["ready"] = True
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    task = asyncio.create_task(_run_warmup()) if WARMUP else None
+    yield
+    if task is not None and not task.done():
+        task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -98,13 +132,18 @@ async def root() -> Dict[str, Any]:
     return {
         "ok": True,
         "message": "Insurance Act Chatbot API",
-        "endpoints": {"health": "/healthz", "chat": {"path": "/chat", "method": "POST"}, "docs": "/docs"},
+        "endpoints": {"health": "/healthz", "ready": "/readyz", "chat": {"path": "/chat", "method": "POST"}, "docs": "/docs"},
     }
 
 
 @app.get("/healthz")
 async def healthz(x_api_key: str | None = Header(default=None, alias="X-API-KEY")) -> Dict[str, Any]:
-    return {"ok": True}
+    return {"ok": True, "live": True, "ready": READINESS["ready"], "warmup": READINESS["warmup"]}
+
+
+@app.get("/readyz")
+async def readyz() -> JSONResponse:
+    return JSONResponse(READINESS, status_code=200 if READINESS["ready"] else 503)
 
 
 class AskRequest(BaseModel):
@@ -123,7 +162,7 @@ async def ask_route(
     start = time.perf_counter()
     try:
         try:
-            result = ask(req.q)
+            result = await aask(req.q)
             return {"answer": result.get("answer", ""), "sources": result.get("sources", [])}
         except Exception as e:  # return structured JSON error
             logger.exception("ask failed")
@@ -135,7 +174,8 @@ async def ask_route(
 
 
 from fastapi.responses import StreamingResponse
-import json
+
+from server.app.sse import event_frame, sse_frames
 
 
 @app.post("/ask-stream")
@@ -150,14 +190,12 @@ async def ask_stream_route(
 
     async def event_gen() -> AsyncGenerator[bytes, None]:
         try:
-            async for evt in ask_stream(req.q):  # type: ignore
-                line = json.dumps(evt, ensure_ascii=False)
-                yield f"data: {line}\n\n".encode("utf-8")
-            yield b"data: [DONE]\n\n"
+            # Coalesces token frames and adds heartbeats; see server/app/sse.py.
+            async for frame in sse_frames(ask_stream(req.q)):  # type: ignore
+                yield frame
         except Exception as e:
             # Send error event if streaming fails
-            error_line = json.dumps({"type": "error", "message": str(e)}, ensure_ascii=False)
-            yield f"data: {error_line}\n\n".encode("utf-8")
+            yield event_frame({"type": "error", "message": str(e)})
 
     return StreamingResponse(
         event_gen(), 
@@ -182,7 +220,7 @@ async def chat(
 
     start = time.perf_counter()
     try:
-        result = ask(req.message)
+        result = await aask(req.message)
         return {"message": req.message, "answer": result.get("answer", ""), "sources": result.get("sources", [])}
     finally:
         latency_ms = (time.perf_counter() - start) * 1000
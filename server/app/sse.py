@@ -0,0 +1,135 @@
+"""Server-sent event framing for ``/ask-stream``.
+
+:func:`sse_frames` turns the event dicts of ``rag_core.ask_stream`` into
+``data:`` frames. Token events are coalesced: their text is buffered and
+written as one token frame once ``flush_bytes`` characters are waiting or
+the oldest buffered token is ``flush_ms`` old, so a long answer costs a few
+dozen writes instead of one per model token. Other events flush the buffer
+first, which keeps the order clients see unchanged. While the stream is
+silent for ``heartbeat`` seconds (retrieval, a slow model) a ``: ping``
+comment keeps proxies from timing the connection out; SSE clients ignore
+comment lines.
+
+Token frames are a pre-encoded template around the JSON-escaped text, and
+other events go through orjson when it is installed.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, List
+
+try:
+    import orjson  # type: ignore
+
+    def _dumps(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+except Exception:  # pragma: no cover - optional dependency fallback
+    def _dumps(obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+_TOKEN_PREFIX = b'data: {"type":"token","value":'
+_TOKEN_SUFFIX = b"}\n\n"
+DONE_FRAME = b"data: [DONE]\n\n"
+HEARTBEAT_FRAME = b": ping\n\n"
+_END = object()
+
+
+def token_frame(text: str) -> bytes:
+    return _TOKEN_PREFIX + _dumps(text) + _TOKEN_SUFFIX
+
+
+def event_frame(evt: Dict[str, Any]) -> bytes:
+    return b"data: " + _dumps(evt) + b"\n\n"
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return max(0.0, float(os.getenv(name) or default))
+    except ValueError:
+        return default
+
+
+async def sse_frames(
+    events: AsyncIterator[Dict[str, Any]],
+    flush_ms: float | None = None,
+    flush_bytes: int | None = None,
+    heartbeat: float | None = None,
+) -> AsyncGenerator[bytes, None]:
+    """Frames for ``events`` followed by ``[DONE]``.
+
+    Defaults come from SSE_FLUSH_MS (30), SSE_FLUSH_BYTES (512) and
+    SSE_HEARTBEAT seconds (15; 0 disables heartbeats). SSE_FLUSH_MS=0
+    writes every token as soon as it arrives.
+    """
+    flush_s = (_env_float("SSE_FLUSH_MS", 30.0) if flush_ms is None else flush_ms) / 1000.0
+    max_chars = int(_env_float("SSE_FLUSH_BYTES", 512) if flush_bytes is None else flush_bytes)
+    beat = _env_float("SSE_HEARTBEAT", 15.0) if heartbeat is None else heartbeat
+
+    # One task drives the upstream generator (it may hold connections and
+    # cancel scopes across yields); this side only waits on the queue.
+    queue: asyncio.Queue = asyncio.Queue()
+    producer = asyncio.ensure_future(_pump(events, queue))
+    buf: List[str] = []
+    buffered = 0
+    first_at = 0.0
+    last_write = time.monotonic()
+    try:
+        while True:
+            try:
+                evt = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                now = time.monotonic()
+                timeout = None
+                if buf:
+                    timeout = max(0.0, first_at + flush_s - now)
+                elif beat > 0:
+                    timeout = max(0.0, last_write + beat - now)
+                try:
+                    evt = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    # Nothing new in time: flush what is buffered, or send a heartbeat.
+                    yield token_frame("".join(buf)) if buf else HEARTBEAT_FRAME
+                    buf, buffered = [], 0
+                    last_write = time.monotonic()
+                    continue
+            if evt is _END:
+                break
+            if isinstance(evt, BaseException):
+                raise evt
+            if evt.get("type") == "token":
+                value = evt.get("value") or ""
+                if not value:
+                    continue
+                if not buf:
+                    first_at = time.monotonic()
+                buf.append(value)
+                buffered += len(value)
+                if buffered >= max_chars or time.monotonic() - first_at >= flush_s:
+                    yield token_frame("".join(buf))
+                    buf, buffered = [], 0
+                    last_write = time.monotonic()
+                continue
+            if buf:
+                yield token_frame("".join(buf)) + event_frame(evt)
+                buf, buffered = [], 0
+            else:
+                yield event_frame(evt)
+            last_write = time.monotonic()
+        if buf:
+            yield token_frame("".join(buf))
+        yield DONE_FRAME
+    finally:
+        producer.cancel()
+
+
+async def _pump(events: AsyncIterator[Dict[str, Any]], queue: asyncio.Queue) -> None:
+    try:
+        async for evt in events:
+            queue.put_nowait(evt)
+    except Exception as e:
+        queue.put_nowait(e)
+    finally:
+        queue.put_nowait(_END)
@@ -0,0 +1,46 @@
+import pytest
+
+import rag_core
+from rag_core import AnswerCache, reference_tokens
+
+
+class FakeLLM:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, messages):
+        self.calls += 1
+        return "answer"
+
+
+def test_reference_tokens():
+    assert reference_tokens("What does section 67C (a) of IFRS-17 say?") == {"67c", "(a)", "ifrs-17"}
+    assert reference_tokens("what is a contract") == frozenset()
+
+
+def test_hit_requires_matching_references():
+    cache = AnswerCache(capacity=4, threshold=0.9)
+    vec = [1.0, 0.0, 0.0]
+    cache.put(vec, ("v1",), "A", [], query="section 67C")
+    assert cache.get(vec, ("v1",), query="Section 67c")["answer"] == "A"
+    assert cache.get(vec, ("v1",), query="section 67D") is None
+    assert cache.get(vec, ("v1",), query="section") is None
+    # A new ingestion version empties the cache.
+    assert cache.get(vec, ("v2",), query="section 67C") is None
+
+
+def test_disabled_cache_skips_version_lookup(monkeypatch):
+    monkeypatch.setattr(rag_core, "ANSWER_CACHE", AnswerCache(capacity=0))
+
+    def no_lookup(*args, **kwargs):
+        pytest.fail("ingestion_version read with the cache off")
+
+    llm = FakeLLM()
+    monkeypatch.setattr(rag_core, "ingestion_version", no_lookup)
+    monkeypatch.setattr(rag_core, "_try_embed", lambda q: [1.0, 0.0])
+    monkeypatch.setattr(rag_core, "retrieve_multi", lambda q, k_total=6, vec=None: [])
+    monkeypatch.setattr(rag_core, "get_chain", lambda: {"llm": llm})
+    monkeypatch.setattr(rag_core, "_build_messages", lambda query, docs: [query])
+    assert rag_core.ask("q")["answer"] == "answer"
+    assert rag_core.ask("q")["answer"] == "answer"
+    assert llm.calls == 2
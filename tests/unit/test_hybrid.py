@@ -0,0 +1,68 @@
+from langchain_core.documents import Document
+
+import rag_core
+from ingestion.vectorstore.keyword import BM25Index, tokenize
+
+
+def _index(tmp_path) -> BM25Index:
+    index = BM25Index(tmp_path / "ns.json")
+    texts = {
+        "s67c": "Section 67C sets the contractual service margin at initial recognition.",
+        "s67d": "Section 67D covers onerous contracts and the loss component.",
+        "lrc": "The liability for remaining coverage (LRC) excludes the CSM release.",
+        "misc": "Insurers report revenue for each group of insurance contracts.",
+    }
+    index.upsert(list(texts), list(texts.values()), [{"text": t} for t in texts.values()])
+    return index
+
+
+def test_tokenize_keeps_references_together():
+    assert tokenize("Section 67C of IFRS 17, para 3.2.1") == ["section", "67c", "ifrs", "17", "para", "3.2.1"]
+
+
+def test_bm25_ranks_exact_reference_first(tmp_path):
+    index = _index(tmp_path)
+    ids = [m["id"] for m in index.query("what does section 67C say", 4)["matches"]]
+    assert ids[0] == "s67c"
+    assert "misc" not in ids
+    assert [m["id"] for m in index.query("LRC", 4)["matches"]] == ["lrc"]
+
+
+def test_bm25_survives_save_and_reload(tmp_path):
+    index = _index(tmp_path)
+    index.delete(["s67d"])
+    index.save()
+    reopened = BM25Index(tmp_path / "ns.json")
+    assert sorted(reopened.ids()) == ["lrc", "misc", "s67c"]
+    assert reopened.query("section 67D", 4)["matches"][0]["id"] == "s67c"
+
+
+def _docs(*ids: str) -> list:
+    return [Document(page_content=i, id=i) for i in ids]
+
+
+def test_rrf_rewards_agreement_between_rankings():
+    dense = _docs("a", "b", "c")
+    keyword = _docs("d", "b", "e")
+    fused = rag_core._rrf([dense, keyword], 5)
+    # b is second in both lists, which beats topping only one; ties keep first-seen order.
+    assert [d.id for d in fused] == ["b", "a", "d", "c", "e"]
+
+
+def test_rrf_scores_and_truncation(monkeypatch):
+    monkeypatch.setenv("RRF_K", "60")
+    hits = rag_core._fuse_hits([[rag_core._Hit(d, 0.9) for d in _docs("a", "b")], [rag_core._Hit(d, 3.0) for d in _docs("b")]])
+    assert [h.doc.id for h in hits] == ["b", "a"]
+    assert abs(hits[0].score - (1 / 62 + 1 / 61)) < 1e-12
+    assert abs(hits[1].score - 1 / 61) < 1e-12
+    assert [d.id for d in rag_core._rrf([_docs("a", "b", "c")], 2)] == ["a", "b"]
+
+
+def test_query_uses_one_consistent_snapshot(tmp_path):
+    index = _index(tmp_path)
+    index.query("section", 4)  # builds postings
+    # A reload swaps in a different document set; the built postings still
+    # refer to the old IDs until the next rebuild.
+    index._docs = {}
+    ids = [m["id"] for m in index.query("section 67C", 4)["matches"]]
+    assert ids[0] == "s67c"
@@ -0,0 +1,31 @@
+import numpy as np
+
+from ingestion.vectorstore.ivf import IVFIndex, recall_at_k
+
+
+def _clustered(n: int, dim: int, centers: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    means = rng.standard_normal((centers, dim))
+    x = means[rng.integers(0, centers, n)] + 0.3 * rng.standard_normal((n, dim))
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_ivf_recall_against_brute_force():
+    vectors = _clustered(4000, 32, 20)
+    queries = _clustered(50, 32, 20, seed=1)
+    index = IVFIndex.train(vectors, nlist=32, seed=0)
+    assert index.size == len(vectors)
+
+    assert recall_at_k(vectors, index, queries, k=10, nprobe=8)["recall"] >= 0.9
+    # Probing every cell is an exact scan.
+    assert recall_at_k(vectors, index, queries, k=10, nprobe=index.nlist)["recall"] == 1.0
+
+
+def test_ivf_search_scores_are_sorted_inner_products():
+    vectors = _clustered(500, 16, 5)
+    index = IVFIndex.train(vectors, nlist=8)
+    q = vectors[42]
+    rows, scores = index.search(vectors, q, k=5, nprobe=8)
+    assert rows[0] == 42
+    assert np.allclose(scores, vectors[rows] @ q)
+    assert list(scores) == sorted(scores, reverse=True)
@@ -0,0 +1,77 @@
+import numpy as np
+
+from ingestion.vectorstore.local import LocalVectorStore
+
+
+def _vec(i: int, dim: int = 8) -> list:
+    return np.random.default_rng(i).standard_normal(dim).tolist()
+
+
+def _unit(v: list) -> np.ndarray:
+    a = np.asarray(v, dtype=np.float32)
+    return a / np.linalg.norm(a)
+
+
+def test_upsert_query_and_overwrite(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.upsert(["a", "b", "c"], [_vec(1), _vec(2), _vec(3)], [{"n": 1}, {"n": 2}, {"n": 3}], "ns")
+    assert store.count("ns") == 3
+
+    res = store.query(_vec(2), 1, "ns")
+    assert res["matches"][0]["id"] == "b"
+    assert res["matches"][0]["metadata"] == {"n": 2}
+
+    # Overwriting an existing ID keeps its row; new IDs are appended.
+    store.upsert(["b", "d"], [_vec(20), _vec(4)], [{"n": 20}, {"n": 4}], "ns")
+    assert store.ids("ns") == ["a", "b", "c", "d"]
+    assert np.allclose(store.fetch(["b"], "ns")["b"], _unit(_vec(20)))
+    assert store.query(_vec(20), 1, "ns")["matches"][0]["metadata"] == {"n": 20}
+
+
+def test_duplicate_ids_in_one_batch_keep_the_last(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.upsert(["x", "y", "x"], [_vec(1), _vec(2), _vec(3)], [{"v": 1}, {"v": 2}, {"v": 3}], "ns")
+    assert store.count("ns") == 2
+    assert sorted(store.ids("ns")) == ["x", "y"]
+    assert np.allclose(store.fetch(["x"], "ns")["x"], _unit(_vec(3)))
+
+    reopened = LocalVectorStore(tmp_path)
+    assert sorted(reopened.ids("ns")) == ["x", "y"]
+    assert reopened.query(_vec(3), 1, "ns")["matches"][0]["metadata"] == {"v": 3}
+
+
+def test_delete_and_reopen(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    ids = [f"id{i}" for i in range(10)]
+    store.upsert(ids, [_vec(i) for i in range(10)], [{"i": i} for i in range(10)], "ns")
+    assert store.delete(["id3", "id7", "missing"], "ns") == 2
+    store.upsert(["id10"], [_vec(10)], [{"i": 10}], "ns")
+
+    reopened = LocalVectorStore(tmp_path)
+    expected = [i for i in ids if i not in {"id3", "id7"}] + ["id10"]
+    assert reopened.ids("ns") == expected
+    assert reopened.fetch(["id3"], "ns") == {}
+    for i in (0, 5, 10):
+        assert np.allclose(reopened.fetch([f"id{i}"], "ns")[f"id{i}"], _unit(_vec(i)))
+    assert reopened.query(_vec(5), 1, "ns")["matches"][0]["id"] == "id5"
+
+
+def test_namespaces_are_independent(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.upsert(["a"], [_vec(1)], [{}], "one")
+    assert store.count("two") == 0
+    assert store.query(_vec(1), 1, "two") == {"matches": []}
+    store.upsert(["b"], [_vec(2)], [{}], "two")
+    assert store.ids("one") == ["a"]
+    assert store.ids("two") == ["b"]
+
+
+def test_ivf_index_follows_upserts(tmp_path):
+    store = LocalVectorStore(tmp_path, nprobe=64)
+    store.upsert([f"id{i}" for i in range(200)], [_vec(i) for i in range(200)], [{}] * 200, "ns")
+    store.build_ivf("ns", nlist=8)
+    store.upsert(["new"], [_vec(999)], [{}], "ns")
+
+    reopened = LocalVectorStore(tmp_path, nprobe=64)
+    assert reopened.query(_vec(999), 1, "ns")["matches"][0]["id"] == "new"
+    assert reopened.query(_vec(17), 1, "ns")["matches"][0]["id"] == "id17"
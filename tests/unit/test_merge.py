@@ -0,0 +1,47 @@
+import rag_core
+
+
+class FakeBackend:
+    def __init__(self):
+        self.calls = []
+
+    def query(self, vec, k, namespace, include_values=False):
+        self.calls.append((namespace, k, include_values))  # from pool threads, in any order
+        return {
+            "matches": [
+                {
+                    "id": f"{namespace}{i}",
+                    "score": 1 - i / 10,
+                    "metadata": {"text": f"{namespace} chunk {i}", "source": namespace},
+                    "values": [1.0, float(i)] if include_values else None,
+                }
+                for i in range(k)
+            ]
+        }
+
+
+def _setup(monkeypatch, mode=None) -> FakeBackend:
+    backend = FakeBackend()
+    monkeypatch.setattr(rag_core, "_backend_for", lambda ns: backend)
+    monkeypatch.setattr(rag_core, "_retrieval_configured", lambda: True)
+    monkeypatch.setenv("INDEX_NAMESPACES", "a,b")
+    monkeypatch.delenv("RETRIEVAL_MODE", raising=False)
+    if mode is None:
+        monkeypatch.delenv("MERGE_MODE", raising=False)
+    else:
+        monkeypatch.setenv("MERGE_MODE", mode)
+    return backend
+
+
+def test_default_merge_splits_k_without_vectors(monkeypatch):
+    backend = _setup(monkeypatch)
+    docs = rag_core.retrieve_multi("q", 6, vec=[1.0, 0.0])
+    assert sorted(backend.calls) == [("a", 3, False), ("b", 3, False)]
+    assert [d.metadata["source"] for d in docs] == ["a"] * 3 + ["b"] * 3
+
+
+def test_mmr_is_opt_in_and_fetches_vectors(monkeypatch):
+    backend = _setup(monkeypatch, "mmr")
+    docs = rag_core.retrieve_multi("q", 6, vec=[1.0, 0.0])
+    assert sorted(backend.calls) == [("a", 18, True), ("b", 18, True)]
+    assert 0 < len(docs) <= 6
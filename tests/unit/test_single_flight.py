@@ -0,0 +1,121 @@
+import asyncio
+from contextlib import aclosing
+
+import pytest
+
+import rag_core
+
+
+class FakeRun:
+    """Stands in for ``rag_core._ask_events``: meta, ``tokens`` tokens, done."""
+
+    def __init__(self, tokens: int = 10, delay: float = 0.01):
+        self.tokens = tokens
+        self.delay = delay
+        self.calls: list = []
+        self.cancelled: list = []
+
+    async def __call__(self, query: str):
+        self.calls.append(query)
+        try:
+            await asyncio.sleep(self.delay)
+            yield {"type": "meta", "sources": [{"q": query}]}
+            parts = []
+            for i in range(self.tokens):
+                await asyncio.sleep(self.delay)
+                parts.append(f"t{i} ")
+                yield {"type": "token", "value": f"t{i} "}
+            yield {"type": "done", "answer": "".join(parts)}
+        except asyncio.CancelledError:
+            self.cancelled.append(query)
+            raise
+
+
+@pytest.fixture
+def run(monkeypatch):
+    fake = FakeRun()
+    monkeypatch.setattr(rag_core, "_ask_events", fake)
+    monkeypatch.delenv("SINGLE_FLIGHT", raising=False)
+    yield fake
+    assert not rag_core._FLIGHTS
+
+
+async def _collect(gen) -> list:
+    return [evt async for evt in gen]
+
+
+async def _leave_after_first_token(query: str) -> None:
+    async with aclosing(rag_core.ask_stream(query)) as events:
+        async for evt in events:
+            if evt["type"] == "token":
+                return
+
+
+def test_identical_questions_share_one_upstream_call(run):
+    async def main():
+        queries = ["What is IFRS 17?", "what is  ifrs 17?"] * 5
+        return await asyncio.gather(*(rag_core.aask(q) for q in queries))
+
+    results = asyncio.run(main())
+    assert len(run.calls) == 1
+    assert all(r == results[0] for r in results)
+    assert results[0]["answer"].startswith("t0 t1")
+
+
+def test_late_joiner_replays_from_the_start(run):
+    async def main():
+        first = asyncio.create_task(_collect(rag_core.ask_stream("q")))
+        await asyncio.sleep(0.05)  # the flight is already streaming tokens
+        late = asyncio.create_task(_collect(rag_core.ask_stream("Q")))
+        answer = asyncio.create_task(rag_core.aask("q"))
+        return await asyncio.gather(first, late, answer)
+
+    first, late, answer = asyncio.run(main())
+    assert len(run.calls) == 1
+    assert late == first
+    assert first[0]["type"] == "meta" and first[-1]["type"] == "done"
+    assert answer["answer"] == first[-1]["answer"]
+
+
+def test_last_follower_leaving_cancels_the_run(run):
+    async def main():
+        await _leave_after_first_token("q")
+        await asyncio.sleep(0.02)
+        assert run.cancelled == ["q"]
+        assert not rag_core._FLIGHTS
+        # The next caller starts a fresh run.
+        return await _collect(rag_core.ask_stream("q"))
+
+    events = asyncio.run(main())
+    assert events[-1]["type"] == "done"
+    assert len(run.calls) == 2
+
+
+def test_follower_disconnect_keeps_the_run_for_others(run):
+    async def main():
+        return await asyncio.gather(_collect(rag_core.ask_stream("q")), _leave_after_first_token("q"))
+
+    events, _ = asyncio.run(main())
+    assert events[-1]["type"] == "done"
+    assert len(run.calls) == 1
+    assert run.cancelled == []
+
+
+def test_disabled_runs_every_request(run, monkeypatch):
+    monkeypatch.setenv("SINGLE_FLIGHT", "0")
+
+    async def main():
+        await asyncio.gather(_collect(rag_core.ask_stream("q")), _collect(rag_core.ask_stream("q")))
+
+    asyncio.run(main())
+    assert len(run.calls) == 2
+
+
+def test_error_event_raises_in_aask(monkeypatch):
+    async def failing(query):
+        yield {"type": "error", "message": "boom"}
+
+    monkeypatch.setattr(rag_core, "_ask_events", failing)
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(rag_core.aask("q"))
+    assert not rag_core._FLIGHTS
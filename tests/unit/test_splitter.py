@@ -0,0 +1,53 @@
+import random
+
+import pytest
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from ingestion.splitters.recursive import RecursiveSplitter
+
+
+def _text(seed: int, words: int = 3000) -> str:
+    rng = random.Random(seed)
+    vocab = ["insurance", "contract", "IFRS", "17", "CSM", "liability", "a", "coverage", "x" * 40]
+    parts = []
+    for _ in range(words):
+        parts.append(rng.choice(vocab))
+        parts.append(rng.choice([" "] * 12 + ["\n"] * 2 + ["\n\n", "  ", " \n "]))
+    # A long unbroken run forces the character-level fallback.
+    parts.insert(len(parts) // 2, "z" * 2500)
+    return "".join(parts)
+
+
+@pytest.mark.parametrize("size,overlap", [(1000, 150), (200, 50), (64, 0), (50, 49)])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_matches_recursive_character_text_splitter(size, overlap, seed):
+    text = _text(seed)
+    ours = RecursiveSplitter(size, overlap).split_text(text)
+    theirs = RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap).split_text(text)
+    assert ours == theirs
+
+
+def test_edge_cases_match():
+    ref = RecursiveCharacterTextSplitter(chunk_size=20, chunk_overlap=5)
+    ours = RecursiveSplitter(20, 5)
+    for text in ["", "   ", "short", "\n\n\n\n", "word " * 30, "a\n\nb\n\nc", "x" * 61]:
+        assert ours.split_text(text) == ref.split_text(text), repr(text)
+
+
+def test_chunk_offsets_point_into_the_source():
+    text = _text(3, words=500)
+    for chunk in RecursiveSplitter(300, 60).chunks(text):
+        assert text[chunk.start:chunk.end] == chunk.text
+
+
+def test_split_documents_tracks_pages_when_joined():
+    pages = [
+        Document(page_content="alpha " * 10, metadata={"source": "f.pdf", "page": 0}),
+        Document(page_content="beta " * 10, metadata={"source": "f.pdf", "page": 1}),
+        Document(page_content="gamma " * 40, metadata={"source": "f.pdf", "page": 2}),
+    ]
+    chunks = RecursiveSplitter(120, 20, join_pages=True).split_documents(pages)
+    # The two short pages share a chunk; the long last page is split on its own.
+    assert (chunks[0].metadata["page"], chunks[0].metadata["page_end"]) == (0, 1)
+    assert (chunks[-1].metadata["page"], chunks[-1].metadata["page_end"]) == (2, 2)
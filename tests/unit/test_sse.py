@@ -0,0 +1,127 @@
+import asyncio
+import json
+import subprocess
+import sys
+
+import pytest
+
+from server.app.sse import DONE_FRAME, _env_float, HEARTBEAT_FRAME, event_frame, sse_frames, token_frame
+
+
+async def _events(tokens: int = 200, pause: float = 0.0, fail: bool = False):
+    yield {"type": "meta", "sources": [{"source": "a.pdf", "page": 1}]}
+    if pause:
+        await asyncio.sleep(pause)
+    parts = []
+    for i in range(tokens):
+        value = f'tok{i} "é\\n\n'
+        parts.append(value)
+        yield {"type": "token", "value": value}
+    if fail:
+        raise RuntimeError("boom")
+    yield {"type": "done", "answer": "".join(parts)}
+
+
+def _frames(events, **kwargs) -> list:
+    async def main():
+        return [frame async for frame in sse_frames(events, **kwargs)]
+
+    return asyncio.run(main())
+
+
+def _parse(frames: list) -> list:
+    out = []
+    for raw in b"".join(frames).split(b"\n\n"):
+        if not raw:
+            continue
+        if raw.startswith(b":"):
+            out.append("ping")
+            continue
+        body = raw[len(b"data: "):]
+        out.append("[DONE]" if body == b"[DONE]" else json.loads(body))
+    return out
+
+
+def test_frame_encoding():
+    assert token_frame('a"b\n') == b'data: {"type":"token","value":"a\\"b\\n"}\n\n'
+    assert json.loads(event_frame({"type": "meta", "sources": []})[6:]) == {"type": "meta", "sources": []}
+
+
+def test_tokens_are_coalesced_without_changing_the_text():
+    frames = _frames(_events(), flush_ms=1000, flush_bytes=512, heartbeat=0)
+    events = _parse(frames)
+    tokens = [e for e in events if isinstance(e, dict) and e["type"] == "token"]
+    done = next(e for e in events if isinstance(e, dict) and e["type"] == "done")
+
+    assert "".join(t["value"] for t in tokens) == done["answer"]
+    assert len(tokens) < 20  # 200 model tokens, far fewer frames
+    assert events[0]["type"] == "meta"
+    assert events[-2:] == [done, "[DONE]"]
+    assert frames[-1] == DONE_FRAME
+
+
+def test_zero_flush_interval_writes_every_token():
+    events = _parse(_frames(_events(tokens=5), flush_ms=0, heartbeat=0))
+    assert [e["value"] for e in events if isinstance(e, dict) and e["type"] == "token"] == [
+        f'tok{i} "é\\n\n' for i in range(5)
+    ]
+
+
+def test_heartbeat_while_the_stream_is_silent():
+    frames = _frames(_events(tokens=3, pause=0.35), flush_ms=0, heartbeat=0.1)
+    assert frames[0].startswith(b'data: {"type":"meta"')
+    beats = frames.count(HEARTBEAT_FRAME)
+    assert 2 <= beats <= 4
+    # All of them fall in the silent gap, none once tokens flow.
+    assert frames[1:1 + beats] == [HEARTBEAT_FRAME] * beats
+
+
+def test_no_heartbeat_when_disabled():
+    frames = _frames(_events(tokens=3, pause=0.2), flush_ms=0, heartbeat=0)
+    assert HEARTBEAT_FRAME not in frames
+
+
+def test_upstream_error_propagates_after_buffered_tokens():
+    async def main():
+        seen = []
+        with pytest.raises(RuntimeError, match="boom"):
+            async for frame in sse_frames(_events(tokens=5, fail=True), flush_ms=1000, heartbeat=0):
+                seen.append(frame)
+        return seen
+
+    assert _parse(asyncio.run(main()))[0]["type"] == "meta"
+
+
+def test_closing_the_stream_cancels_the_producer():
+    state = {"cancelled": False}
+
+    async def endless():
+        try:
+            while True:
+                yield {"type": "token", "value": "x"}
+                await asyncio.sleep(0)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    async def main():
+        frames = sse_frames(endless(), flush_ms=0, heartbeat=0)
+        await frames.__anext__()
+        await frames.aclose()
+        await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert state["cancelled"]
+
+
+def test_env_settings_are_clamped(monkeypatch):
+    monkeypatch.setenv("SSE_HEARTBEAT", "-5")
+    assert _env_float("SSE_HEARTBEAT", 15.0) == 0.0
+    monkeypatch.setenv("SSE_HEARTBEAT", "soon")
+    assert _env_float("SSE_HEARTBEAT", 15.0) == 15.0
+
+
+def test_framing_does_not_load_rag_core():
+    # TEST_MODE servers never import rag_core (numpy, LangChain); framing must not either.
+    code = "import sys, server.app.sse; sys.exit('rag_core' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0